@@ -10,6 +10,8 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from src.scheduler.stock_poller import StockPollerService
+from src.scheduler.shard_coordinator import ShardCoordinator
+from src.scheduler.holdings_refresher import holdings_refresher
 
 if __name__ == "__main__":
     print("=" * 60)
@@ -20,7 +22,16 @@ if __name__ == "__main__":
     # 创建轮询服务实例
     # batch_size: 每批处理15只股票
     # interval_minutes: 每10分钟更新一次
-    poller = StockPollerService(batch_size=15, interval_minutes=10)
+    # POLLER_SHARDING=1 时多个轮询进程按数据库租约划分股票（可在不同主机上各启动一个）
+    coordinator = ShardCoordinator() if os.getenv("POLLER_SHARDING", "0") == "1" else None
+    poller = StockPollerService(batch_size=15, interval_minutes=10, coordinator=coordinator)
+    
+    # 后台检查已订阅基金的新季度持仓披露（分片时只由持有主分片租约的进程执行，先完成首次心跳）
+    if coordinator is not None:
+        coordinator.start_background()
+        holdings_refresher.start_background(is_leader=coordinator.is_leader)
+    else:
+        holdings_refresher.start_background()
     
     try:
         poller.start()
@@ -0,0 +1,373 @@
+"""
+K线本地存储模块
+按 (代码, 周期) 持久化日K线，并记录已覆盖的日期区间：
+请求某个时间窗口时只向 yfinance 下载缺失的区间，
+周K/月K 由已存储的日K重采样得到，不再单独下载。
+yfinance 返回的是复权后的价格，出现新的分红或拆股时该代码的复权基准改变，
+此时清空该代码已存储的K线并重新下载，避免不同基准的K线混在一起
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from src.data.rate_limiter import YAHOO_FINANCE_HOST, rate_limiters
+from src.data.single_flight import SingleFlight
+
+PRICE_BAR_DB_FILE = os.path.join(os.path.dirname(__file__), '../../data/cache/price_bars.db')
+
+# 实际持久化的周期
+STORED_INTERVAL = "1d"
+
+# 由日K重采样得到的周期及对应的 pandas 重采样规则
+RESAMPLE_RULES = {
+    "1wk": {"rule": "W-MON", "label": "left", "closed": "left"},
+    "1mo": {"rule": "MS"},
+}
+
+# period 参数对应的自然日窗口
+PERIOD_DAYS = {
+    "1mo": 30,
+    "3mo": 90,
+    "6mo": 182,
+    "1y": 365,
+    "2y": 730,
+    "5y": 1826,
+    "10y": 3652,
+}
+
+# period 参数对应的最近交易日数量（先取足够的自然日窗口再截取末尾）
+PERIOD_BARS = {
+    "1d": 1,
+    "5d": 5,
+}
+
+# 包含最近交易日的尾部区间两次下载的最小间隔（秒），最近交易日的K线可能尚未收盘，不计入覆盖区间
+BAR_TAIL_REFRESH_SECONDS = float(os.getenv("BAR_TAIL_REFRESH_SECONDS", "300"))
+
+# period="max" 时的起始日期
+MAX_PERIOD_START = date(1970, 1, 1)
+
+
+def _settled_date() -> date:
+    """
+    覆盖区间的上限（不含）：UTC 日期减一天。
+    早于该日期的交易日在所有市场（包括全天交易的期货）都已收盘，与本机时区无关
+    """
+    return (datetime.now(timezone.utc) - timedelta(days=1)).date()
+
+
+def _action_dates(df: pd.DataFrame) -> List[str]:
+    """K线中有分红或拆股的日期"""
+    dates = set()
+    for column in ("Dividends", "Stock Splits"):
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors="coerce").fillna(0)
+            dates.update(ts.strftime("%Y-%m-%d") for ts in df.index[values != 0])
+    return sorted(dates)
+
+
+def _merge_ranges(ranges: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """合并重叠或相邻的 [start, end) 日期区间"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _missing_ranges(covered: List[Tuple[str, str]], start: str, end: str) -> List[Tuple[str, str]]:
+    """计算 [start, end) 中未被 covered 覆盖的子区间"""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in covered:
+        if cov_end <= cursor:
+            continue
+        if cov_start >= end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class PriceBarStore:
+    """
+    按 (代码, 周期) 存储的K线库，只补齐缺失的日期区间
+
+    核心属性：
+        - path (str): SQLite 文件路径
+
+    使用示例：
+        store = PriceBarStore()
+        df = store.get_history("AAPL", period="6mo", interval="1d")
+    """
+
+    def __init__(self, path: str = PRICE_BAR_DB_FILE):
+        self.path = path
+        # 按代码合并下载：网络请求不在全局锁内进行
+        self._inflight = SingleFlight()
+        # {代码: 上次下载尾部区间的时间戳}
+        self._tail_fetched_at = {}
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """每次调用新建连接（保证多线程安全），正常退出时提交并关闭"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建K线表和覆盖区间表"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_bars (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    bar_date TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    PRIMARY KEY (ticker, interval, bar_date)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_bar_coverage (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_price_bar_coverage ON price_bar_coverage (ticker, interval)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_bar_actions (
+                    ticker TEXT NOT NULL,
+                    action_date TEXT NOT NULL,
+                    PRIMARY KEY (ticker, action_date)
+                ) WITHOUT ROWID
+            """)
+
+    def get_coverage(self, ticker: str, interval: str = STORED_INTERVAL) -> List[Tuple[str, str]]:
+        """获取已覆盖的 [start, end) 日期区间（按起始日期升序）"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT start_date, end_date FROM price_bar_coverage WHERE ticker = ? AND interval = ? "
+                "ORDER BY start_date",
+                (ticker, interval)
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    def _check_actions(self, ticker: str, df: pd.DataFrame) -> bool:
+        """
+        记录下载到的分红/拆股日期；出现新的公司行动且本地已有更早的K线时，
+        清空该代码的K线和覆盖区间（复权基准已变化）
+
+        Returns:
+            bool: 是否已清空
+        """
+        actions = _action_dates(df)
+        if not actions:
+            return False
+        with self._connect() as conn:
+            known = {row[0] for row in conn.execute(
+                "SELECT action_date FROM price_bar_actions WHERE ticker = ?", (ticker,)
+            ).fetchall()}
+            new_actions = [d for d in actions if d not in known]
+            if not new_actions:
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO price_bar_actions (ticker, action_date) VALUES (?, ?)",
+                [(ticker, d) for d in new_actions]
+            )
+            stale = conn.execute(
+                "SELECT 1 FROM price_bars WHERE ticker = ? AND interval = ? AND bar_date < ? LIMIT 1",
+                (ticker, STORED_INTERVAL, max(new_actions))
+            ).fetchone()
+            if stale is None:
+                return False
+            conn.execute("DELETE FROM price_bars WHERE ticker = ? AND interval = ?", (ticker, STORED_INTERVAL))
+            conn.execute("DELETE FROM price_bar_coverage WHERE ticker = ? AND interval = ?", (ticker, STORED_INTERVAL))
+        print(f"{ticker} 出现新的分红/拆股 {new_actions}，复权基准变化，重新下载K线")
+        return True
+
+    @staticmethod
+    def _download(ticker: str, start: str, end: str) -> pd.DataFrame:
+        """从 yfinance 下载 [start, end) 的日K"""
+        rate_limiters.acquire(YAHOO_FINANCE_HOST)
+        return yf.Ticker(ticker).history(start=start, end=end, interval=STORED_INTERVAL)
+
+    def _save(self, ticker: str, interval: str, df: pd.DataFrame, start: str, end: str):
+        """写入K线，并在 start < end 时把 [start, end) 合并进覆盖区间"""
+        rows = []
+        for ts, bar in df.iterrows():
+            rows.append((
+                ticker, interval, ts.strftime("%Y-%m-%d"),
+                float(bar["Open"]), float(bar["High"]), float(bar["Low"]),
+                float(bar["Close"]), float(bar["Volume"])
+            ))
+
+        coverage = _merge_ranges(self.get_coverage(ticker, interval) + [(start, end)])
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO price_bars "
+                "(ticker, interval, bar_date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            if start >= end:
+                return
+            conn.execute(
+                "DELETE FROM price_bar_coverage WHERE ticker = ? AND interval = ?", (ticker, interval)
+            )
+            conn.executemany(
+                "INSERT INTO price_bar_coverage (ticker, interval, start_date, end_date) VALUES (?, ?, ?, ?)",
+                [(ticker, interval, s, e) for s, e in coverage]
+            )
+
+    def fill_range(self, ticker: str, start: date, end: date) -> int:
+        """
+        确保 [start, end) 的日K已在本地，只下载缺失区间
+
+        最近交易日（UTC 日期减一天及之后）的K线可能尚未收盘，只写入数据、不计入覆盖区间，下次请求时会重新下载；
+        下载到新的分红/拆股时清空该代码的K线，重新下载整个请求区间
+
+        Args:
+            ticker: 代码
+            start: 起始日期（含）
+            end: 结束日期（不含）
+
+        Returns:
+            int: 本次下载的区间数
+        """
+        # 同一代码同时只有一个下载（不同代码互不等待）；合并到其他区间的下载时，
+        # 等它结束后再按本次区间补齐（已覆盖的部分不会重复下载）
+        token = object()
+        while True:
+            owner, downloads = self._inflight.do(
+                ticker, lambda: (token, self._fill_range(ticker, start, end))
+            )
+            if owner is token:
+                return downloads
+
+    def _fill_range(self, ticker: str, start: date, end: date) -> int:
+        """下载 [start, end) 中本地缺失的区间（调用方保证同一代码不会并发执行）"""
+        settled = _settled_date().isoformat()
+        start_str = start.isoformat()
+        end_str = end.isoformat()
+
+        downloads = 0
+        # 复权基准变化时最多重新下载一次
+        for _ in range(2):
+            invalidated = False
+            for gap_start, gap_end in _missing_ranges(self.get_coverage(ticker), start_str, end_str):
+                is_tail = gap_end > settled
+                if is_tail and time.time() - self._tail_fetched_at.get(ticker, 0) < BAR_TAIL_REFRESH_SECONDS:
+                    continue
+
+                df = self._download(ticker, gap_start, gap_end)
+                downloads += 1
+                if is_tail:
+                    self._tail_fetched_at[ticker] = time.time()
+                if df.empty:
+                    # 下载失败或区间内无交易日：不记录覆盖，下次重试
+                    continue
+                if self._check_actions(ticker, df):
+                    self._tail_fetched_at.pop(ticker, None)
+                    invalidated = True
+                    break
+
+                # 覆盖区间最多记到最近交易日之前，最近交易日的K线仍可能变化
+                self._save(ticker, STORED_INTERVAL, df, gap_start, min(gap_end, settled))
+            if not invalidated:
+                break
+        return downloads
+
+    def read_range(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        """读取本地 [start, end) 的日K"""
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT bar_date AS Date, open AS Open, high AS High, low AS Low, close AS Close, volume AS Volume "
+                "FROM price_bars WHERE ticker = ? AND interval = ? AND bar_date >= ? AND bar_date < ? "
+                "ORDER BY bar_date",
+                conn, params=(ticker, STORED_INTERVAL, start.isoformat(), end.isoformat())
+            )
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.set_index("Date")
+
+    @staticmethod
+    def resample(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+        """将日K重采样为周K或月K"""
+        if df.empty or interval not in RESAMPLE_RULES:
+            return df
+        options = dict(RESAMPLE_RULES[interval])
+        rule = options.pop("rule")
+        resampled = df.resample(rule, **options).agg({
+            "Open": "first",
+            "High": "max",
+            "Low": "min",
+            "Close": "last",
+            "Volume": "sum",
+        })
+        return resampled.dropna(subset=["Close"])
+
+    def get_history(self, ticker: str, period: str = "1y", interval: str = "1d") -> Optional[pd.DataFrame]:
+        """
+        按 period/interval 获取K线，只下载本地缺失的区间
+
+        Args:
+            ticker: 代码
+            period: 时间窗口（1d、5d、1mo、3mo、6mo、1y、2y、5y、10y、ytd、max）
+            interval: 周期（1d，或由日K重采样的 1wk、1mo）
+
+        Returns:
+            pd.DataFrame: OHLCV 数据；周期或窗口不受支持时返回None，由调用方直接请求 yfinance
+        """
+        if interval != STORED_INTERVAL and interval not in RESAMPLE_RULES:
+            return None
+        ticker = ticker.upper()
+
+        # 按 UTC 日期计算窗口，结束日期多留一天，包含时区早于 UTC 的市场（如亚太）当天的K线
+        today = datetime.now(timezone.utc).date()
+        end = today + timedelta(days=2)
+        if period in PERIOD_DAYS:
+            start = today - timedelta(days=PERIOD_DAYS[period])
+        elif period in PERIOD_BARS:
+            # 预留足够的自然日覆盖节假日
+            start = today - timedelta(days=PERIOD_BARS[period] * 2 + 7)
+        elif period == "ytd":
+            start = date(today.year, 1, 1)
+        elif period == "max":
+            start = MAX_PERIOD_START
+        else:
+            return None
+
+        self.fill_range(ticker, start, end)
+        df = self.read_range(ticker, start, end)
+        if period in PERIOD_BARS:
+            df = df.tail(PERIOD_BARS[period])
+        return self.resample(df, interval)
+
+
+# 进程内共享的K线库
+price_bar_store = PriceBarStore()
@@ -0,0 +1,174 @@
+"""
+内存缓存引擎
+有界（条目数 + 字节数）的 LRU 缓存，按命名空间设置 TTL，
+过期时间带随机抖动，避免同一批键在同一时刻集中失效
+"""
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+# 默认容量与过期策略
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64MB
+DEFAULT_TTL = 300
+DEFAULT_JITTER_RATIO = 0.1
+
+
+def estimate_size(value: Any) -> int:
+    """
+    估算缓存值占用的字节数
+
+    DataFrame 按 memory_usage(deep=True) 计算，容器类型递归累加
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class CacheEngine:
+    """
+    线程安全的 LRU + TTL 缓存
+
+    核心属性：
+        - max_entries (int): 最大条目数
+        - max_bytes (int): 最大占用字节数（估算值）
+        - namespace_ttls (dict): 各命名空间的 TTL（秒），未配置时使用 default_ttl
+        - jitter_ratio (float): 过期时间随机抖动比例（0.1 表示 ±10%）
+
+    使用示例：
+        cache = CacheEngine(namespace_ttls={"fund": 600})
+        cache.set("fund", "161725", data)
+        data = cache.get("fund", "161725")
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 default_ttl: float = DEFAULT_TTL, namespace_ttls: Optional[Dict[str, float]] = None,
+                 jitter_ratio: float = DEFAULT_JITTER_RATIO):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self.jitter_ratio = jitter_ratio
+        # {(命名空间, 键): (值, 过期时间, 字节数)}，按最近访问顺序排列
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _expiry(self, namespace: str, ttl: Optional[float], jitter: bool = True) -> float:
+        """计算带抖动的过期时间"""
+        base = ttl if ttl is not None else self.namespace_ttls.get(namespace, self.default_ttl)
+        jitter = base * self.jitter_ratio if jitter else 0.0
+        return time.monotonic() + base + random.uniform(-jitter, jitter)
+
+    def _pop(self, entry_key: Tuple[str, str]):
+        """删除一条记录并更新字节计数"""
+        _, _, size = self._entries.pop(entry_key)
+        self._bytes -= size
+
+    def _evict(self):
+        """超出条目数或字节数上限时，从最久未访问的一端淘汰"""
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._pop(oldest)
+            self._stats["evictions"] += 1
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        读取缓存，过期记录会被删除
+
+        Args:
+            namespace: 命名空间
+            key: 键
+
+        Returns:
+            缓存值，未命中返回None
+        """
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            value, expires_at, _ = entry
+            if time.monotonic() >= expires_at:
+                self._pop(entry_key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, jitter: bool = True):
+        """
+        写入缓存
+
+        Args:
+            namespace: 命名空间
+            key: 键
+            value: 值
+            ttl: 过期时间（秒），None 时使用命名空间 TTL
+            jitter: 是否对过期时间加抖动（到期时刻有明确含义时，如下一次开盘，应关闭）
+        """
+        entry_key = (namespace, key)
+        size = estimate_size(value)
+        with self._lock:
+            if entry_key in self._entries:
+                self._pop(entry_key)
+            self._entries[entry_key] = (value, self._expiry(namespace, ttl, jitter), size)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, namespace: str, key: str):
+        """删除单条缓存"""
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._pop((namespace, key))
+
+    def clear(self, namespace: Optional[str] = None):
+        """
+        清空缓存
+
+        Args:
+            namespace: 只清空指定命名空间，None 表示全部
+        """
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                self._pop(entry_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: hits、misses、evictions、expirations、entries、bytes、hit_rate 及各命名空间条目数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            namespaces: Dict[str, int] = {}
+            for namespace, _ in self._entries:
+                namespaces[namespace] = namespaces.get(namespace, 0) + 1
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["namespaces"] = namespaces
+        return stats
@@ -0,0 +1,198 @@
+"""
+数据源熔断器模块
+按数据源统计滚动窗口内的失败率：失败率过高时熔断（open），
+冷却期内直接快速失败，让调用方立即切换到下一个数据源；
+冷却期结束后进入半开（half_open）状态放行少量试探请求，成功则恢复（closed）
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+# 熔断器状态
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# 默认参数，可通过环境变量调整
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "1"))
+
+
+class CircuitOpenError(Exception):
+    """数据源处于熔断状态，请求未发出"""
+
+
+class CircuitBreaker:
+    """
+    单个数据源的熔断器
+
+    核心属性：
+        - name (str): 数据源名称
+        - failure_rate (float): 触发熔断的失败率阈值
+        - min_calls (int): 窗口内至少有多少次调用才计算失败率
+        - window_seconds (float): 滚动窗口长度（秒）
+        - open_seconds (float): 熔断冷却时间（秒）
+        - half_open_calls (int): 半开状态下允许的试探请求数
+
+    使用示例：
+        breaker = CircuitBreaker("sina")
+        if breaker.allow_request():
+            try:
+                data = fetch()
+                breaker.record_success()
+            except Exception:
+                breaker.record_failure()
+    """
+
+    def __init__(self, name: str, failure_rate: float = CIRCUIT_FAILURE_RATE,
+                 min_calls: int = CIRCUIT_MIN_CALLS, window_seconds: float = CIRCUIT_WINDOW_SECONDS,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS, half_open_calls: int = CIRCUIT_HALF_OPEN_CALLS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        # 滚动窗口：[(时间戳, 是否成功)]
+        self._window: deque = deque()
+        self._lock = threading.Lock()
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def _trim(self, now: float):
+        """移除窗口外的记录"""
+        while self._window and now - self._window[0][0] > self.window_seconds:
+            self._window.popleft()
+
+    def _update_state(self, now: float):
+        """冷却期结束后从 open 转入 half_open"""
+        if self._state == STATE_OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = STATE_HALF_OPEN
+            self._trials = 0
+
+    def _open(self, now: float):
+        """进入熔断状态"""
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._stats["opened"] += 1
+        print(f"数据源 {self.name} 熔断 {self.open_seconds:.0f} 秒")
+
+    @property
+    def state(self) -> str:
+        """当前状态（closed、open、half_open）"""
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        判断是否允许发出请求，熔断期间返回False
+
+        半开状态下最多放行 half_open_calls 个试探请求
+        """
+        with self._lock:
+            self._update_state(time.monotonic())
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        """记录一次成功请求，半开状态下恢复为 closed"""
+        now = time.monotonic()
+        with self._lock:
+            self._stats["successes"] += 1
+            if self._state == STATE_HALF_OPEN:
+                self._state = STATE_CLOSED
+                self._window.clear()
+            self._window.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        """记录一次失败请求，失败率超过阈值或半开试探失败时熔断"""
+        now = time.monotonic()
+        with self._lock:
+            self._stats["failures"] += 1
+            if self._state == STATE_HALF_OPEN:
+                self._open(now)
+                return
+            self._window.append((now, False))
+            self._trim(now)
+            if self._state == STATE_CLOSED and len(self._window) >= self.min_calls:
+                failures = sum(1 for _, ok in self._window if not ok)
+                if failures / len(self._window) >= self.failure_rate:
+                    self._open(now)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        通过熔断器执行 fn，抛出异常视为失败
+
+        Raises:
+            CircuitOpenError: 数据源处于熔断状态
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"数据源 {self.name} 处于熔断状态")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self):
+        """恢复为 closed 并清空窗口"""
+        with self._lock:
+            self._state = STATE_CLOSED
+            self._window.clear()
+            self._trials = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取熔断器统计信息
+
+        Returns:
+            dict: state、窗口内调用数与失败率、累计成功/失败/拒绝/熔断次数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            self._trim(now)
+            stats = dict(self._stats)
+            stats["state"] = self._state
+            stats["window_calls"] = len(self._window)
+            failures = sum(1 for _, ok in self._window if not ok)
+            stats["window_failure_rate"] = failures / len(self._window) if self._window else 0.0
+        return stats
+
+
+# 进程内共享的各数据源熔断器
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取（或创建）指定数据源的熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            _breakers[name] = breaker
+        return breaker
+
+
+def get_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """获取全部数据源熔断器的统计信息"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.get_stats() for breaker in breakers}
@@ -0,0 +1,255 @@
+"""
+异步HTTP抓取引擎
+基于 aiohttp 的长连接池：后台线程运行独立事件循环，
+按主机限制并发数和请求速率，单次请求带超时；
+同步门面（get / get_many）供 Streamlit 页面和轮询服务直接调用
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from src.data.rate_limiter import RateLimiterRegistry, rate_limiters
+
+# 连接池总连接数、单主机默认并发数、默认超时（秒）、空闲长连接保持时间（秒）
+ASYNC_FETCH_MAX_CONNECTIONS = int(os.getenv("ASYNC_FETCH_MAX_CONNECTIONS", "20"))
+ASYNC_FETCH_PER_HOST_LIMIT = int(os.getenv("ASYNC_FETCH_PER_HOST_LIMIT", "4"))
+ASYNC_FETCH_TIMEOUT = float(os.getenv("ASYNC_FETCH_TIMEOUT", "5"))
+ASYNC_FETCH_KEEPALIVE = float(os.getenv("ASYNC_FETCH_KEEPALIVE", "30"))
+
+# 各数据源主机的并发上限（未配置的主机使用 ASYNC_FETCH_PER_HOST_LIMIT）
+DEFAULT_HOST_LIMITS = {
+    "hq.sinajs.cn": 4,
+    "push2.eastmoney.com": 4,
+    "api.fund.eastmoney.com": 2,
+}
+
+
+class FetchResult:
+    """
+    单次请求的结果（失败时 error 不为空，不抛出异常）
+
+    核心属性：
+        - url (str): 请求地址
+        - status (int): HTTP 状态码，连接失败时为None
+        - text (str): 响应正文
+        - error (Exception): 连接、超时等异常
+        - elapsed (float): 耗时（秒）
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.status: Optional[int] = None
+        self.text = ""
+        self.error: Optional[Exception] = None
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """请求成功且状态码为200"""
+        return self.error is None and self.status == 200
+
+    def json(self) -> Any:
+        """按 JSON 解析响应正文"""
+        return json.loads(self.text)
+
+    def __repr__(self) -> str:
+        return f"FetchResult(url={self.url!r}, status={self.status}, error={self.error!r})"
+
+
+class AsyncFetchEngine:
+    """
+    带长连接池和按主机并发限制的异步抓取引擎
+
+    核心属性：
+        - max_connections (int): 连接池总连接数
+        - per_host_limit (int): 未单独配置的主机的并发上限
+        - host_limits (dict): {主机名: 并发上限}
+        - timeout (float): 默认请求超时（秒）
+        - rate_limiters (RateLimiterRegistry): 按主机的令牌桶限流（可选）
+
+    使用示例：
+        engine = AsyncFetchEngine(host_limits={"hq.sinajs.cn": 4})
+        results = engine.get_many([{"url": url1}, {"url": url2, "encoding": "gbk"}])
+    """
+
+    def __init__(self, max_connections: int = ASYNC_FETCH_MAX_CONNECTIONS,
+                 per_host_limit: int = ASYNC_FETCH_PER_HOST_LIMIT, timeout: float = ASYNC_FETCH_TIMEOUT,
+                 host_limits: Optional[Dict[str, int]] = None, keepalive_timeout: float = ASYNC_FETCH_KEEPALIVE,
+                 rate_limiters: Optional[RateLimiterRegistry] = None):
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.host_limits = dict(host_limits or {})
+        self.keepalive_timeout = keepalive_timeout
+        self.rate_limiters = rate_limiters
+        # 事件循环及其所在线程（首次请求时启动）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        # 以下对象只在事件循环线程中访问
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "errors": 0, "total_seconds": 0.0}
+        self._host_stats: Dict[str, Dict[str, int]] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动（或重启）后台事件循环线程"""
+        with self._lock:
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="async-fetch-engine", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+                self._session = None
+                self._semaphores = {}
+            return self._loop
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的 ClientSession（连接池在多次请求之间复用）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        """获取主机对应的并发信号量"""
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_limits.get(host, self.per_host_limit))
+            self._semaphores[host] = semaphore
+        return semaphore
+
+    def _record(self, host: str, result: FetchResult):
+        """记录请求统计"""
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["total_seconds"] += result.elapsed
+            host_stats = self._host_stats.setdefault(host, {"requests": 0, "errors": 0})
+            host_stats["requests"] += 1
+            if not result.ok:
+                self._stats["errors"] += 1
+                host_stats["errors"] += 1
+
+    async def fetch(self, url: str, params: Optional[Dict[str, Any]] = None,
+                    headers: Optional[Dict[str, str]] = None, encoding: Optional[str] = None,
+                    timeout: Optional[float] = None) -> FetchResult:
+        """
+        发送一次 GET 请求（协程，须在引擎的事件循环中执行）
+
+        Args:
+            url: 请求地址
+            params: 查询参数
+            headers: 请求头
+            encoding: 响应正文编码（如新浪接口为 gbk），None 时按响应头判断
+            timeout: 本次请求超时（秒），None 时使用引擎默认值
+
+        Returns:
+            FetchResult: 请求结果，异常记录在 error 中
+        """
+        host = urlsplit(url).hostname or ""
+        result = FetchResult(url)
+        options: Dict[str, Any] = {"params": params, "headers": headers}
+        if timeout is not None:
+            options["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+        # 先按主机限流（等待期间不占用并发名额，也不阻塞其他主机的请求）
+        if self.rate_limiters is not None:
+            await self.rate_limiters.acquire_async(host)
+
+        async with self._semaphore(host):
+            start = time.perf_counter()
+            try:
+                async with self._get_session().get(url, **options) as response:
+                    result.status = response.status
+                    result.text = await response.text(encoding=encoding, errors="replace")
+            except Exception as e:
+                result.error = e
+            result.elapsed = time.perf_counter() - start
+
+        self._record(host, result)
+        return result
+
+    async def fetch_all(self, requests: List[Dict[str, Any]]) -> List[FetchResult]:
+        """并发执行多个请求，结果顺序与 requests 一致"""
+        return list(await asyncio.gather(*(self.fetch(**request) for request in requests)))
+
+    def _run(self, coro):
+        """在后台事件循环中执行协程并阻塞等待结果"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在抓取引擎的事件循环线程中调用同步接口，请直接 await fetch()")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def get(self, url: str, **kwargs) -> FetchResult:
+        """
+        同步发送单个请求
+
+        Args:
+            url: 请求地址
+            **kwargs: params、headers、encoding、timeout，同 fetch()
+        """
+        return self._run(self.fetch(url, **kwargs))
+
+    def get_many(self, requests: List[Dict[str, Any]]) -> List[FetchResult]:
+        """
+        同步并发发送多个请求（各主机的并发数受 host_limits 限制）
+
+        Args:
+            requests: [{"url": ..., "params": ..., "headers": ..., "encoding": ..., "timeout": ...}]
+
+        Returns:
+            list: FetchResult 列表，顺序与 requests 一致
+        """
+        if not requests:
+            return []
+        return self._run(self.fetch_all(requests))
+
+    def close(self):
+        """关闭连接池并停止后台事件循环"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        async def _close_session():
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+            self._session = None
+
+        if thread is not None and thread.is_alive():
+            asyncio.run_coroutine_threadsafe(_close_session(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+        loop.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取请求统计信息
+
+        Returns:
+            dict: requests、errors、avg_seconds 及各主机的请求数和失败数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["hosts"] = {host: dict(s) for host, s in self._host_stats.items()}
+        stats["avg_seconds"] = stats["total_seconds"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+# 进程内共享的抓取引擎
+fetch_engine = AsyncFetchEngine(host_limits=DEFAULT_HOST_LIMITS, rate_limiters=rate_limiters)
@@ -0,0 +1,158 @@
+"""
+基金目录模块
+ak.fund_name_em() 每次都会下载一万多只基金的完整列表，
+这里只下载一次并以列式文件（Parquet）保存到本地，每日刷新，
+代码→名称查询由内存字典完成
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import akshare as ak
+import pandas as pd
+
+FUND_DIRECTORY_FILE = os.path.join(os.path.dirname(__file__), '../../data/cache/fund_directory.parquet')
+
+# 本地文件最长保留时间（小时），超过后从网络刷新
+FUND_DIRECTORY_MAX_AGE_HOURS = float(os.getenv("FUND_DIRECTORY_MAX_AGE_HOURS", "24"))
+
+# 网络刷新失败后的重试间隔（秒），期间继续使用已有数据
+FUND_DIRECTORY_RETRY_SECONDS = 600
+
+# 只保留查询和搜索用到的列
+FUND_DIRECTORY_COLUMNS = ["基金代码", "基金简称", "拼音缩写", "基金类型"]
+
+
+class FundDirectory:
+    """
+    基金目录（代码、简称、拼音缩写、类型），冷启动时优先读取本地文件
+
+    核心属性：
+        - path (str): 本地 Parquet 文件路径
+        - max_age_hours (float): 本地文件有效期（小时）
+
+    使用示例：
+        directory = FundDirectory()
+        name = directory.get_name("000001")
+    """
+
+    def __init__(self, path: str = FUND_DIRECTORY_FILE, max_age_hours: float = FUND_DIRECTORY_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age_hours = max_age_hours
+        self._frame = pd.DataFrame(columns=FUND_DIRECTORY_COLUMNS)
+        self._names: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._last_attempt: Optional[float] = None
+        # 每次替换目录数据时递增，供搜索索引判断是否需要同步
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def _file_age_hours(self) -> Optional[float]:
+        """本地文件距上次写入的小时数，文件不存在时返回None"""
+        if not os.path.exists(self.path):
+            return None
+        return (time.time() - os.path.getmtime(self.path)) / 3600
+
+    def _apply(self, df: pd.DataFrame, loaded_at: float):
+        """
+        用新的目录数据替换内存中的表和索引
+
+        Args:
+            df: 基金目录数据
+            loaded_at: 数据的生成时间（本地文件取修改时间），用于判断是否过期
+        """
+        df = df[FUND_DIRECTORY_COLUMNS].astype(str).reset_index(drop=True)
+        self._frame = df
+        self._names = dict(zip(df["基金代码"], df["基金简称"]))
+        self._loaded_at = loaded_at
+        self.version += 1
+
+    def _load_local(self) -> bool:
+        """从本地 Parquet 文件加载目录"""
+        try:
+            self._apply(pd.read_parquet(self.path), os.path.getmtime(self.path))
+            return True
+        except Exception as e:
+            print(f"读取本地基金目录失败: {e}")
+            return False
+
+    def _download(self) -> bool:
+        """从网络下载完整基金列表并写入本地文件"""
+        try:
+            df = ak.fund_name_em()
+        except Exception as e:
+            print(f"下载基金目录失败: {e}")
+            return False
+
+        if df.empty:
+            return False
+
+        self._apply(df, time.time())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            self._frame.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"保存基金目录失败: {e}")
+        return True
+
+    def ensure_loaded(self):
+        """
+        确保目录已加载且未过期
+
+        加载顺序：内存 → 本地文件（未过期）→ 网络；
+        网络失败时退回使用过期的本地文件
+        """
+        with self._lock:
+            now = time.time()
+            if self._loaded_at and (now - self._loaded_at) / 3600 < self.max_age_hours:
+                return
+            if self._last_attempt and now - self._last_attempt < FUND_DIRECTORY_RETRY_SECONDS:
+                return
+
+            age = self._file_age_hours()
+            if age is not None and age < self.max_age_hours and self._load_local():
+                return
+
+            self._last_attempt = now
+            if not self._download() and age is not None and not self._names:
+                self._load_local()
+
+    def refresh(self) -> bool:
+        """
+        强制从网络刷新目录
+
+        Returns:
+            bool: 是否刷新成功
+        """
+        with self._lock:
+            return self._download()
+
+    def get_name(self, code: str) -> Optional[str]:
+        """
+        按基金代码查询简称
+
+        Args:
+            code: 基金代码（6位数字）
+
+        Returns:
+            str: 基金简称，不存在返回None
+        """
+        self.ensure_loaded()
+        return self._names.get(code)
+
+    def get_frame(self) -> pd.DataFrame:
+        """
+        获取完整基金目录表
+
+        Returns:
+            pd.DataFrame: 列为 基金代码、基金简称、拼音缩写、基金类型
+        """
+        self.ensure_loaded()
+        return self._frame
+
+
+# 进程内共享的基金目录
+fund_directory = FundDirectory()
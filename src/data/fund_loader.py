@@ -1,9 +1,14 @@
 import yfinance as yf
 import pandas as pd
-import akshare as ak
 from typing import Dict, Any, Optional
 import datetime
 
+from src.data.fund_directory import fund_directory
+from src.data.holdings_store import fund_holdings_store
+from src.data.nav_store import fund_nav_store
+from src.data.stock import get_stock_history
+from src.data.symbol_metadata import symbol_metadata
+
 def is_cn_fund(ticker: str) -> bool:
     """
     Check if the ticker looks like a Chinese fund code (6 digits).
@@ -22,9 +27,23 @@ def get_fund_history(ticker: str, period: str = "6mo") -> pd.DataFrame:
     """
     if is_cn_fund(ticker):
         try:
-            # akshare: fund_open_fund_info_em is good for net value history
-            # Returns columns like: '净值日期', '单位净值', '日增长率', ...
-            df = ak.fund_open_fund_info_em(symbol=ticker, indicator="单位净值走势")
+            # Filter by period (approximate)
+            end_date = datetime.datetime.now()
+            if period == "1mo":
+                start_date = end_date - datetime.timedelta(days=30)
+            elif period == "3mo":
+                start_date = end_date - datetime.timedelta(days=90)
+            elif period == "6mo":
+                start_date = end_date - datetime.timedelta(days=180)
+            elif period == "1y":
+                start_date = end_date - datetime.timedelta(days=365)
+            else: # Max or others, default to 1y to be safe or just return all
+                start_date = end_date - datetime.timedelta(days=365)
+            
+            # Net value history comes from the local NAV store, which only
+            # fetches dates newer than what it already holds.
+            # Returns columns: '净值日期', '单位净值', '日增长率'
+            df = fund_nav_store.get_history(ticker, start_date=start_date, end_date=end_date)
             
             if df.empty:
                  return pd.DataFrame()
@@ -32,9 +51,9 @@ def get_fund_history(ticker: str, period: str = "6mo") -> pd.DataFrame:
             # Rename columns
             # '净值日期' -> Date (index)
             # '单位净值' -> Close
-            df['Date'] = pd.to_datetime(df['净值日期'])
+            df['Date'] = df['净值日期']
             df.set_index('Date', inplace=True)
-            df['Close'] = pd.to_numeric(df['单位净值'])
+            df['Close'] = df['单位净值']
             
             # For funds, we might not have High/Low/Open, so fill with Close
             df['Open'] = df['Close']
@@ -42,26 +61,7 @@ def get_fund_history(ticker: str, period: str = "6mo") -> pd.DataFrame:
             df['Low'] = df['Close']
             df['Volume'] = 0 
             
-            # Filter by period (approximate)
-            end_date = datetime.datetime.now()
-            if period == "1mo":
-                start_date = end_date - datetime.timedelta(days=30)
-            elif period == "3mo":
-                start_date = end_date - datetime.timedelta(days=90)
-            elif period == "6mo":
-                start_date = end_date - datetime.timedelta(days=180)
-            elif period == "1y":
-                start_date = end_date - datetime.timedelta(days=365)
-            else: # Max or others, default to 1y to be safe or just return all
-                start_date = end_date - datetime.timedelta(days=365)
-                
-            # Ensure index is sorted
-            df.sort_index(inplace=True)
-            
-            mask = (df.index >= start_date) & (df.index <= end_date)
-            df_filtered = df.loc[mask].copy()
-            
-            return df_filtered[['Open', 'High', 'Low', 'Close', 'Volume']]
+            return df[['Open', 'High', 'Low', 'Close', 'Volume']]
             
         except Exception as e:
             print(f"Error fetching data from akshare for {ticker}: {e}")
@@ -70,9 +70,7 @@ def get_fund_history(ticker: str, period: str = "6mo") -> pd.DataFrame:
     else:
         # Use yfinance
         try:
-            stock = yf.Ticker(ticker)
-            df = stock.history(period=period)
-            return df
+            return get_stock_history(ticker, period=period)
         except Exception as e:
             print(f"Error fetching data from yfinance for {ticker}: {e}")
             return pd.DataFrame()
@@ -86,19 +84,18 @@ def get_fund_info(ticker: str) -> Dict[str, Any]:
     if is_cn_fund(ticker):
         info["type"] = "CN Fund"
         try:
-            # Use akshare to get fund name
-            df = ak.fund_name_em()
-            match = df[df['基金代码'] == ticker]
-            if not match.empty:
-                info["name"] = match.iloc[0]['基金简称']
+            # Look up the fund name in the local fund directory
+            name = fund_directory.get_name(ticker)
+            if name:
+                info["name"] = name
         except Exception as e:
             print(f"Error fetching CN fund info for {ticker}: {e}")
     else:
         try:
-             stock = yf.Ticker(ticker)
-             y_info = stock.info
-             info["name"] = y_info.get("longName", ticker)
-             info["type"] = y_info.get("quoteType", "Stock")
+             # Name and quote type come from the persistent symbol metadata cache
+             meta = symbol_metadata.get(ticker, wait=True) or {}
+             info["name"] = meta.get("name") or ticker
+             info["type"] = meta.get("quote_type") or "Stock"
         except:
              pass
              
@@ -110,22 +107,14 @@ def get_fund_holdings(ticker: str) -> list:
     Returns a list of dicts with keys: symbol, name, weight.
     
     For US ETFs: Uses yfinance.
-    For CN Funds: Uses akshare (if available).
+    For CN Funds: Uses the local per-quarter holdings store (akshare).
     """
     holdings = []
     
     if is_cn_fund(ticker):
         try:
-            # akshare: fund_portfolio_hold_em for CN fund holdings
-            df = ak.fund_portfolio_hold_em(symbol=ticker, date="2024")
-            if not df.empty:
-                # Columns: '序号', '股票代码', '股票名称', '占净值比例', '持仓市值', '季度'
-                for _, row in df.head(20).iterrows():  # Top 20 holdings
-                    holdings.append({
-                        "symbol": str(row.get('股票代码', '')),
-                        "name": str(row.get('股票名称', '')),
-                        "weight": float(row.get('占净值比例', 0)) if row.get('占净值比例') else 0.0
-                    })
+            # Holdings are cached per (fund, reporting quarter); only newly disclosed quarters are downloaded
+            _, holdings = fund_holdings_store.get_latest(ticker, top_n=20)  # Top 20 holdings
         except Exception as e:
             print(f"Error fetching CN fund holdings for {ticker}: {e}")
     else:
@@ -139,9 +128,9 @@ def get_fund_holdings(ticker: str) -> list:
                 # This doesn't give individual stocks, so we try another approach
                 pass
             
-            # Try to get fund info which sometimes has holdings
-            info = stock.info
-            if info.get("quoteType") == "ETF":
+            # Quote type comes from the symbol metadata cache instead of a fresh .info call
+            meta = symbol_metadata.get(ticker, wait=True) or {}
+            if meta.get("quote_type") == "ETF":
                 # For ETFs, yfinance doesn't directly provide holdings
                 # We can use a workaround or note this limitation
                 # For now, return empty and log
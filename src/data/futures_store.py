@@ -0,0 +1,281 @@
+"""
+国内期货主力连续K线本地存储模块
+futures_main_sina 每次都会返回品种上市以来的全部日K，
+这里把日K以数值类型保存在本地 SQLite 中：首次全量加载，之后只追加最后一个交易日之后的数据，
+并根据持仓量突变识别主力合约换月，记录换月日期和价差
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import akshare as ak
+import pandas as pd
+
+from src.data.single_flight import SingleFlight
+
+FUTURES_BAR_DB_FILE = os.path.join(os.path.dirname(__file__), '../../data/cache/futures_bars.db')
+
+# 同一品种两次从网络更新的最小间隔（秒）
+FUTURES_REFRESH_SECONDS = float(os.getenv("FUTURES_REFRESH_SECONDS", "1800"))
+
+# 持仓量相对前一交易日变化超过该比例视为主力合约换月
+FUTURES_ROLL_OI_CHANGE = float(os.getenv("FUTURES_ROLL_OI_CHANGE", "0.3"))
+
+# akshare 列名 → 本地列名
+COLUMN_MAP = {
+    "日期": "Date",
+    "开盘价": "Open",
+    "最高价": "High",
+    "最低价": "Low",
+    "收盘价": "Close",
+    "成交量": "Volume",
+    "持仓量": "OpenInterest",
+    "动态结算价": "Settlement",
+}
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "OpenInterest", "Settlement"]
+
+
+def detect_rolls(df: pd.DataFrame, threshold: float = FUTURES_ROLL_OI_CHANGE) -> List[Tuple[str, float, float, float]]:
+    """
+    根据持仓量突变识别换月
+
+    Args:
+        df: 按日期升序的日K（Date 索引，含 Close、Open、OpenInterest）
+        threshold: 持仓量变化比例阈值
+
+    Returns:
+        list: [(换月日期, 换月前持仓量, 换月后持仓量, 价差(当日开盘 - 前一日收盘))]
+    """
+    rolls = []
+    prev = None
+    for ts, bar in df.iterrows():
+        if prev is not None and prev["OpenInterest"] and not pd.isna(bar["OpenInterest"]):
+            change = abs(bar["OpenInterest"] / prev["OpenInterest"] - 1)
+            if change >= threshold:
+                rolls.append((
+                    ts.strftime("%Y-%m-%d"),
+                    float(prev["OpenInterest"]),
+                    float(bar["OpenInterest"]),
+                    float(bar["Open"] - prev["Close"])
+                ))
+        prev = bar
+    return rolls
+
+
+class FuturesBarStore:
+    """
+    按品种存储主力连续日K，支持增量追加和换月记录
+
+    核心属性：
+        - path (str): SQLite 文件路径
+        - refresh_seconds (float): 同一品种两次网络更新的最小间隔
+
+    使用示例：
+        store = FuturesBarStore()
+        df = store.get_history("RB0")
+        rolls = store.get_rolls("RB0")
+    """
+
+    def __init__(self, path: str = FUTURES_BAR_DB_FILE, refresh_seconds: float = FUTURES_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        # 同一品种的并发更新合并为一次（按品种代码，不同品种互不阻塞）
+        self._inflight = SingleFlight()
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """每次调用新建连接（保证多线程安全），正常退出时提交并关闭"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建K线表、换月表和元数据表"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS futures_bars (
+                    symbol TEXT NOT NULL,
+                    bar_date TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    open_interest REAL,
+                    settlement REAL,
+                    PRIMARY KEY (symbol, bar_date)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS futures_rolls (
+                    symbol TEXT NOT NULL,
+                    roll_date TEXT NOT NULL,
+                    oi_before REAL,
+                    oi_after REAL,
+                    price_gap REAL,
+                    PRIMARY KEY (symbol, roll_date)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS futures_meta (
+                    symbol TEXT PRIMARY KEY,
+                    last_fetched_at REAL NOT NULL
+                )
+            """)
+
+    def get_last_date(self, symbol: str) -> Optional[str]:
+        """本地已存储的最后一个交易日（YYYY-MM-DD），无数据返回None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(bar_date) FROM futures_bars WHERE symbol = ?", (symbol,)).fetchone()
+        return row[0] if row else None
+
+    def _last_fetched_at(self, symbol: str) -> Optional[float]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_fetched_at FROM futures_meta WHERE symbol = ?", (symbol,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _fetch(symbol: str, start_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        通过 akshare 拉取主力连续日K
+
+        Args:
+            symbol: 品种代码（如 RB0）
+            start_date: 起始日期（YYYY-MM-DD，含），None 表示全部
+
+        Returns:
+            pd.DataFrame: Date 索引，列为 BAR_COLUMNS（数值类型）
+        """
+        if start_date:
+            df = ak.futures_main_sina(symbol=symbol, start_date=start_date.replace("-", ""))
+        else:
+            df = ak.futures_main_sina(symbol=symbol)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        df = df.rename(columns=COLUMN_MAP)
+        df["Date"] = pd.to_datetime(df["Date"])
+        df = df.set_index("Date").reindex(columns=BAR_COLUMNS)
+        return df.apply(pd.to_numeric, errors="coerce").dropna(subset=["Close"]).sort_index()
+
+    def update(self, symbol: str, force: bool = False) -> int:
+        """
+        增量更新：首次全量加载，之后从最后一个交易日（含，可能是盘中数据）开始追加
+
+        Args:
+            symbol: 品种代码
+            force: 是否忽略刷新间隔立即更新
+
+        Returns:
+            int: 写入（含覆盖最后一个交易日）的K线条数
+        """
+        return self._inflight.do(symbol, self._update, symbol, force)
+
+    def _update(self, symbol: str, force: bool = False) -> int:
+        """执行一次更新（由 update 按品种代码合并并发调用）"""
+        fetched_at = self._last_fetched_at(symbol)
+        if not force and fetched_at and time.time() - fetched_at < self.refresh_seconds:
+            return 0
+
+        last_date = self.get_last_date(symbol)
+        df = self._fetch(symbol, start_date=last_date)
+        if last_date is not None:
+            df = df[df.index >= pd.Timestamp(last_date)]
+
+        # 换月识别需要和已有的最后一根K线衔接（重新拉取到的最后交易日以新数据为准）
+        context = self.read_range(symbol, end_date=last_date).tail(1) if last_date else df.iloc[:0]
+        rolls = detect_rolls(pd.concat([context[~context.index.isin(df.index)], df]))
+
+        rows = [
+            (symbol, ts.strftime("%Y-%m-%d"), *[None if pd.isna(v) else float(v) for v in bar])
+            for ts, bar in zip(df.index, df[BAR_COLUMNS].itertuples(index=False))
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO futures_bars "
+                "(symbol, bar_date, open, high, low, close, volume, open_interest, settlement) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO futures_rolls (symbol, roll_date, oi_before, oi_after, price_gap) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(symbol, *roll) for roll in rolls]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO futures_meta (symbol, last_fetched_at) VALUES (?, ?)",
+                (symbol, time.time())
+            )
+        return len(rows)
+
+    def read_range(self, symbol: str, start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> pd.DataFrame:
+        """读取本地 [start_date, end_date] 的日K（Date 索引，数值列）"""
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT bar_date AS Date, open AS Open, high AS High, low AS Low, close AS Close, "
+                "volume AS Volume, open_interest AS OpenInterest, settlement AS Settlement "
+                "FROM futures_bars WHERE symbol = ? AND bar_date BETWEEN ? AND ? ORDER BY bar_date",
+                conn, params=(symbol, start_date or "0000-00-00", end_date or "9999-99-99")
+            )
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.set_index("Date").astype("float64")
+
+    def get_rolls(self, symbol: str) -> pd.DataFrame:
+        """
+        读取换月记录
+
+        Returns:
+            pd.DataFrame: 列为 roll_date、oi_before、oi_after、price_gap，按日期升序
+        """
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT roll_date, oi_before, oi_after, price_gap FROM futures_rolls "
+                "WHERE symbol = ? ORDER BY roll_date",
+                conn, params=(symbol,)
+            )
+        df["roll_date"] = pd.to_datetime(df["roll_date"])
+        return df
+
+    def get_history(self, symbol: str, start_date: Optional[datetime] = None,
+                    refresh: bool = True, adjusted: bool = False) -> pd.DataFrame:
+        """
+        读取主力连续日K
+
+        Args:
+            symbol: 品种代码（如 RB0）
+            start_date: 起始日期（含），None 表示全部
+            refresh: 读取前是否先做一次增量更新
+            adjusted: 是否按换月价差做后复权（消除换月跳空，最新价格不变）
+
+        Returns:
+            pd.DataFrame: Date 索引，列为 Open、High、Low、Close、Volume、OpenInterest、Settlement
+        """
+        if refresh:
+            try:
+                self.update(symbol)
+            except Exception as e:
+                print(f"更新期货K线失败 {symbol}: {e}")
+
+        df = self.read_range(symbol, start_date=start_date.strftime("%Y-%m-%d") if start_date else None)
+        if adjusted and not df.empty:
+            df = df.copy()
+            offset = pd.Series(0.0, index=df.index)
+            for roll in self.get_rolls(symbol).itertuples(index=False):
+                # 换月之前的价格整体平移该次换月的价差
+                offset[df.index < roll.roll_date] += roll.price_gap
+            for column in ["Open", "High", "Low", "Close", "Settlement"]:
+                df[column] = df[column] + offset
+        return df
+
+
+# 进程内共享的期货K线库
+futures_bar_store = FuturesBarStore()
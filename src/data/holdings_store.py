@@ -0,0 +1,246 @@
+"""
+基金持仓本地存储模块
+按 (基金代码, 报告季度) 保存前十大持仓：
+季报在季度结束后一段时间才会披露，只有预计有新季度披露、且本地还没有该季度时才访问网络，
+已存储的季度不再重复下载
+"""
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import akshare as ak
+import pandas as pd
+
+from src.data.single_flight import SingleFlight
+
+FUND_HOLDINGS_DB_FILE = os.path.join(os.path.dirname(__file__), '../../data/cache/fund_holdings.db')
+
+# 季度结束后预计完成披露的天数（季报须在季度结束后15个工作日内公布）
+HOLDINGS_DISCLOSURE_LAG_DAYS = int(os.getenv("HOLDINGS_DISCLOSURE_LAG_DAYS", "25"))
+
+# 预计季度已过披露期但尚未拉取到时，两次检查的最小间隔（秒）
+HOLDINGS_RECHECK_SECONDS = float(os.getenv("HOLDINGS_RECHECK_SECONDS", str(12 * 3600)))
+
+# 季度列格式：2024年3季度股票投资明细
+_QUARTER_PATTERN = re.compile(r"(\d{4})年\s*(\d)季度")
+
+
+def parse_quarter(label: str) -> Optional[str]:
+    """将 akshare 的季度列（如 “2024年3季度股票投资明细”）转换为 “2024Q3”"""
+    match = _QUARTER_PATTERN.search(str(label))
+    if not match:
+        return None
+    return f"{match.group(1)}Q{match.group(2)}"
+
+
+def quarter_end(quarter: str) -> date:
+    """季度最后一天"""
+    year, q = int(quarter[:4]), int(quarter[-1])
+    if q == 4:
+        return date(year, 12, 31)
+    return date(year, q * 3 + 1, 1) - timedelta(days=1)
+
+
+def expected_latest_quarter(today: Optional[date] = None) -> str:
+    """
+    按披露时间推算当前应已公布的最新季度
+
+    例如披露延迟为25天时，10月25日之前最新季度为二季度，之后为三季度
+    """
+    today = today or date.today()
+    year, q = today.year, (today.month - 1) // 3 + 1
+    # 从上一个已结束的季度往前找第一个已过披露期的季度
+    for _ in range(4):
+        q -= 1
+        if q == 0:
+            year, q = year - 1, 4
+        quarter = f"{year}Q{q}"
+        if quarter_end(quarter) + timedelta(days=HOLDINGS_DISCLOSURE_LAG_DAYS) <= today:
+            return quarter
+    return quarter
+
+
+class FundHoldingsStore:
+    """
+    按 (基金代码, 季度) 存储的持仓库，只下载新披露的季度
+
+    核心属性：
+        - path (str): SQLite 文件路径
+        - recheck_seconds (float): 新季度尚未出现时的重试间隔
+
+    使用示例：
+        store = FundHoldingsStore()
+        quarter, holdings = store.get_latest("161725")
+    """
+
+    def __init__(self, path: str = FUND_HOLDINGS_DB_FILE, recheck_seconds: float = HOLDINGS_RECHECK_SECONDS):
+        self.path = path
+        self.recheck_seconds = recheck_seconds
+        # 同一基金的并发更新合并为一次（按基金代码，不同基金互不阻塞）
+        self._inflight = SingleFlight()
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """每次调用新建连接（保证多线程安全），正常退出时提交并关闭"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建持仓表和检查记录表"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fund_holdings (
+                    code TEXT NOT NULL,
+                    quarter TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    stock_symbol TEXT NOT NULL,
+                    stock_name TEXT,
+                    weight REAL,
+                    PRIMARY KEY (code, quarter, stock_symbol)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fund_holdings_meta (
+                    code TEXT PRIMARY KEY,
+                    last_checked_at REAL NOT NULL,
+                    checked_quarter TEXT NOT NULL
+                )
+            """)
+
+    def latest_quarter(self, code: str) -> Optional[str]:
+        """本地已存储的最新季度，无数据返回None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(quarter) FROM fund_holdings WHERE code = ?", (code,)).fetchone()
+        return row[0] if row else None
+
+    def _last_check(self, code: str) -> Tuple[Optional[float], Optional[str]]:
+        """上次检查的时间戳及当时预计的最新季度"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT last_checked_at, checked_quarter FROM fund_holdings_meta WHERE code = ?", (code,)
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    @staticmethod
+    def _fetch_year(code: str, year: int) -> Dict[str, List[Tuple[str, str, float]]]:
+        """
+        拉取某一年披露的全部季度持仓
+
+        Returns:
+            dict: {季度: [(股票代码, 股票名称, 占净值比例)]}，按原始顺序
+        """
+        df = ak.fund_portfolio_hold_em(symbol=code, date=str(year))
+        quarters: Dict[str, List[Tuple[str, str, float]]] = {}
+        if df is None or df.empty:
+            return quarters
+        for row in df.to_dict("records"):
+            quarter = parse_quarter(row.get('季度', ''))
+            if quarter is None:
+                continue
+            weight = pd.to_numeric(row.get('占净值比例'), errors="coerce")
+            quarters.setdefault(quarter, []).append((
+                str(row.get('股票代码', '')),
+                str(row.get('股票名称', '')),
+                0.0 if pd.isna(weight) else float(weight)
+            ))
+        return quarters
+
+    def update(self, code: str, force: bool = False, today: Optional[date] = None) -> List[str]:
+        """
+        只在预计有新季度披露时下载，并只写入本地没有的季度
+
+        Args:
+            code: 基金代码
+            force: 是否忽略披露时间和重试间隔立即检查
+            today: 当前日期（测试用）
+
+        Returns:
+            list: 新写入的季度
+        """
+        return self._inflight.do(code, self._update, code, force, today)
+
+    def _update(self, code: str, force: bool = False, today: Optional[date] = None) -> List[str]:
+        """执行一次更新（由 update 按基金代码合并并发调用）"""
+        expected = expected_latest_quarter(today)
+        stored = self.latest_quarter(code)
+        if not force:
+            if stored is not None and stored >= expected:
+                return []
+            # 同一个预计季度在重试间隔内只检查一次
+            checked_at, checked_quarter = self._last_check(code)
+            if checked_quarter == expected and time.time() - checked_at < self.recheck_seconds:
+                return []
+
+        # 从本地最新季度所在年份（首次为预计季度的上一年，以覆盖年初尚无披露的情况）下载到预计季度所在年份
+        end_year = int(expected[:4])
+        start_year = int(stored[:4]) if stored else end_year - 1
+        fetched: Dict[str, List[Tuple[str, str, float]]] = {}
+        for year in range(start_year, end_year + 1):
+            fetched.update(self._fetch_year(code, year))
+
+        new_quarters = sorted(q for q in fetched if stored is None or q > stored)
+        if stored is None and new_quarters:
+            # 首次加载只保留最新一个季度
+            new_quarters = new_quarters[-1:]
+
+        with self._connect() as conn:
+            for quarter in new_quarters:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fund_holdings (code, quarter, rank, stock_symbol, stock_name, weight) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(code, quarter, i, s, n, w) for i, (s, n, w) in enumerate(fetched[quarter])]
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO fund_holdings_meta (code, last_checked_at, checked_quarter) "
+                "VALUES (?, ?, ?)",
+                (code, time.time(), expected)
+            )
+        return new_quarters
+
+    def get_quarter(self, code: str, quarter: str, top_n: int = 20) -> List[Dict[str, object]]:
+        """读取指定季度的持仓（按披露顺序）"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stock_symbol, stock_name, weight FROM fund_holdings "
+                "WHERE code = ? AND quarter = ? ORDER BY rank LIMIT ?",
+                (code, quarter, top_n)
+            ).fetchall()
+        return [{"symbol": s, "name": n, "weight": w or 0.0} for s, n, w in rows]
+
+    def get_latest(self, code: str, top_n: int = 20, refresh: bool = True) -> Tuple[Optional[str], List[Dict[str, object]]]:
+        """
+        读取最新季度的持仓
+
+        Args:
+            code: 基金代码
+            top_n: 最多返回条数
+            refresh: 读取前是否先检查新披露的季度
+
+        Returns:
+            (季度, [{"symbol", "name", "weight"}])，无数据时为 (None, [])
+        """
+        if refresh:
+            try:
+                self.update(code)
+            except Exception as e:
+                print(f"更新基金持仓失败 {code}: {e}")
+
+        quarter = self.latest_quarter(code)
+        if quarter is None:
+            return None, []
+        return quarter, self.get_quarter(code, quarter, top_n)
+
+
+# 进程内共享的基金持仓存储
+fund_holdings_store = FundHoldingsStore()
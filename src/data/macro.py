@@ -1,6 +1,8 @@
 import yfinance as yf
 import pandas as pd
 
+from src.data.price_panel import get_price_panel, latest_closes
+
 MACRO_TICKERS = {
     "S&P 500": "^GSPC",
     "Dow Jones": "^DJI",
@@ -14,15 +16,13 @@ MACRO_TICKERS = {
 def get_macro_summary() -> pd.DataFrame:
     """
     Fetches the latest prices for key macroeconomic indicators.
+    All tickers are downloaded in one batch and cached (see price_panel).
     """
-    data = {}
-    for name, ticker in MACRO_TICKERS.items():
-        t = yf.Ticker(ticker)
-        hist = t.history(period="1d")
-        if not hist.empty:
-            data[name] = hist["Close"].iloc[-1]
-        else:
-            data[name] = None
+    closes = latest_closes(get_price_panel(list(MACRO_TICKERS.values()), period="5d"))
+    data = {
+        name: closes[ticker]["close"] if ticker in closes else None
+        for name, ticker in MACRO_TICKERS.items()
+    }
     
     return pd.DataFrame(list(data.items()), columns=["Indicator", "Value"])
 
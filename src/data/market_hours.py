@@ -0,0 +1,209 @@
+"""
+交易时段模块
+各市场的时区与连续交易时段，以及按交易日历（节假日、半日市）判断当前是否开市、
+计算下一个交易时段的开始和结束时间，
+供行情缓存按市场开闭状态设置过期时间（交易时段内短缓存，休市后缓存到下一个交易时段开始），
+也供轮询服务在休市期间休眠到下一个交易时段
+"""
+import json
+import os
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# 各市场的时区与连续交易时段
+MARKET_SESSIONS = {
+    "US": ("America/New_York", [(dt_time(9, 30), dt_time(16, 0))]),
+    "CN": ("Asia/Shanghai", [(dt_time(9, 30), dt_time(11, 30)), (dt_time(13, 0), dt_time(15, 0))]),
+    "HK": ("Asia/Hong_Kong", [(dt_time(9, 30), dt_time(12, 0)), (dt_time(13, 0), dt_time(16, 0))]),
+}
+
+# 交易时段内的行情缓存时间（秒）
+QUOTE_OPEN_TTL = float(os.getenv("QUOTE_OPEN_TTL", "60"))
+# 收盘后仍按交易时段缓存的时间（秒），确保拿到收盘集合竞价后的最终价格
+QUOTE_CLOSE_GRACE_SECONDS = float(os.getenv("QUOTE_CLOSE_GRACE_SECONDS", "300"))
+
+# 交易日历配置：{市场: {"holidays": [休市日期], "half_days": {日期: 提前收盘时间}}}，需每年更新；
+# 未列出的日期按工作日规则处理
+TRADING_CALENDAR_FILE = os.getenv(
+    "TRADING_CALENDAR_FILE",
+    os.path.join(os.path.dirname(__file__), '../../data/trading_calendar.json')
+)
+
+# 查找前后交易时段时最多跨越的天数（覆盖春节、国庆等长假）
+CALENDAR_SEARCH_DAYS = 20
+
+
+class TradingCalendar:
+    """
+    交易日历：各市场的休市日和半日市
+
+    核心属性：
+        - holidays (dict): {市场: 休市日期集合}
+        - half_days (dict): {市场: {日期: 提前收盘时间}}
+        - last_year (dict): {市场: 日历覆盖的最后一年}，之后的日期只按工作日判断并打印一次警告
+
+    使用示例：
+        trading_calendar.is_open("CN")
+        trading_calendar.next_open("HK")      # 下一个交易时段开始时间（市场所在时区）
+        trading_calendar.last_close("US")     # 最近一个已结束交易时段的收盘时间
+    """
+
+    def __init__(self, path: Optional[str] = TRADING_CALENDAR_FILE):
+        self.holidays: Dict[str, set] = {}
+        self.half_days: Dict[str, Dict[date, dt_time]] = {}
+        self.last_year: Dict[str, int] = {}
+        # 已警告过超出日历范围的 (市场, 年份)
+        self._warned: set = set()
+        if path:
+            self.load(path)
+
+    def load(self, path: str):
+        """从 JSON 文件加载交易日历，文件不存在或格式错误时只按工作日规则判断"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            print(f"交易日历文件不存在: {path}，只按工作日判断交易日")
+            return
+        except (OSError, ValueError) as e:
+            print(f"交易日历加载失败: {e}，只按工作日判断交易日")
+            return
+        for market, entry in config.items():
+            self.holidays[market] = {date.fromisoformat(d) for d in entry.get("holidays", [])}
+            self.half_days[market] = {
+                date.fromisoformat(d): dt_time.fromisoformat(close)
+                for d, close in entry.get("half_days", {}).items()
+            }
+            years = [d.year for d in self.holidays[market]] + [d.year for d in self.half_days[market]]
+            if years:
+                self.last_year[market] = max(years)
+
+    def is_trading_day(self, market: str, day: date) -> bool:
+        """是否为交易日（工作日且不在休市日列表中）"""
+        last_year = self.last_year.get(market)
+        if last_year is not None and day.year > last_year and (market, day.year) not in self._warned:
+            self._warned.add((market, day.year))
+            print(f"交易日历只覆盖到 {last_year} 年，{market} {day.year} 年的节假日未配置，只按工作日判断交易日")
+        return day.weekday() < 5 and day not in self.holidays.get(market, set())
+
+    def sessions(self, market: str, day: date) -> List[Tuple[datetime, datetime]]:
+        """
+        某个交易日的交易时段（半日市按提前收盘时间截断）
+
+        Args:
+            market: 市场（US、CN、HK）
+            day: 市场所在时区的日期
+
+        Returns:
+            list: [(开始时间, 结束时间)]，带市场时区；非交易日返回空列表
+        """
+        if not self.is_trading_day(market, day):
+            return []
+        tz_name, sessions = MARKET_SESSIONS[market]
+        tz = ZoneInfo(tz_name)
+        early_close = self.half_days.get(market, {}).get(day)
+        result = []
+        for start, end in sessions:
+            if early_close is not None:
+                if start >= early_close:
+                    continue
+                end = min(end, early_close)
+            result.append((datetime.combine(day, start, tzinfo=tz), datetime.combine(day, end, tzinfo=tz)))
+        return result
+
+    def current_session(self, market: str, now: Optional[datetime] = None) -> Optional[Tuple[datetime, datetime]]:
+        """当前所处的交易时段，不在交易时段内返回 None"""
+        local = _local_now(market, now)
+        for start, end in self.sessions(market, local.date()):
+            if start <= local < end:
+                return start, end
+        return None
+
+    def is_open(self, market: str, now: Optional[datetime] = None) -> bool:
+        """当前是否处于交易时段"""
+        return self.current_session(market, now) is not None
+
+    def next_open(self, market: str, now: Optional[datetime] = None) -> datetime:
+        """下一个交易时段的开始时间（正处于交易时段时返回之后的下一个时段）"""
+        local = _local_now(market, now)
+        for offset in range(CALENDAR_SEARCH_DAYS):
+            for start, _ in self.sessions(market, local.date() + timedelta(days=offset)):
+                if start > local:
+                    return start
+        raise RuntimeError(f"找不到 {market} 的下一个交易时段")
+
+    def last_close(self, market: str, now: Optional[datetime] = None) -> Optional[datetime]:
+        """最近一个已结束交易时段的结束时间（不晚于 now），找不到返回 None"""
+        local = _local_now(market, now)
+        for offset in range(CALENDAR_SEARCH_DAYS):
+            ends = [end for _, end in self.sessions(market, local.date() - timedelta(days=offset)) if end <= local]
+            if ends:
+                return max(ends)
+        return None
+
+
+def _local_now(market: str, now: Optional[datetime] = None) -> datetime:
+    """市场所在时区的当前时间"""
+    tz_name, _ = MARKET_SESSIONS[market]
+    return (now or datetime.now(ZoneInfo("UTC"))).astimezone(ZoneInfo(tz_name))
+
+
+def is_market_open(market: str, now: Optional[datetime] = None) -> bool:
+    """
+    判断市场当前是否处于交易时段（按交易日历排除节假日，半日市提前收盘）
+
+    Args:
+        market: 市场（US、CN、HK）
+        now: 判断时刻（带时区），None 表示当前时间
+    """
+    return trading_calendar.is_open(market, now)
+
+
+def in_close_grace(market: str, now: Optional[datetime] = None,
+                   grace_seconds: float = QUOTE_CLOSE_GRACE_SECONDS) -> bool:
+    """是否处于某个交易时段结束后的宽限期内"""
+    local = _local_now(market, now)
+    last_close = trading_calendar.last_close(market, local)
+    return last_close is not None and local < last_close + timedelta(seconds=grace_seconds)
+
+
+def next_session_open(market: str, now: Optional[datetime] = None) -> datetime:
+    """
+    下一个交易时段的开始时间（市场所在时区；正处于交易时段时返回之后的下一个时段）
+
+    Args:
+        market: 市场（US、CN、HK）
+        now: 当前时刻（带时区），None 表示当前时间
+    """
+    return trading_calendar.next_open(market, now)
+
+
+def seconds_until_next_open(market: str, now: Optional[datetime] = None) -> float:
+    """距下一个交易时段开始的秒数"""
+    local = _local_now(market, now)
+    return (next_session_open(market, local) - local).total_seconds()
+
+
+def is_round_the_clock(symbol: str) -> bool:
+    """期货（=F）、外汇（=X）和加密货币（-USD）几乎全天交易，不按股票交易时段缓存"""
+    upper = symbol.upper()
+    return "=" in upper or upper.endswith("-USD")
+
+
+def quote_ttl(market: str, now: Optional[datetime] = None, open_ttl: float = QUOTE_OPEN_TTL) -> float:
+    """
+    行情缓存时间：交易时段内（含收盘宽限期）为 open_ttl，休市时缓存到下一个交易时段开始
+
+    Args:
+        market: 市场（US、CN、HK）
+        now: 当前时刻（带时区），None 表示当前时间
+        open_ttl: 交易时段内的缓存时间（秒）
+    """
+    if is_market_open(market, now) or in_close_grace(market, now):
+        return open_ttl
+    return max(open_ttl, seconds_until_next_open(market, now))
+
+
+# 全局交易日历
+trading_calendar = TradingCalendar()
@@ -0,0 +1,175 @@
+"""
+全市场行情快照模块
+akshare 的全市场接口每次都会返回整张行情表，
+这里在进程内共享一份按代码索引的快照，在TTL内所有调用方复用同一份数据
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import akshare as ak
+import pandas as pd
+
+from src.data.circuit_breaker import CircuitBreaker, get_breaker
+
+# 快照有效期（秒），可通过环境变量调整
+A_SHARE_SNAPSHOT_TTL = float(os.getenv("A_SHARE_SNAPSHOT_TTL", "60"))
+# 刷新失败或熔断时旧快照最多可继续使用的时间（秒），默认3倍有效期，超过后不再返回数据
+A_SHARE_SNAPSHOT_MAX_STALENESS = float(os.getenv("A_SHARE_SNAPSHOT_MAX_STALENESS", str(3 * A_SHARE_SNAPSHOT_TTL)))
+# 刷新失败后至少间隔多久再重试（秒），期间的读取直接使用旧快照或返回None，不再排队等待下载
+A_SHARE_SNAPSHOT_RETRY_SECONDS = float(os.getenv("A_SHARE_SNAPSHOT_RETRY_SECONDS", "15"))
+
+
+class MarketSnapshot:
+    """
+    按代码索引的全市场行情快照，过期后在下一次访问时整体刷新
+
+    核心属性：
+        - loader (Callable): 返回全市场行情 DataFrame 的函数
+        - key_column (str): 用于建立索引的代码列
+        - ttl_seconds (float): 快照有效期（秒）
+        - breaker (CircuitBreaker): 数据源熔断器（可选），熔断期间不刷新、继续使用旧快照
+        - max_staleness (float): 旧快照最多可继续使用的时间（秒），超过后 get 返回None，由调用方改用其他数据源
+        - retry_seconds (float): 刷新失败后的重试间隔（秒），期间不再请求数据源
+
+    使用示例：
+        snapshot = MarketSnapshot(ak.stock_zh_a_spot_em, key_column="代码")
+        row = snapshot.get("600519")
+    """
+
+    def __init__(self, loader: Callable[[], pd.DataFrame], key_column: str = "代码",
+                 ttl_seconds: float = A_SHARE_SNAPSHOT_TTL, breaker: Optional[CircuitBreaker] = None,
+                 max_staleness: float = A_SHARE_SNAPSHOT_MAX_STALENESS,
+                 retry_seconds: float = A_SHARE_SNAPSHOT_RETRY_SECONDS):
+        self.loader = loader
+        self.key_column = key_column
+        self.ttl_seconds = ttl_seconds
+        self.breaker = breaker
+        self.max_staleness = max_staleness
+        self.retry_seconds = retry_seconds
+        self._index: Dict[str, Dict[str, Any]] = {}
+        # 有效期的起点（invalidate 时清空）与当前快照实际下载的时间
+        self._loaded_at: Optional[float] = None
+        self._built_at: Optional[float] = None
+        # 上次刷新失败后允许再次请求数据源的时间（None 表示无需等待）
+        self._retry_at: Optional[float] = None
+        # 刷新时持有锁，避免并发调用方同时下载整张表
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "refresh_skipped": 0,
+            "stale_rejected": 0,
+            "last_refresh_seconds": 0.0,
+            "total_refresh_seconds": 0.0
+        }
+
+    def _is_fresh(self) -> bool:
+        """判断当前快照是否仍在有效期内"""
+        if self._loaded_at is None:
+            return False
+        return (time.monotonic() - self._loaded_at) < self.ttl_seconds
+
+    def age_seconds(self) -> Optional[float]:
+        """当前快照距下载时的秒数，尚无快照时返回None"""
+        if self._built_at is None:
+            return None
+        return time.monotonic() - self._built_at
+
+    def refresh(self) -> Tuple[bool, bool]:
+        """
+        立即重新下载全市场行情并重建索引
+
+        Returns:
+            tuple: (刷新是否成功, 是否请求了数据源)，失败或数据源熔断时保留旧快照
+        """
+        if self.breaker is not None and not self.breaker.allow_request():
+            self._stats["refresh_skipped"] += 1
+            return False, False
+
+        start = time.perf_counter()
+        try:
+            df = self.loader()
+        except Exception as e:
+            self._stats["refresh_errors"] += 1
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            self._retry_at = time.monotonic() + self.retry_seconds
+            print(f"全市场快照刷新失败: {e}")
+            return False, True
+
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+        self._index = {str(row[self.key_column]): row for row in df.to_dict("records")}
+        self._loaded_at = time.monotonic()
+        self._built_at = self._loaded_at
+        self._retry_at = None
+
+        elapsed = time.perf_counter() - start
+        self._stats["refreshes"] += 1
+        self._stats["last_refresh_seconds"] = elapsed
+        self._stats["total_refresh_seconds"] += elapsed
+        return True, True
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        按代码获取一行行情数据，快照过期时先刷新
+
+        Args:
+            code: 证券代码
+
+        Returns:
+            dict: 行情数据行，快照中不存在或旧快照超过最长可用时间时返回None
+        """
+        return self.lookup(code)[0]
+
+    def lookup(self, code: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        同 get，并返回本次是否实际下载了全市场行情（快照有效、熔断或等待重试时为False）
+
+        Returns:
+            tuple: (行情数据行或None, 是否请求了数据源)
+        """
+        with self._lock:
+            if self._is_fresh():
+                self._stats["hits"] += 1
+                return self._index.get(code), False
+            self._stats["misses"] += 1
+            if self._retry_at is not None and time.monotonic() < self._retry_at:
+                # 上次刷新刚失败：不重复下载，直接按旧快照处理
+                self._stats["refresh_skipped"] += 1
+                refreshed, requested = False, False
+            else:
+                refreshed, requested = self.refresh()
+            if not refreshed:
+                age = self.age_seconds()
+                if age is None or age > self.max_staleness:
+                    self._stats["stale_rejected"] += 1
+                    return None, requested
+            return self._index.get(code), requested
+
+    def invalidate(self):
+        """使当前快照失效，下次访问时重新下载（同时取消失败后的重试等待）"""
+        with self._lock:
+            self._loaded_at = None
+            self._retry_at = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取快照统计信息
+
+        Returns:
+            dict: 命中/未命中次数、刷新次数与耗时、当前快照行数与年龄
+        """
+        stats = dict(self._stats)
+        stats["rows"] = len(self._index)
+        stats["age_seconds"] = self.age_seconds()
+        return stats
+
+
+# 进程内共享的A股全市场快照（东方财富）
+a_share_snapshot = MarketSnapshot(ak.stock_zh_a_spot_em, key_column="代码", breaker=get_breaker("east_money"))
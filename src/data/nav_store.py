@@ -0,0 +1,478 @@
+"""
+基金净值本地存储模块
+fund_open_fund_info_em 每次都会返回基金成立以来的全部净值，
+这里把净值历史保存在本地 SQLite 中：首次全量加载，之后只拉取最后一个净值日期之后的数据，
+区间查询直接在本地按日期范围扫描；
+另外每个净值公布窗口只下载一次全市场开放式基金净值表（fund_open_fund_daily_em），
+任意数量基金的最新净值、前一净值和日增长率都从这一份快照读取
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import akshare as ak
+import pandas as pd
+
+from src.data.fetch_engine import fetch_engine
+from src.data.market_hours import trading_calendar
+from src.data.single_flight import SingleFlight
+
+FUND_NAV_DB_FILE = os.path.join(os.path.dirname(__file__), '../../data/cache/fund_nav.db')
+
+# 同一基金两次增量更新的最小间隔（秒）
+FUND_NAV_REFRESH_SECONDS = float(os.getenv("FUND_NAV_REFRESH_SECONDS", "3600"))
+
+# 东方财富历史净值分页接口（支持起止日期，用于增量拉取）
+EAST_MONEY_NAV_URL = "https://api.fund.eastmoney.com/f10/lsjz"
+EAST_MONEY_NAV_PAGE_SIZE = 20
+
+# 净值公布窗口：交易日晚间开始陆续公布（北京时间），窗口开始后全市场净值表只需下载一次
+FUND_NAV_PUBLISH_HOUR = int(os.getenv("FUND_NAV_PUBLISH_HOUR", "18"))
+FUND_NAV_PUBLISH_WINDOW_HOURS = 6
+# 公布窗口内净值陆续更新，以及下载失败后的重试间隔（秒）
+FUND_NAV_BULK_RETRY_SECONDS = float(os.getenv("FUND_NAV_BULK_RETRY_SECONDS", "1800"))
+CN_TIMEZONE = ZoneInfo("Asia/Shanghai")
+
+# 全市场净值表的日期列：2024-05-20-单位净值
+_DAILY_NAV_COLUMN = re.compile(r"^(\d{4}-\d{2}-\d{2})-单位净值$")
+
+
+def nav_cache_ttl(nav_date: Optional[str], now: Optional[datetime] = None) -> float:
+    """
+    净值缓存时间：下一次预计公布（下一个A股交易日的公布窗口开始）前一直有效；
+    公布窗口内尚未拿到当日净值时按重试间隔刷新
+
+    Args:
+        nav_date: 已缓存的最新净值日期（YYYY-MM-DD），None 表示尚无净值
+        now: 当前时间（测试用，默认北京时间当前时刻）
+    """
+    now = (now or datetime.now(CN_TIMEZONE)).astimezone(CN_TIMEZONE)
+    if nav_date is None:
+        return FUND_NAV_BULK_RETRY_SECONDS
+
+    window_start = now.replace(hour=FUND_NAV_PUBLISH_HOUR, minute=0, second=0, microsecond=0)
+    in_window = window_start <= now < window_start + timedelta(hours=FUND_NAV_PUBLISH_WINDOW_HOURS)
+    if trading_calendar.is_trading_day("CN", now.date()) and in_window and nav_date < now.strftime("%Y-%m-%d"):
+        return FUND_NAV_BULK_RETRY_SECONDS
+
+    next_publication = window_start if now < window_start else window_start + timedelta(days=1)
+    while not trading_calendar.is_trading_day("CN", next_publication.date()):
+        next_publication += timedelta(days=1)
+    return (next_publication - now).total_seconds()
+
+
+def expected_nav_date(now: Optional[datetime] = None) -> str:
+    """
+    应已公布净值的最近日期：公布窗口已结束的最近一个A股交易日
+
+    Args:
+        now: 当前时间（测试用，默认北京时间当前时刻）
+    """
+    now = (now or datetime.now(CN_TIMEZONE)).astimezone(CN_TIMEZONE)
+    window_start = now.replace(hour=FUND_NAV_PUBLISH_HOUR, minute=0, second=0, microsecond=0)
+    day = now.date()
+    if now < window_start + timedelta(hours=FUND_NAV_PUBLISH_WINDOW_HOURS):
+        day -= timedelta(days=1)
+    while not trading_calendar.is_trading_day("CN", day):
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def parse_daily_table(df: pd.DataFrame) -> Tuple[Optional[str], Optional[str], List[Tuple[str, str, float, Optional[str], Optional[float], Optional[float]]]]:
+    """
+    解析全市场开放式基金净值表
+
+    Args:
+        df: ak.fund_open_fund_daily_em() 的结果，含 “{日期}-单位净值” 两列（最新日和前一日）及 日增长率
+
+    Returns:
+        (最新净值日期, 前一净值日期, [(基金代码, 净值日期, 净值, 前一净值日期, 前一净值, 日增长率)])；
+        最新净值尚未公布的基金以前一日净值作为其最新净值（前一净值日期、前一净值和日增长率为空）
+    """
+    dates = sorted((m.group(1) for m in map(_DAILY_NAV_COLUMN.match, df.columns) if m), reverse=True)
+    if not dates:
+        return None, None, []
+    nav_date = dates[0]
+    prev_date = dates[1] if len(dates) > 1 else None
+
+    navs = pd.to_numeric(df[f"{nav_date}-单位净值"], errors="coerce")
+    prev_navs = pd.to_numeric(df[f"{prev_date}-单位净值"], errors="coerce") if prev_date else [None] * len(df)
+    growth = pd.to_numeric(df["日增长率"], errors="coerce") if "日增长率" in df.columns else [None] * len(df)
+
+    rows = []
+    for code, nav, prev_nav, g in zip(df["基金代码"].astype(str), navs, prev_navs, growth):
+        prev_nav = None if prev_nav is None or pd.isna(prev_nav) else float(prev_nav)
+        if pd.isna(nav):
+            # 最新净值尚未公布：保留前一日净值，避免公布窗口开始时几乎所有基金都退回单只基金接口
+            if prev_nav is not None:
+                rows.append((code, prev_date, prev_nav, None, None, None))
+            continue
+        rows.append((code, nav_date, float(nav), prev_date, prev_nav, None if g is None or pd.isna(g) else float(g)))
+    return nav_date, prev_date, rows
+
+
+class FundNavStore:
+    """
+    按基金代码存储单位净值历史，支持增量追加和按日期区间查询
+
+    核心属性：
+        - path (str): SQLite 文件路径
+        - refresh_seconds (float): 同一基金两次增量更新的最小间隔
+
+    使用示例：
+        store = FundNavStore()
+        history = store.get_history("161725", start_date=datetime(2024, 1, 1))
+    """
+
+    def __init__(self, path: str = FUND_NAV_DB_FILE, refresh_seconds: float = FUND_NAV_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        # 同一基金的并发更新合并为一次（按基金代码，网络请求不持有全局锁，不同基金互不阻塞）
+        self._inflight = SingleFlight()
+        # 全市场净值表的下载串行执行；下载失败后按重试间隔再试
+        self._bulk_lock = threading.Lock()
+        self._bulk_failed_at: Optional[float] = None
+        self.bulk_retry_seconds = FUND_NAV_BULK_RETRY_SECONDS
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """每次调用新建连接（保证多线程安全），正常退出时提交并关闭"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建净值表和元数据表"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fund_nav (
+                    code TEXT NOT NULL,
+                    nav_date TEXT NOT NULL,
+                    unit_nav REAL NOT NULL,
+                    daily_growth REAL,
+                    PRIMARY KEY (code, nav_date)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fund_nav_meta (
+                    code TEXT PRIMARY KEY,
+                    last_fetched_at REAL NOT NULL
+                )
+            """)
+            # 最近一次全市场净值表：每只基金一行
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fund_nav_daily (
+                    code TEXT PRIMARY KEY,
+                    nav_date TEXT NOT NULL,
+                    unit_nav REAL NOT NULL,
+                    prev_date TEXT,
+                    prev_nav REAL,
+                    daily_growth REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fund_nav_bulk_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    nav_date TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def get_last_date(self, code: str) -> Optional[str]:
+        """获取本地已存储的最新净值日期（YYYY-MM-DD），无数据返回None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(nav_date) FROM fund_nav WHERE code = ?", (code,)).fetchone()
+        return row[0] if row else None
+
+    def _last_fetched_at(self, code: str) -> Optional[float]:
+        """获取上次从网络更新该基金的时间戳"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_fetched_at FROM fund_nav_meta WHERE code = ?", (code,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _fetch_full(code: str) -> List[Tuple[str, float, Optional[float]]]:
+        """通过 akshare 拉取全部净值历史"""
+        df = ak.fund_open_fund_info_em(symbol=code, indicator="单位净值走势")
+        if df.empty:
+            return []
+        dates = pd.to_datetime(df['净值日期']).dt.strftime("%Y-%m-%d")
+        navs = pd.to_numeric(df['单位净值'], errors="coerce")
+        if '日增长率' in df.columns:
+            growth = pd.to_numeric(df['日增长率'], errors="coerce")
+        else:
+            growth = [None] * len(df)
+        return [
+            (d, float(n), None if pd.isna(g) else float(g))
+            for d, n, g in zip(dates, navs, growth)
+            if not pd.isna(n)
+        ]
+
+    @staticmethod
+    def _fetch_since(code: str, start_date: str) -> List[Tuple[str, float, Optional[float]]]:
+        """
+        通过东方财富分页接口拉取 start_date（含）之后的净值
+
+        Args:
+            code: 基金代码
+            start_date: 起始日期（YYYY-MM-DD）
+        """
+        headers = {"Referer": "https://fundf10.eastmoney.com/"}
+        end_date = datetime.now().strftime("%Y-%m-%d")
+
+        def page_request(page: int) -> dict:
+            params = {
+                "fundCode": code,
+                "pageIndex": page,
+                "pageSize": EAST_MONEY_NAV_PAGE_SIZE,
+                "startDate": start_date,
+                "endDate": end_date,
+            }
+            return {"url": EAST_MONEY_NAV_URL, "params": params, "headers": headers}
+
+        # 先取第一页得到总条数，其余页通过异步抓取引擎并发请求
+        first = fetch_engine.get(**page_request(1))
+        payloads = [FundNavStore._parse_page(code, first)]
+        total = payloads[0].get("TotalCount") or 0
+        pages = -(-total // EAST_MONEY_NAV_PAGE_SIZE)
+        if pages > 1:
+            responses = fetch_engine.get_many([page_request(p) for p in range(2, pages + 1)])
+            payloads.extend(FundNavStore._parse_page(code, r) for r in responses)
+
+        rows = []
+        for payload in payloads:
+            for item in (payload.get("Data") or {}).get("LSJZList") or []:
+                if not item.get("DWJZ"):
+                    continue
+                growth = item.get("JZZZL")
+                rows.append((item["FSRQ"], float(item["DWJZ"]), float(growth) if growth else None))
+        return rows
+
+    @staticmethod
+    def _parse_page(code: str, response) -> dict:
+        """解析一页净值数据，请求失败时抛出异常（由 update 退回全量接口）"""
+        if response.error is not None:
+            raise response.error
+        if response.status != 200:
+            raise RuntimeError(f"东方财富净值接口返回 {response.status}: {code}")
+        return response.json()
+
+    def update(self, code: str, force: bool = False) -> int:
+        """
+        增量更新单只基金的净值：首次全量加载，之后只追加最后日期之后的数据
+
+        Args:
+            code: 基金代码
+            force: 是否忽略刷新间隔立即更新
+
+        Returns:
+            int: 新写入的净值条数
+        """
+        return self._inflight.do(code, self._update, code, force)
+
+    def _update(self, code: str, force: bool = False) -> int:
+        """执行一次更新（由 update 按基金代码合并并发调用）"""
+        fetched_at = self._last_fetched_at(code)
+        if not force and fetched_at and time.time() - fetched_at < self.refresh_seconds:
+            return 0
+
+        last_date = self.get_last_date(code)
+        if last_date is None:
+            rows = self._fetch_full(code)
+        else:
+            next_date = (datetime.strptime(last_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+            try:
+                rows = self._fetch_since(code, next_date)
+            except Exception as e:
+                # 分页接口不可用时退回全量接口，只保留新日期
+                print(f"增量拉取净值失败 {code}，改用全量接口: {e}")
+                rows = [r for r in self._fetch_full(code) if r[0] > last_date]
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fund_nav (code, nav_date, unit_nav, daily_growth) VALUES (?, ?, ?, ?)",
+                [(code, d, n, g) for d, n, g in rows]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO fund_nav_meta (code, last_fetched_at) VALUES (?, ?)",
+                (code, time.time())
+            )
+        return len(rows)
+
+    @staticmethod
+    def _fetch_daily_table() -> pd.DataFrame:
+        """通过 akshare 下载全市场开放式基金当日净值表"""
+        return ak.fund_open_fund_daily_em()
+
+    def _bulk_fetched_at(self) -> Optional[float]:
+        """上次成功下载全市场净值表的时间戳"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT fetched_at FROM fund_nav_bulk_meta WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    def needs_bulk_refresh(self, now: Optional[datetime] = None) -> bool:
+        """
+        是否需要下载全市场净值表：最近一个公布窗口开始后尚未下载，
+        或仍在公布窗口内且距上次下载已超过重试间隔（晚公布的基金陆续补齐）；
+        只有A股交易日晚间才有公布窗口，周末和节假日不下载
+
+        Args:
+            now: 当前时间（测试用，默认北京时间当前时刻）
+        """
+        now = (now or datetime.now(CN_TIMEZONE)).astimezone(CN_TIMEZONE)
+        window_start = now.replace(hour=FUND_NAV_PUBLISH_HOUR, minute=0, second=0, microsecond=0)
+        if now < window_start:
+            window_start -= timedelta(days=1)
+        while not trading_calendar.is_trading_day("CN", window_start.date()):
+            window_start -= timedelta(days=1)
+
+        fetched_at = self._bulk_fetched_at()
+        if fetched_at is None:
+            return True
+        fetched = datetime.fromtimestamp(fetched_at, CN_TIMEZONE)
+        if fetched < window_start:
+            return True
+        in_window = now < window_start + timedelta(hours=FUND_NAV_PUBLISH_WINDOW_HOURS)
+        return in_window and (now - fetched).total_seconds() >= self.bulk_retry_seconds
+
+    def ingest_daily_table(self, force: bool = False, now: Optional[datetime] = None) -> int:
+        """
+        下载全市场净值表并保存为快照（每个公布窗口一次）；
+        本地历史恰好停在前一净值日期的基金，把最新净值直接追加到历史中，不必再请求单只基金接口
+
+        Args:
+            force: 是否忽略公布窗口立即下载
+            now: 当前时间（测试用）
+
+        Returns:
+            int: 快照中的基金数，未下载时为0
+        """
+        with self._bulk_lock:
+            if not force:
+                if self._bulk_failed_at and time.time() - self._bulk_failed_at < self.bulk_retry_seconds:
+                    return 0
+                if not self.needs_bulk_refresh(now):
+                    return 0
+
+            try:
+                nav_date, prev_date, rows = parse_daily_table(self._fetch_daily_table())
+            except Exception:
+                self._bulk_failed_at = time.time()
+                raise
+            if not rows:
+                self._bulk_failed_at = time.time()
+                return 0
+            self._bulk_failed_at = None
+            fetched_at = (now or datetime.now(CN_TIMEZONE)).timestamp()
+
+            with self._connect() as conn:
+                conn.execute("DELETE FROM fund_nav_daily")
+                conn.executemany(
+                    "INSERT INTO fund_nav_daily (code, nav_date, unit_nav, prev_date, prev_nav, daily_growth) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                # 只追加与本地历史首尾相接的净值，避免历史中出现缺口（缺口由单只基金的增量更新补齐）
+                conn.execute("""
+                    INSERT OR REPLACE INTO fund_nav (code, nav_date, unit_nav, daily_growth)
+                    SELECT d.code, d.nav_date, d.unit_nav, d.daily_growth
+                    FROM fund_nav_daily d
+                    WHERE d.prev_date = (SELECT MAX(n.nav_date) FROM fund_nav n WHERE n.code = d.code)
+                """)
+                conn.execute(
+                    "INSERT OR REPLACE INTO fund_nav_bulk_meta (id, nav_date, fetched_at) VALUES (1, ?, ?)",
+                    (nav_date, fetched_at)
+                )
+            return len(rows)
+
+    def get_daily_snapshot(self, code: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        从最近一次全市场净值表读取单只基金
+
+        Args:
+            code: 基金代码
+            now: 当前时间（测试用）
+
+        Returns:
+            dict: nav_date、unit_nav、prev_date、prev_nav（尚未公布最新净值的基金为None）、daily_growth；
+                  快照中没有该基金，或净值日期早于应已公布的日期（全市场净值表持续下载失败）时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT nav_date, unit_nav, prev_date, prev_nav, daily_growth FROM fund_nav_daily WHERE code = ?",
+                (code,)
+            ).fetchone()
+        if row is None or row[0] < expected_nav_date(now):
+            return None
+        return dict(zip(["nav_date", "unit_nav", "prev_date", "prev_nav", "daily_growth"], row))
+
+    def get_history(self, code: str, start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None, refresh: bool = True) -> pd.DataFrame:
+        """
+        按日期区间读取净值历史
+
+        Args:
+            code: 基金代码
+            start_date: 起始日期（含），None 表示不限
+            end_date: 结束日期（含），None 表示不限
+            refresh: 读取前是否先做一次增量更新
+
+        Returns:
+            pd.DataFrame: 列为 净值日期(datetime)、单位净值、日增长率，按日期升序
+        """
+        if refresh:
+            try:
+                self.update(code)
+            except Exception as e:
+                print(f"更新基金净值失败 {code}: {e}")
+
+        start = start_date.strftime("%Y-%m-%d") if start_date else "0000-00-00"
+        end = end_date.strftime("%Y-%m-%d") if end_date else "9999-99-99"
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT nav_date AS 净值日期, unit_nav AS 单位净值, daily_growth AS 日增长率 "
+                "FROM fund_nav WHERE code = ? AND nav_date BETWEEN ? AND ? ORDER BY nav_date",
+                conn, params=(code, start, end)
+            )
+        df['净值日期'] = pd.to_datetime(df['净值日期'])
+        return df
+
+    def get_latest(self, code: str, count: int = 2, refresh: bool = True) -> pd.DataFrame:
+        """
+        读取最近 count 个净值（按日期升序）
+
+        Args:
+            code: 基金代码
+            count: 条数
+            refresh: 读取前是否先做一次增量更新
+        """
+        if refresh:
+            try:
+                self.update(code)
+            except Exception as e:
+                print(f"更新基金净值失败 {code}: {e}")
+
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT nav_date AS 净值日期, unit_nav AS 单位净值, daily_growth AS 日增长率 "
+                "FROM fund_nav WHERE code = ? ORDER BY nav_date DESC LIMIT ?",
+                conn, params=(code, count)
+            )
+        df['净值日期'] = pd.to_datetime(df['净值日期'])
+        return df.iloc[::-1].reset_index(drop=True)
+
+
+# 进程内共享的基金净值存储
+fund_nav_store = FundNavStore()
@@ -0,0 +1,188 @@
+"""
+多代码行情面板模块
+一次 yf.download 批量下载多只指数/商品的K线，批量结果缺失的代码再通过有界线程池单独补齐；
+结果整理为长表（Date, Ticker, OHLCV），并按市场开闭状态设置缓存时间
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from src.data.cache_engine import CacheEngine
+from src.data.market_hours import is_market_open
+from src.data.rate_limiter import YAHOO_FINANCE_HOST, rate_limiters
+from src.data.single_flight import SingleFlight
+
+# 面板列
+PANEL_COLUMNS = ["Date", "Ticker", "Open", "High", "Low", "Close", "Volume"]
+
+# 补齐缺失代码时的最大线程数
+PRICE_PANEL_MAX_WORKERS = int(os.getenv("PRICE_PANEL_MAX_WORKERS", "4"))
+
+# 有相关市场处于交易时段时的缓存时间，以及全部休市时的缓存时间（秒）
+PRICE_PANEL_OPEN_TTL = float(os.getenv("PRICE_PANEL_OPEN_TTL", "60"))
+PRICE_PANEL_CLOSED_TTL = float(os.getenv("PRICE_PANEL_CLOSED_TTL", "1800"))
+
+_cache = CacheEngine(max_entries=64, default_ttl=PRICE_PANEL_CLOSED_TTL, jitter_ratio=0.0)
+_inflight = SingleFlight()
+
+
+def ticker_market(ticker: str) -> str:
+    """根据 yfinance 代码后缀判断所属市场（指数、期货、外汇按美股时段处理）"""
+    upper = ticker.upper()
+    if upper.endswith((".SS", ".SZ")):
+        return "CN"
+    if upper.endswith(".HK"):
+        return "HK"
+    return "US"
+
+
+def panel_ttl(tickers: List[str], now: Optional[datetime] = None) -> float:
+    """任一代码所属市场在交易时段内时使用短缓存，否则使用长缓存"""
+    markets = {ticker_market(t) for t in tickers}
+    if any(is_market_open(m, now) for m in markets):
+        return PRICE_PANEL_OPEN_TTL
+    return PRICE_PANEL_CLOSED_TTL
+
+
+def _tidy(df: pd.DataFrame, ticker: str) -> Optional[pd.DataFrame]:
+    """把单只代码的 OHLCV 表转换为长表，无有效数据返回None"""
+    if df is None or df.empty or "Close" not in df.columns:
+        return None
+    df = df.dropna(subset=["Close"])
+    if df.empty:
+        return None
+    out = df.reindex(columns=PANEL_COLUMNS[2:]).copy()
+    index = pd.DatetimeIndex(out.index)
+    if index.tz is not None:
+        # 不同市场的时区不同，统一去掉时区保留当地日期
+        index = index.tz_localize(None)
+    out.index = index.rename("Date")
+    out = out.reset_index()
+    out.insert(1, "Ticker", ticker)
+    return out
+
+
+def _split_download(raw: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """拆分 yf.download 的结果为 {代码: 长表}"""
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+    if isinstance(raw.columns, pd.MultiIndex):
+        available = set(raw.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker in available:
+                tidy = _tidy(raw[ticker], ticker)
+                if tidy is not None:
+                    frames[ticker] = tidy
+    elif len(tickers) == 1:
+        tidy = _tidy(raw, tickers[0])
+        if tidy is not None:
+            frames[tickers[0]] = tidy
+    return frames
+
+
+def _download_one(ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+    """单独下载一只代码"""
+    try:
+        rate_limiters.acquire(YAHOO_FINANCE_HOST)
+        return _tidy(yf.Ticker(ticker).history(period=period, interval=interval), ticker)
+    except Exception as e:
+        print(f"Error fetching {ticker}: {e}")
+        return None
+
+
+def download_price_panel(tickers: List[str], period: str = "1mo", interval: str = "1d") -> pd.DataFrame:
+    """
+    批量下载多只代码的K线（不读缓存）
+
+    先用一次 yf.download 批量下载，批量结果中缺失的代码再用有界线程池逐只补齐
+
+    Args:
+        tickers: yfinance 代码列表
+        period: 时间窗口
+        interval: K线周期
+
+    Returns:
+        pd.DataFrame: 长表，列为 Date、Ticker、Open、High、Low、Close、Volume
+    """
+    try:
+        rate_limiters.acquire(YAHOO_FINANCE_HOST)
+        raw = yf.download(tickers, period=period, interval=interval, group_by="ticker",
+                          auto_adjust=False, threads=True, progress=False)
+        frames = _split_download(raw, tickers)
+    except Exception as e:
+        print(f"Batch download failed for {tickers}: {e}")
+        frames = {}
+
+    missing = [t for t in tickers if t not in frames]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(PRICE_PANEL_MAX_WORKERS, len(missing))) as pool:
+            for ticker, tidy in zip(missing, pool.map(lambda t: _download_one(t, period, interval), missing)):
+                if tidy is not None:
+                    frames[ticker] = tidy
+
+    ordered = [frames[t] for t in tickers if t in frames]
+    if not ordered:
+        return pd.DataFrame(columns=PANEL_COLUMNS)
+    return pd.concat(ordered, ignore_index=True)
+
+
+def get_price_panel(tickers: List[str], period: str = "1mo", interval: str = "1d") -> pd.DataFrame:
+    """
+    获取多只代码的K线长表（带缓存，并发的相同请求只下载一次）
+
+    缓存时间随市场状态变化：任一相关市场在交易时段内为 PRICE_PANEL_OPEN_TTL，
+    否则为 PRICE_PANEL_CLOSED_TTL
+
+    Args:
+        tickers: yfinance 代码列表
+        period: 时间窗口
+        interval: K线周期
+
+    Returns:
+        pd.DataFrame: 长表，列为 Date、Ticker、Open、High、Low、Close、Volume
+    """
+    tickers = list(dict.fromkeys(tickers))
+    key = f"{','.join(tickers)}|{period}|{interval}"
+    cached = _cache.get("panel", key)
+    if cached is not None:
+        return cached
+
+    def load() -> pd.DataFrame:
+        panel = _cache.get("panel", key)
+        if panel is None:
+            panel = download_price_panel(tickers, period=period, interval=interval)
+            # 全部失败时不缓存，下次重试
+            if not panel.empty:
+                _cache.set("panel", key, panel, ttl=panel_ttl(tickers))
+        return panel
+
+    return _inflight.do(key, load)
+
+
+def latest_closes(panel: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """
+    从长表中取各代码最新收盘价及相对前一根K线的涨跌幅
+
+    Returns:
+        dict: {代码: {"close": 最新收盘价, "change_pct": 涨跌幅(%)}}
+    """
+    result = {}
+    for ticker, group in panel.groupby("Ticker", sort=False):
+        closes = group.sort_values("Date")["Close"]
+        latest = float(closes.iloc[-1])
+        prev = float(closes.iloc[-2]) if len(closes) > 1 else latest
+        result[ticker] = {
+            "close": latest,
+            "change_pct": (latest - prev) / prev * 100 if prev else 0.0
+        }
+    return result
+
+
+def clear_price_panel_cache():
+    """清空面板缓存"""
+    _cache.clear()
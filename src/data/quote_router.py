@@ -0,0 +1,254 @@
+"""
+多数据源行情路由模块
+按 (数据源, 市场) 统计滚动窗口内的延迟分位数（p50/p95）和成功率，
+每次请求优先发给当前期望耗时最低的数据源；
+首选数据源超过其 p95 仍未返回时，对次优数据源发起对冲请求，先成功者胜出
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.data.circuit_breaker import STATE_OPEN, get_breaker
+
+# 滚动窗口长度（每个数据源、每个市场保留的最近请求数）
+QUOTE_ROUTER_WINDOW = int(os.getenv("QUOTE_ROUTER_WINDOW", "100"))
+# 样本数不足时使用注册时的先验延迟
+QUOTE_ROUTER_MIN_SAMPLES = int(os.getenv("QUOTE_ROUTER_MIN_SAMPLES", "5"))
+# 没有足够样本时的对冲等待时间（秒）
+QUOTE_ROUTER_DEFAULT_HEDGE_SECONDS = float(os.getenv("QUOTE_ROUTER_DEFAULT_HEDGE_SECONDS", "1.0"))
+# 同时进行中的最大请求数（首选 + 对冲）
+QUOTE_ROUTER_MAX_IN_FLIGHT = int(os.getenv("QUOTE_ROUTER_MAX_IN_FLIGHT", "2"))
+QUOTE_ROUTER_WORKERS = int(os.getenv("QUOTE_ROUTER_WORKERS", "8"))
+
+
+def detect_market(ticker: str) -> str:
+    """根据代码格式判断市场：6位数字为A股，.HK 或4-5位数字为港股，其余为美股"""
+    upper = ticker.upper()
+    if upper.isdigit() and len(upper) == 6:
+        return "CN"
+    if upper.endswith(".HK") or (upper.isdigit() and len(upper) in (4, 5)):
+        return "HK"
+    return "US"
+
+
+class NoUpstreamCall(Exception):
+    """
+    数据源本次没有请求上游（缓存命中、负缓存或熔断）时由 fetch 抛出，可携带缓存中的行情；
+    路由照常使用携带的行情，但不计入该数据源的延迟与成功率统计
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        super().__init__("no upstream call")
+        self.data = data
+
+
+class ProviderStats:
+    """单个 (数据源, 市场) 的滚动延迟与成功率统计"""
+
+    def __init__(self, window: int = QUOTE_ROUTER_WINDOW):
+        # [(耗时秒数, 是否成功)]
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        self._samples.append((latency, ok))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def success_rate(self) -> float:
+        if not self._samples:
+            return 1.0
+        return sum(1 for _, ok in self._samples if ok) / len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """成功请求耗时的分位数，没有成功样本返回None"""
+        latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            "samples": len(self._samples),
+            "success_rate": round(self.success_rate, 3),
+            "p50": round(p50, 4) if p50 is not None else None,
+            "p95": round(p95, 4) if p95 is not None else None,
+        }
+
+
+class QuoteRouter:
+    """
+    延迟感知的多数据源行情路由
+
+    数据源注册时给出适用市场和先验延迟（样本不足时按先验延迟排序），
+    排序依据为期望耗时 p50 / 成功率；熔断中的数据源排在最后
+
+    使用示例：
+        router = QuoteRouter()
+        router.register("sina", fetch_sina, markets={"CN"}, prior_latency=0.2)
+        routed = router.route("600519")  # (数据源名称, 行情字典) 或 None
+    """
+
+    def __init__(self, max_in_flight: int = QUOTE_ROUTER_MAX_IN_FLIGHT, workers: int = QUOTE_ROUTER_WORKERS):
+        self.max_in_flight = max(1, max_in_flight)
+        # {名称: {"fetch", "markets", "prior_latency", "breaker"}}，按注册顺序
+        self._providers: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._counters = {"routed": 0, "hedged": 0, "failovers": 0, "exhausted": 0}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-router")
+
+    def register(self, name: str, fetch: Callable[[str], Optional[Dict[str, Any]]], markets: Set[str],
+                 prior_latency: float = 1.0, breaker: Optional[str] = None):
+        """
+        注册数据源
+
+        Args:
+            name: 数据源名称（写入 StockQuote.data_source，不超过20个字符）
+            fetch: 获取单只行情的函数，失败返回None或抛出异常；未请求上游时抛出 NoUpstreamCall
+            markets: 适用市场（CN、HK、US）
+            prior_latency: 样本不足时的先验延迟（秒），决定初始顺序
+            breaker: 对应的熔断器名称（熔断中的数据源排在最后）
+        """
+        self._providers[name] = {
+            "fetch": fetch,
+            "markets": set(markets),
+            "prior_latency": prior_latency,
+            "breaker": breaker,
+        }
+
+    def _get_stats(self, name: str, market: str) -> ProviderStats:
+        key = (name, market)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = ProviderStats()
+            self._stats[key] = stats
+        return stats
+
+    def _expected_latency(self, name: str, market: str) -> float:
+        """期望耗时：p50 / 成功率（样本不足时使用先验延迟）"""
+        stats = self._get_stats(name, market)
+        p50 = stats.percentile(0.5)
+        if len(stats) < QUOTE_ROUTER_MIN_SAMPLES or p50 is None:
+            if len(stats) >= QUOTE_ROUTER_MIN_SAMPLES:
+                # 样本充足但全部失败
+                return float("inf")
+            return self._providers[name]["prior_latency"]
+        return p50 / max(stats.success_rate, 0.05)
+
+    def rank(self, market: str) -> List[str]:
+        """按当前表现对适用于该市场的数据源排序"""
+        with self._lock:
+            candidates = [name for name, p in self._providers.items() if market in p["markets"]]
+
+            def key(name: str):
+                breaker = self._providers[name]["breaker"]
+                is_open = breaker is not None and get_breaker(breaker).state == STATE_OPEN
+                return (is_open, self._expected_latency(name, market))
+
+            return sorted(candidates, key=key)
+
+    def _hedge_delay(self, name: str, market: str) -> float:
+        """首选数据源超过该时间仍未返回则发起对冲请求（其 p95）"""
+        with self._lock:
+            stats = self._get_stats(name, market)
+            p95 = stats.percentile(0.95)
+        if len(stats) < QUOTE_ROUTER_MIN_SAMPLES or p95 is None:
+            return QUOTE_ROUTER_DEFAULT_HEDGE_SECONDS
+        return p95
+
+    def _call(self, name: str, market: str, ticker: str) -> Optional[Dict[str, Any]]:
+        """调用单个数据源并记录耗时与成败（只记录实际请求上游的调用）"""
+        start = time.perf_counter()
+        upstream = True
+        try:
+            data = self._providers[name]["fetch"](ticker)
+        except NoUpstreamCall as skipped:
+            data = skipped.data
+            upstream = False
+        except Exception as e:
+            print(f"数据源 {name} 获取 {ticker} 失败: {e}")
+            data = None
+        ok = bool(data) and data.get("price") is not None
+        if upstream:
+            with self._lock:
+                self._get_stats(name, market).record(time.perf_counter() - start, ok)
+        return data if ok else None
+
+    def route(self, ticker: str, market: str = "AUTO") -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        获取单只行情：按排序依次尝试，首选超过 p95 未返回时对冲到下一个数据源
+
+        Args:
+            ticker: 代码
+            market: 市场（CN、HK、US），AUTO 时按代码格式判断
+
+        Returns:
+            (数据源名称, 行情字典)，全部失败返回None
+        """
+        if market == "AUTO":
+            market = detect_market(ticker)
+        candidates = self.rank(market)
+        pending: Dict[Any, str] = {}
+        next_index = 0
+        last_launched = None
+
+        def launch():
+            nonlocal next_index, last_launched
+            name = candidates[next_index]
+            next_index += 1
+            last_launched = name
+            pending[self._executor.submit(self._call, name, market, ticker)] = name
+
+        if candidates:
+            launch()
+        while pending:
+            can_hedge = next_index < len(candidates) and len(pending) < self.max_in_flight
+            timeout = self._hedge_delay(last_launched, market) if can_hedge else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # 超过 p95 仍未返回：对冲到下一个数据源，原请求继续进行
+                with self._lock:
+                    self._counters["hedged"] += 1
+                launch()
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                data = future.result()
+                if data:
+                    with self._lock:
+                        self._counters["routed"] += 1
+                    return name, data
+
+            # 已返回的数据源失败：立即切换到下一个
+            if not pending and next_index < len(candidates):
+                with self._lock:
+                    self._counters["failovers"] += 1
+                launch()
+
+        with self._lock:
+            self._counters["exhausted"] += 1
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取路由统计信息
+
+        Returns:
+            dict: 路由/对冲/切换/全部失败次数，以及 {市场: {数据源: p50、p95、成功率、样本数}}
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            markets: Dict[str, Dict[str, Any]] = {}
+            for (name, market), provider_stats in self._stats.items():
+                markets.setdefault(market, {})[name] = provider_stats.to_dict()
+            stats["markets"] = markets
+        return stats
@@ -0,0 +1,193 @@
+"""
+按主机限流模块
+每个上游主机一个令牌桶：按固定速率补充令牌，允许一定的突发量；
+令牌不足时调用方按预约顺序等待，不同主机的桶互不影响，可以并行请求。
+同时提供同步（线程）和异步（协程）两种等待方式
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# yfinance 请求的主机（query1/query2.finance.yahoo.com），yfinance 不经过异步抓取引擎，调用前按该主机限流
+YAHOO_FINANCE_HOST = "finance.yahoo.com"
+
+# 默认限流配置：{主机: (每秒请求数, 突发量)}，主机名同时匹配其子域名
+DEFAULT_RATE_LIMITS = {
+    "hq.sinajs.cn": (5.0, 10),
+    "push2.eastmoney.com": (2.0, 4),
+    "api.fund.eastmoney.com": (5.0, 10),
+    YAHOO_FINANCE_HOST: (2.0, 5),
+}
+
+# 未配置主机的默认限流（每秒请求数:突发量）
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "5:10")
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, int]]:
+    """
+    解析限流配置字符串
+
+    格式: "hq.sinajs.cn=5:10,push2.eastmoney.com=2:4"（主机=每秒请求数:突发量）
+
+    Returns:
+        dict: {主机: (每秒请求数, 突发量)}
+    """
+    limits = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item or "=" not in item:
+            continue
+        host, value = item.split("=", 1)
+        rate, _, burst = value.partition(":")
+        limits[host.strip()] = (float(rate), int(burst) if burst else max(1, int(float(rate))))
+    return limits
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+
+    令牌可以被预约为负数：每个调用方按到达顺序预约令牌，
+    再等待到令牌补足的时刻，多线程和协程共用同一个桶
+
+    核心属性：
+        - rate (float): 每秒补充的令牌数（<=0 表示不限流）
+        - burst (int): 桶容量（允许的突发请求数）
+
+    使用示例：
+        bucket = TokenBucket(rate=2, burst=4)
+        bucket.acquire()  # 阻塞到拿到令牌
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0}
+
+    def _refill(self, now: float):
+        """按经过的时间补充令牌"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: int) -> float:
+        """预约令牌，返回需要等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            wait = max(0.0, -self._tokens / self.rate)
+            self._stats["acquired"] += tokens
+            if wait > 0:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += wait
+            return wait
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """令牌充足时立即取走并返回True，否则不等待直接返回False"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            self._stats["acquired"] += tokens
+            return True
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        阻塞当前线程直到拿到令牌
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """协程版本的 acquire，等待期间不阻塞事件循环"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def get_stats(self) -> Dict[str, float]:
+        """获取限流统计：已发放令牌数、等待次数、累计等待秒数、当前可用令牌"""
+        with self._lock:
+            self._refill(time.monotonic())
+            stats = dict(self._stats)
+            stats["rate"] = self.rate
+            stats["burst"] = self.burst
+            stats["available"] = round(self._tokens, 3)
+        return stats
+
+
+class RateLimiterRegistry:
+    """
+    按主机管理令牌桶
+
+    配置的主机名同时匹配其子域名（如 push2.eastmoney.com 匹配 82.push2.eastmoney.com），
+    未配置的主机各自使用一个默认参数的桶
+
+    使用示例：
+        limiters = RateLimiterRegistry({"hq.sinajs.cn": (5, 10)})
+        limiters.acquire("hq.sinajs.cn")
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, int]]] = None,
+                 default: Tuple[float, int] = (5.0, 10)):
+        self.limits = dict(limits or {})
+        self.default = default
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, host: str) -> Tuple[str, Tuple[float, int]]:
+        """找到主机对应的配置键和限流参数"""
+        for key, limit in self.limits.items():
+            if host == key or host.endswith("." + key):
+                return key, limit
+        return host, self.default
+
+    def get(self, host: str) -> TokenBucket:
+        """获取主机对应的令牌桶"""
+        key, (rate, burst) = self._resolve(host)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rate, burst)
+                self._buckets[key] = bucket
+            return bucket
+
+    def acquire(self, host: str, tokens: int = 1) -> float:
+        """阻塞直到拿到该主机的令牌，返回等待秒数"""
+        return self.get(host).acquire(tokens)
+
+    async def acquire_async(self, host: str, tokens: int = 1) -> float:
+        """协程版本的 acquire"""
+        return await self.get(host).acquire_async(tokens)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各主机令牌桶的统计信息"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {key: bucket.get_stats() for key, bucket in buckets.items()}
+
+
+def _default_limit() -> Tuple[float, int]:
+    """解析 RATE_LIMIT_DEFAULT"""
+    return parse_rate_limits(f"default={RATE_LIMIT_DEFAULT}")["default"]
+
+
+# 进程内共享的按主机限流器，可通过 RATE_LIMITS 环境变量覆盖各主机配置
+rate_limiters = RateLimiterRegistry(
+    {**DEFAULT_RATE_LIMITS, **parse_rate_limits(os.getenv("RATE_LIMITS", ""))},
+    default=_default_limit()
+)
@@ -3,34 +3,111 @@
 支持多数据源（akshare、新浪财经、yfinance）以分散请求压力
 包含缓存机制避免频繁请求
 """
+import os
 import pandas as pd
 import yfinance as yf
 import akshare as ak
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-import requests
 from functools import lru_cache
 
-# 简单内存缓存（5分钟有效期）
-_cache = {}
-_cache_ttl = 300  # 5分钟
+from src.data.cache_engine import CacheEngine
+from src.data.circuit_breaker import STATE_OPEN, get_breaker, get_breaker_stats
+from src.data.fetch_engine import fetch_engine
+from src.data.fund_directory import fund_directory
+from src.data.market_snapshot import a_share_snapshot
+from src.data.market_hours import MARKET_SESSIONS, QUOTE_OPEN_TTL, is_round_the_clock, quote_ttl
+from src.data.nav_store import fund_nav_store, nav_cache_ttl
+from src.data.price_panel import clear_price_panel_cache
+from src.data.quote_router import NoUpstreamCall, QuoteRouter, detect_market
+from src.data.rate_limiter import YAHOO_FINANCE_HOST, rate_limiters
+from src.data.shared_cache import SharedCache
+from src.data.single_flight import SingleFlight
+from src.data.symbol_metadata import symbol_metadata
 
-def _get_cache_key(source: str, symbol: str) -> str:
-    """生成缓存键"""
-    minute_bucket = datetime.now().strftime("%Y%m%d%H%M")[:11]  # 精确到10分钟
-    return f"{source}_{symbol}_{minute_bucket}"
+# 行情缓存：本进程有界 LRU + 本机各进程（轮询服务、Streamlit）共享的 SQLite 文件；写入时按市场开闭状态（行情）或净值公布时间（基金）计算过期时间，
+# 以下命名空间 TTL（秒）只在未指定过期时间时使用
+CACHE_NAMESPACE_TTLS = {
+    "fund": 300,
+    "sina": 300,
+    "stock": 300,
+}
+CACHE_MAX_ENTRIES = int(os.getenv("REALTIME_CACHE_MAX_ENTRIES", "2000"))
+CACHE_MAX_BYTES = int(os.getenv("REALTIME_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
 
-def _get_from_cache(key: str) -> Optional[Any]:
+_cache = SharedCache(
+    local=CacheEngine(
+        max_entries=CACHE_MAX_ENTRIES,
+        max_bytes=CACHE_MAX_BYTES,
+        namespace_ttls=CACHE_NAMESPACE_TTLS
+    ),
+    namespace_ttls=CACHE_NAMESPACE_TTLS
+)
+
+# 并发请求合并：相同键同时只有一个请求访问上游
+_inflight = SingleFlight()
+
+# 负缓存：记录在某个数据源上确认无数据的代码，TTL内跳过该数据源（秒）
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "120"))
+_negative_cache = CacheEngine(max_entries=CACHE_MAX_ENTRIES, default_ttl=NEGATIVE_CACHE_TTL)
+
+# 各数据源熔断器：失败率过高时快速失败，直接切换到下一个数据源
+_sina_breaker = get_breaker("sina")
+_east_money_breaker = get_breaker("east_money")
+_yfinance_breaker = get_breaker("yfinance")
+
+# 新浪行情接口单次请求的最大代码数
+SINA_BATCH_SIZE = 50
+
+# 东方财富多代码行情接口及单次请求的最大代码数
+EAST_MONEY_QUOTE_URL = "https://push2.eastmoney.com/api/qt/ulist.np/get"
+EAST_MONEY_BATCH_SIZE = 100
+
+def _get_from_cache(namespace: str, symbol: str) -> Optional[Any]:
     """从缓存获取数据"""
-    if key in _cache:
-        data, timestamp = _cache[key]
-        if (datetime.now() - timestamp).total_seconds() < _cache_ttl:
-            return data
-    return None
+    return _cache.get(namespace, symbol)
+
+def _set_cache(namespace: str, symbol: str, data: Any, ttl: Optional[float] = None):
+    """
+    设置缓存
 
-def _set_cache(key: str, data: Any):
-    """设置缓存"""
-    _cache[key] = (data, datetime.now())
+    Args:
+        ttl: 过期时间（秒），按开盘/公布时间算出的到期时刻不加抖动；None 时使用命名空间 TTL
+    """
+    _cache.set(namespace, symbol, data, ttl=ttl, jitter=ttl is None)
+
+def _stock_cache_ttl(ticker: str, market: str = "AUTO") -> float:
+    """股票行情缓存时间：交易时段内为短缓存，休市后缓存到下一个交易时段开始"""
+    if is_round_the_clock(ticker):
+        return QUOTE_OPEN_TTL
+    if market not in MARKET_SESSIONS:
+        market = detect_market(ticker)
+    return quote_ttl(market)
+
+def _is_known_bad(source: str, symbol: str) -> bool:
+    """代码是否在负缓存中（该数据源近期确认无数据）"""
+    return _negative_cache.get(source, symbol) is not None
+
+def _mark_bad(source: str, symbol: str):
+    """将代码加入负缓存"""
+    _negative_cache.set(source, symbol, True)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    获取行情缓存统计信息
+    
+    Returns:
+        dict: 缓存命中/未命中/淘汰次数、条目数、字节数，全市场快照、请求合并、异步抓取、负缓存、熔断器、行情路由和代码元数据统计
+    """
+    stats = _cache.get_stats()
+    stats["a_share_snapshot"] = a_share_snapshot.get_stats()
+    stats["single_flight"] = _inflight.get_stats()
+    stats["fetch_engine"] = fetch_engine.get_stats()
+    stats["negative_cache"] = _negative_cache.get_stats()
+    stats["circuit_breakers"] = get_breaker_stats()
+    stats["quote_router"] = quote_router.get_stats()
+    stats["symbol_metadata"] = symbol_metadata.get_stats()
+    return stats
 
 def get_fund_realtime_data(ticker: str) -> Dict[str, Any]:
     """
@@ -46,8 +123,17 @@ def get_fund_realtime_data(ticker: str) -> Dict[str, Any]:
             "history": DataFrame  # 历史数据用于图表
         }
     """
-    cache_key = _get_cache_key("fund", ticker)
-    cached = _get_from_cache(cache_key)
+    cached = _get_from_cache("fund", ticker)
+    if cached:
+        return cached
+    
+    # 并发的相同请求只访问一次上游
+    return _inflight.do(f"fund:{ticker}", _load_fund_realtime_data, ticker)
+
+def _load_fund_realtime_data(ticker: str) -> Dict[str, Any]:
+    """从上游加载基金数据并写入缓存（由 get_fund_realtime_data 合并调用）"""
+    # 等待期间可能已有其他请求写入缓存
+    cached = _get_from_cache("fund", ticker)
     if cached:
         return cached
     
@@ -61,154 +147,389 @@ def get_fund_realtime_data(ticker: str) -> Dict[str, Any]:
     }
     
     try:
-        # 获取基金名称
-        df_name = ak.fund_name_em()
-        match = df_name[df_name['基金代码'] == ticker]
-        if not match.empty:
-            result["name"] = match.iloc[0]['基金简称']
+        # 获取基金名称（本地基金目录）
+        result["name"] = fund_directory.get_name(ticker) or ticker
         
-        # 获取净值历史（最近30天用于图表）
-        df_nav = ak.fund_open_fund_info_em(symbol=ticker, indicator="单位净值走势")
-        if not df_nav.empty and len(df_nav) >= 2:
-            # 转换数据
-            df_nav['净值日期'] = pd.to_datetime(df_nav['净值日期'])
-            df_nav['单位净值'] = pd.to_numeric(df_nav['单位净值'])
-            df_nav = df_nav.sort_values('净值日期', ascending=True)
+        # 全市场净值表（每个公布窗口只下载一次），有该基金时最新/前一净值直接从快照读取
+        try:
+            fund_nav_store.ingest_daily_table()
+        except Exception as e:
+            print(f"下载全市场基金净值失败: {e}")
+        snapshot = fund_nav_store.get_daily_snapshot(ticker)
+        if snapshot and not snapshot["prev_nav"]:
+            # 当日净值尚未公布：快照中为前一日净值，再前一个净值从本地历史读取（不请求网络）
+            local = fund_nav_store.get_history(ticker, refresh=False)
+            local = local[local['净值日期'] < pd.Timestamp(snapshot["nav_date"])]
+            if not local.empty:
+                snapshot["prev_nav"] = float(local.iloc[-1]['单位净值'])
+                snapshot["daily_growth"] = None
+        
+        if snapshot and snapshot["prev_nav"]:
+            result["latest_nav"] = snapshot["unit_nav"]
+            result["prev_nav"] = snapshot["prev_nav"]
+            if snapshot["daily_growth"] is not None:
+                result["change_pct"] = snapshot["daily_growth"]
+            else:
+                result["change_pct"] = ((snapshot["unit_nav"] - snapshot["prev_nav"]) / snapshot["prev_nav"]) * 100
+            result["update_time"] = snapshot["nav_date"]
             
+            # 本地历史已衔接到快照日期时不再请求单只基金接口
+            cutoff = datetime.now() - timedelta(days=30)
+            refresh = fund_nav_store.get_last_date(ticker) != snapshot["nav_date"]
+            recent = fund_nav_store.get_history(ticker, start_date=cutoff, refresh=refresh)
+            recent.set_index('净值日期', inplace=True)
+            result["history"] = recent
+            
+            _set_cache("fund", ticker, result, ttl=nav_cache_ttl(result["update_time"]))
+            return result
+        
+        # 最近两个净值（本地净值库，只增量拉取新日期）
+        df_latest = fund_nav_store.get_latest(ticker, count=2)
+        if len(df_latest) >= 2:
             # 最新净值
-            latest = df_nav.iloc[-1]
-            prev = df_nav.iloc[-2]
+            latest = df_latest.iloc[-1]
+            prev = df_latest.iloc[-2]
             
             result["latest_nav"] = latest['单位净值']
             result["prev_nav"] = prev['单位净值']
             result["change_pct"] = ((latest['单位净值'] - prev['单位净值']) / prev['单位净值']) * 100
             result["update_time"] = latest['净值日期'].strftime("%Y-%m-%d")
             
-            # 保留最近1个月数据用于图表
+            # 保留最近1个月数据用于图表（本地按日期区间读取）
             cutoff = datetime.now() - timedelta(days=30)
-            recent = df_nav[df_nav['净值日期'] >= cutoff].copy()
+            recent = fund_nav_store.get_history(ticker, start_date=cutoff, refresh=False)
             recent.set_index('净值日期', inplace=True)
             result["history"] = recent
         
-        _set_cache(cache_key, result)
+        _set_cache("fund", ticker, result, ttl=nav_cache_ttl(result["update_time"]))
         
     except Exception as e:
         print(f"获取基金数据失败 {ticker}: {e}")
     
     return result
 
-def get_stock_realtime_data_sina(ticker: str) -> Optional[Dict[str, Any]]:
+def _to_sina_symbol(ticker: str) -> str:
+    """A股代码转换为新浪格式（沪市：sh前缀，深市：sz前缀）"""
+    prefix = "sh" if ticker.startswith(("6", "5")) else "sz"
+    return f"{prefix}{ticker}"
+
+def _parse_sina_line(line: str) -> Optional[tuple]:
     """
-    使用新浪财经API获取A股实时数据（分散请求压力）
+    解析新浪行情返回的一行数据
+    
+    格式: var hq_str_sh600519="贵州茅台,开盘,昨收,当前价,最高,最低,...";
+    
+    Returns:
+        (代码, 行情字典)，无效行返回None
+    """
+    if not line.startswith("var hq_str_") or '"' not in line:
+        return None
+    
+    ticker = line[len("var hq_str_"):line.index("=")][2:]
+    parts = line.split('"')[1].split(',')
+    if len(parts) <= 31:
+        return None
+    
+    price = float(parts[3])
+    prev_close = float(parts[2])
+    return ticker, {
+        "name": parts[0],
+        "price": price,  # 当前价
+        "prev_close": prev_close,  # 昨收
+        "open": float(parts[1]),
+        "high": float(parts[4]),
+        "low": float(parts[5]),
+        "change_pct": ((price - prev_close) / prev_close) * 100 if prev_close > 0 else 0,
+        "volume": float(parts[8]),
+        "update_time": f"{parts[30]} {parts[31]}"
+    }
+
+def get_stock_realtime_data_sina_batch(tickers: List[str], chunk_size: int = SINA_BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
+    """
+    批量获取A股实时数据（新浪接口支持逗号分隔的多只代码）
+    
+    先读取单只缓存，未命中的代码按 chunk_size 分组，每组只发一次请求，
+    解析结果同时写回单只缓存，供 get_stock_realtime_data_sina 复用。
+    负缓存中的代码不再请求；新浪熔断时只返回缓存中的数据。
     
     Args:
-        ticker: A股代码（6位数字）
+        tickers: A股代码列表（6位数字）
+        chunk_size: 每次请求包含的最大代码数
+        
+    Returns:
+        {代码: 行情字典}，获取失败的代码不包含在结果中
     """
-    cache_key = _get_cache_key("sina", ticker)
-    cached = _get_from_cache(cache_key)
-    if cached:
-        return cached
+    results = {}
+    pending = []
+    for ticker in dict.fromkeys(tickers):
+        cached = _get_from_cache("sina", ticker)
+        if cached:
+            results[ticker] = cached
+        elif not _is_known_bad("sina", ticker):
+            pending.append(ticker)
     
-    try:
-        # 新浪财经实时行情API
-        # 沪市：sh前缀，深市：sz前缀
-        prefix = "sh" if ticker.startswith(("6", "5")) else "sz"
-        url = f"http://hq.sinajs.cn/list={prefix}{ticker}"
+    # 新浪熔断时直接返回，由调用方切换到下一个数据源
+    if not pending or not _sina_breaker.allow_request():
+        return results
+    
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    batch_requests = [
+        {"url": f"http://hq.sinajs.cn/list={','.join(_to_sina_symbol(t) for t in chunk)}",
+         "encoding": "gbk", "timeout": 3}
+        for chunk in chunks
+    ]
+    # 各分组通过异步抓取引擎并发请求（复用长连接）
+    for chunk, response in zip(chunks, fetch_engine.get_many(batch_requests)):
+        if response.error is not None or response.status != 200:
+            _sina_breaker.record_failure()
+            print(f"新浪财经批量获取数据失败 {chunk}: {response.error or response.status}")
+            continue
+        _sina_breaker.record_success()
         
-        response = requests.get(url, timeout=3)
-        response.encoding = 'gbk'
+        for line in response.text.splitlines():
+            try:
+                parsed = _parse_sina_line(line.strip())
+            except ValueError:
+                # 停牌或字段异常的行，跳过
+                continue
+            if parsed:
+                ticker, data = parsed
+                _set_cache("sina", ticker, data, ttl=quote_ttl("CN"))
+                results[ticker] = data
         
-        if response.status_code == 200 and response.text:
-            # 解析数据
-            data_str = response.text.split('"')[1]
-            parts = data_str.split(',')
-            
-            if len(parts) > 30:
-                result = {
-                    "name": parts[0],
-                    "price": float(parts[3]),  # 当前价
-                    "prev_close": float(parts[2]),  # 昨收
-                    "open": float(parts[1]),
-                    "high": float(parts[4]),
-                    "low": float(parts[5]),
-                    "change_pct": ((float(parts[3]) - float(parts[2])) / float(parts[2])) * 100 if float(parts[2]) > 0 else 0,
-                    "volume": float(parts[8]),
-                    "update_time": f"{parts[30]} {parts[31]}"
-                }
-                
-                _set_cache(cache_key, result)
-                return result
-                
-    except Exception as e:
-        print(f"新浪财经获取数据失败 {ticker}: {e}")
+        # 请求成功但没有返回数据的代码（无效代码、停牌等），短期内不再向新浪请求
+        for ticker in chunk:
+            if ticker not in results:
+                _mark_bad("sina", ticker)
     
-    return None
+    return results
 
-def get_stock_realtime_data(ticker: str, market: str = "AUTO") -> Dict[str, Any]:
+def _to_east_money_secid(ticker: str) -> str:
+    """A股代码转换为东方财富 secid（沪市：1.，深市/北交所：0.）"""
+    market = "1" if ticker.startswith(("6", "5", "9")) else "0"
+    return f"{market}.{ticker}"
+
+def get_stock_realtime_data_east_money_batch(tickers: List[str], chunk_size: int = EAST_MONEY_BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
     """
-    获取股票实时数据（优先使用新浪财经，失败后使用akshare或yfinance）
+    通过东方财富多代码行情接口批量获取A股实时数据（不读写缓存，供轮询服务使用）
     
     Args:
-        ticker: 股票代码
-        market: 市场类型（US, CN, HK, AUTO）
+        tickers: A股代码列表（6位数字）
+        chunk_size: 每次请求包含的最大代码数
+        
+    Returns:
+        {代码: 行情字典}（字段与轮询服务写库所需一致），获取失败的代码不包含在结果中
     """
-    cache_key = _get_cache_key("stock", ticker)
-    cached = _get_from_cache(cache_key)
-    if cached:
-        return cached
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    batch_requests = [
+        {"url": EAST_MONEY_QUOTE_URL,
+         "params": {
+             "fltt": 2,
+             "invt": 2,
+             "fields": "f2,f3,f5,f12,f14,f15,f16,f18",
+             "secids": ",".join(_to_east_money_secid(t) for t in chunk),
+         }}
+        for chunk in chunks
+    ]
     
-    result = {
-        "name": ticker,
-        "price": None,
-        "change_pct": None,
-        "volume": None,
-        "update_time": None
-    }
+    results = {}
+    if not chunks or not _east_money_breaker.allow_request():
+        return results
     
-    # A股：优先使用新浪财经
-    if ticker.isdigit() and len(ticker) == 6:
-        sina_data = get_stock_realtime_data_sina(ticker)
-        if sina_data:
-            _set_cache(cache_key, sina_data)
-            return sina_data
-        
-        # 新浪失败，尝试使用akshare
+    update_time = datetime.now().strftime("%Y-%m-%d %H:%M")
+    for chunk, response in zip(chunks, fetch_engine.get_many(batch_requests)):
+        if not response.ok:
+            _east_money_breaker.record_failure()
+            print(f"东方财富批量获取数据失败 {chunk}: {response.error or response.status}")
+            continue
         try:
-            df = ak.stock_zh_a_spot_em()
-            match = df[df['代码'] == ticker]
-            if not match.empty:
-                row = match.iloc[0]
-                result = {
-                    "name": row['名称'],
-                    "price": row['最新价'],
-                    "change_pct": row['涨跌幅'],
-                    "volume": row['成交量'],
-                    "update_time": datetime.now().strftime("%Y-%m-%d %H:%M")
+            diff = (response.json().get("data") or {}).get("diff") or []
+        except ValueError as e:
+            _east_money_breaker.record_failure()
+            print(f"东方财富行情解析失败 {chunk}: {e}")
+            continue
+        _east_money_breaker.record_success()
+        if isinstance(diff, dict):
+            diff = list(diff.values())
+        
+        for item in diff:
+            try:
+                results[str(item["f12"])] = {
+                    "name": item["f14"],
+                    "price": float(item["f2"]),
+                    "prev_close": float(item["f18"]),
+                    "change_pct": float(item["f3"]),
+                    "volume": float(item["f5"]),
+                    "high": float(item["f15"]),
+                    "low": float(item["f16"]),
+                    "update_time": update_time,
+                    "data_source": "east_money"
                 }
-                _set_cache(cache_key, result)
-                return result
-        except Exception as e:
-            print(f"akshare获取A股数据失败 {ticker}: {e}")
+            except (KeyError, TypeError, ValueError):
+                # 停牌时价格字段为 "-"，跳过
+                continue
+    
+    return results
+
+def get_stock_realtime_data_sina(ticker: str) -> Optional[Dict[str, Any]]:
+    """
+    使用新浪财经API获取A股实时数据（分散请求压力）
+    
+    Args:
+        ticker: A股代码（6位数字）
+    """
+    return get_stock_realtime_data_sina_batch([ticker]).get(ticker)
+
+def prefetch_stock_realtime_data(tickers: List[str]):
+    """
+    预取一组股票的实时数据，A股通过新浪批量接口一次性获取，
+    结果同时写入 get_stock_realtime_data 首先读取的行情缓存，之后逐只读取不再经行情路由逐只请求
+    
+    Args:
+        tickers: 股票代码列表
+    """
+    cn_tickers = [t for t in tickers if t.isdigit() and len(t) == 6 and not _get_from_cache("stock", t)]
+    if not cn_tickers:
+        return
+    for ticker, data in get_stock_realtime_data_sina_batch(cn_tickers).items():
+        _set_cache("stock", ticker, {**data, "data_source": "sina"}, ttl=_stock_cache_ttl(ticker, "CN"))
+
+def _fetch_sina_quote(ticker: str) -> Optional[Dict[str, Any]]:
+    """新浪接口获取单只A股（缓存命中、负缓存或熔断时不请求上游，不计入路由统计）"""
+    cached = _get_from_cache("sina", ticker)
+    if cached:
+        raise NoUpstreamCall(cached)
+    if _is_known_bad("sina", ticker) or _sina_breaker.state == STATE_OPEN:
+        raise NoUpstreamCall()
+    return get_stock_realtime_data_sina(ticker)
+
+def _fetch_east_money_quote(ticker: str) -> Optional[Dict[str, Any]]:
+    """东方财富多代码行情接口获取单只A股（熔断时不请求上游，不计入路由统计）"""
+    if _east_money_breaker.state == STATE_OPEN:
+        raise NoUpstreamCall()
+    return get_stock_realtime_data_east_money_batch([ticker]).get(ticker)
+
+def _fetch_akshare_snapshot_quote(ticker: str) -> Optional[Dict[str, Any]]:
+    """从共享的全市场快照读取单只A股（TTL内不重复下载，读取已有快照时不计入路由统计）"""
+    row, requested = a_share_snapshot.lookup(ticker)
+    quote = _snapshot_row_to_quote(row) if row is not None else None
+    if not requested:
+        raise NoUpstreamCall(quote)
+    return quote
+
+def _snapshot_row_to_quote(row: Dict[str, Any]) -> Dict[str, Any]:
+    """全市场快照中的一行转换为行情字典"""
+    # 刷新失败时可能是旧快照：更新时间取快照下载时间
+    loaded_at = datetime.now() - timedelta(seconds=a_share_snapshot.age_seconds() or 0)
+    return {
+        "name": row['名称'],
+        "price": float(row['最新价']),
+        "prev_close": float(row['昨收']),
+        "change_pct": float(row['涨跌幅']),
+        "volume": float(row['成交量']),
+        "high": float(row['最高']),
+        "low": float(row['最低']),
+        "update_time": loaded_at.strftime("%Y-%m-%d %H:%M")
+    }
+
+def _to_yfinance_symbol(ticker: str) -> str:
+    """A股/港股数字代码转换为 yfinance 格式（600519 → 600519.SS，00700 → 0700.HK）"""
+    market = detect_market(ticker)
+    if market == "CN":
+        return f"{ticker}.SS" if ticker.startswith(("6", "5", "9")) else f"{ticker}.SZ"
+    if market == "HK" and ticker.isdigit():
+        return f"{int(ticker):04d}.HK"
+    return ticker
+
+def _fetch_yfinance_quote(ticker: str) -> Optional[Dict[str, Any]]:
+    """yfinance 获取单只行情（熔断或近期确认无数据时直接返回None）"""
+    if _is_known_bad("yfinance", ticker) or not _yfinance_breaker.allow_request():
+        raise NoUpstreamCall()
     
-    # 美股/港股：使用yfinance
     try:
-        stock = yf.Ticker(ticker)
+        symbol = _to_yfinance_symbol(ticker)
+        rate_limiters.acquire(YAHOO_FINANCE_HOST)
+        stock = yf.Ticker(symbol)
         info = stock.fast_info
         
         result = {
-            "name": stock.info.get("longName", ticker),
+            # 名称读取本地元数据缓存（缺失时后台补齐），不等待 .info
+            "name": symbol_metadata.get_name(symbol, default=ticker),
             "price": info.last_price,
+            "prev_close": info.previous_close,
             "change_pct": ((info.last_price - info.previous_close) / info.previous_close) * 100 if info.previous_close > 0 else 0,
             "volume": info.last_volume,
+            "high": info.day_high,
+            "low": info.day_low,
             "update_time": datetime.now().strftime("%Y-%m-%d %H:%M")
         }
-        
-        _set_cache(cache_key, result)
+        _yfinance_breaker.record_success()
+        return result
         
     except Exception as e:
+        _yfinance_breaker.record_failure()
+        _mark_bad("yfinance", ticker)
         print(f"yfinance获取数据失败 {ticker}: {e}")
+        return None
+
+# 行情路由：初始顺序与原先一致（新浪 → 东方财富 → akshare快照 → yfinance），之后按实测延迟和成功率调整
+quote_router = QuoteRouter()
+quote_router.register("sina", _fetch_sina_quote, markets={"CN"}, prior_latency=0.2, breaker="sina")
+quote_router.register("east_money", _fetch_east_money_quote, markets={"CN"}, prior_latency=0.3, breaker="east_money")
+quote_router.register("akshare", _fetch_akshare_snapshot_quote, markets={"CN"}, prior_latency=2.0, breaker="east_money")
+quote_router.register("yfinance", _fetch_yfinance_quote, markets={"CN", "HK", "US"}, prior_latency=1.0, breaker="yfinance")
+
+def route_stock_quote(ticker: str, market: str = "AUTO") -> Optional[Dict[str, Any]]:
+    """
+    通过行情路由获取单只股票行情（不读写缓存）
     
-    return result
+    Args:
+        ticker: 股票代码
+        market: 市场类型（US, CN, HK, AUTO）
+        
+    Returns:
+        行情字典（data_source 为实际提供数据的数据源），全部失败返回None
+    """
+    routed = quote_router.route(ticker, market)
+    if routed is None:
+        return None
+    provider, data = routed
+    return {**data, "data_source": provider}
+
+def get_stock_realtime_data(ticker: str, market: str = "AUTO") -> Dict[str, Any]:
+    """
+    获取股票实时数据（按各数据源的实测延迟和成功率路由，慢于 p95 时对冲到次优数据源）
+    
+    Args:
+        ticker: 股票代码
+        market: 市场类型（US, CN, HK, AUTO）
+    """
+    cached = _get_from_cache("stock", ticker)
+    if cached:
+        return cached
+    
+    # 并发的相同请求只访问一次上游
+    return _inflight.do(f"stock:{ticker}", _load_stock_realtime_data, ticker, market)
+
+def _load_stock_realtime_data(ticker: str, market: str = "AUTO") -> Dict[str, Any]:
+    """从上游加载股票数据并写入缓存（由 get_stock_realtime_data 合并调用）"""
+    cached = _get_from_cache("stock", ticker)
+    if cached:
+        return cached
+    
+    data = route_stock_quote(ticker, market)
+    if data is None:
+        return {
+            "name": ticker,
+            "price": None,
+            "change_pct": None,
+            "volume": None,
+            "update_time": None
+        }
+    
+    _set_cache("stock", ticker, data, ttl=_stock_cache_ttl(ticker, market))
+    return data
 
 def get_holdings_realtime_prices(holdings: List) -> List[Dict[str, Any]]:
     """
@@ -231,6 +552,9 @@ def get_holdings_realtime_prices(holdings: List) -> List[Dict[str, Any]]:
     """
     results = []
     
+    # 批量预取A股行情，后续逐只读取直接命中缓存
+    prefetch_stock_realtime_data([h.stock_symbol for h in holdings[:30]])
+    
     for holding in holdings[:30]:  # 只获取前30只
         try:
             # 获取实时数据
@@ -294,11 +618,18 @@ def analyze_trend_24h(history_df: pd.DataFrame) -> str:
 
 def clear_cache():
     """
-    清除所有缓存数据，用于手动刷新
+    清除所有缓存数据，用于手动刷新（共享行情缓存在本机所有进程中失效）
+    
+    Returns:
+        dict: 清除前的缓存统计信息
     """
-    global _cache
-    _cache = {}
-    print("缓存已清除")
+    stats = get_cache_stats()
+    _cache.clear()
+    _negative_cache.clear()
+    a_share_snapshot.invalidate()
+    clear_price_panel_cache()
+    print(f"缓存已清除（{stats['entries']} 条, {stats['bytes'] / 1024:.1f} KB, 命中率 {stats['hit_rate']:.1%}）")
+    return stats
 
 def get_holdings_prices_from_db(db, holdings: List) -> List[Dict[str, Any]]:
     """
@@ -309,12 +640,14 @@ def get_holdings_prices_from_db(db, holdings: List) -> List[Dict[str, Any]]:
         holdings: FundHolding 对象列表
         
     Returns:
-        持仓股票数据列表（含贡献度）
+        持仓股票数据列表（含贡献度，以及轮询服务汇总的最近24小时30分钟K收盘价 trend）
     """
+    from src.services.quote_history_service import QuoteHistoryService
     from src.services.stock_quote_service import StockQuoteService
     
     symbols = [h.stock_symbol for h in holdings[:30]]
     quotes_map = {q['code']: q for q in StockQuoteService.get_batch_quotes(db, symbols)}
+    trends = QuoteHistoryService.get_recent_closes(db, symbols, interval="30m", hours=24)
     
     results = []
     for holding in holdings[:30]:
@@ -329,7 +662,8 @@ def get_holdings_prices_from_db(db, holdings: List) -> List[Dict[str, Any]]:
             "weight": holding.weight,
             "price": quote.get("price"),
             "change_pct": change_pct,
-            "贡献度": contribution
+            "贡献度": contribution,
+            "trend": trends.get(holding.stock_symbol, [])
         })
     
     return results
@@ -0,0 +1,234 @@
+"""
+名称搜索索引模块
+对代码、中文简称和拼音首字母预先建立索引：
+- 代码、简称与拼音首字母：排序键数组 + 二分查找做前缀匹配
+- 中文简称：字符二元组（bigram）倒排索引做子串匹配，倒排列表按名称长度排序
+查询只访问少量候选，不再对整张基金表做 str.contains 扫描
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.data.fund_directory import fund_directory
+
+# 匹配类型得分（越高越靠前）
+SCORE_CODE_EXACT = 100
+SCORE_NAME_EXACT = 90
+SCORE_CODE_PREFIX = 80
+SCORE_PINYIN_EXACT = 75
+SCORE_NAME_PREFIX = 70
+SCORE_PINYIN_PREFIX = 60
+SCORE_NAME_CONTAINS = 50
+
+# 前缀匹配时最多取出的候选数（相对 top_k 的倍数）
+PREFIX_CANDIDATE_FACTOR = 20
+
+
+def _name_grams(text: str) -> Set[str]:
+    """生成名称的单字与二元组集合"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class SearchIndex:
+    """
+    支持增量更新的名称搜索索引
+
+    核心属性：
+        - market (str): 结果中的“市场”字段
+        - version (int): 已同步的数据源版本号
+
+    使用示例：
+        index = SearchIndex(market="A股基金")
+        index.sync({"161725": ("招商中证白酒指数A", "ZSZZBJZSA")})
+        results = index.search("白酒", top_k=5)
+    """
+
+    def __init__(self, market: str):
+        self.market = market
+        self.version = -1
+        self._entries: Dict[str, Tuple[str, str]] = {}
+        # 倒排列表：{字或二元组: [(名称长度, 代码)]}，保持有序以便按相关度提前截断
+        self._grams: Dict[str, List[Tuple[int, str]]] = {}
+        # (大写键, 代码) 的有序数组，用于前缀二分查找
+        self._keys: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, code: str, name: str, pinyin: str, keep_sorted: bool = True):
+        """将单条记录加入倒排索引（有序键数组由调用方统一重建）"""
+        self._entries[code] = (name, pinyin)
+        posting = (len(name), code)
+        for gram in _name_grams(name.upper()):
+            postings = self._grams.setdefault(gram, [])
+            if keep_sorted:
+                bisect.insort(postings, posting)
+            else:
+                postings.append(posting)
+
+    def _remove(self, code: str):
+        """从倒排索引中删除单条记录"""
+        name, _ = self._entries.pop(code)
+        posting = (len(name), code)
+        for gram in _name_grams(name.upper()):
+            postings = self._grams.get(gram)
+            if not postings:
+                continue
+            pos = bisect.bisect_left(postings, posting)
+            if pos < len(postings) and postings[pos] == posting:
+                postings.pop(pos)
+            if not postings:
+                del self._grams[gram]
+
+    def sync(self, records: Dict[str, Tuple[str, str]], version: Optional[int] = None) -> Dict[str, int]:
+        """
+        与最新数据源增量同步：只处理新增、删除和名称变化的记录
+
+        Args:
+            records: {代码: (名称, 拼音首字母)}
+            version: 数据源版本号（可选）
+
+        Returns:
+            dict: 新增、删除、更新的记录数
+        """
+        with self._lock:
+            # 首次构建时批量追加后统一排序，比逐条插入快
+            bulk = not self._entries
+            added = removed = updated = 0
+            for code in [c for c in self._entries if c not in records]:
+                self._remove(code)
+                removed += 1
+
+            for code, (name, pinyin) in records.items():
+                current = self._entries.get(code)
+                if current == (name, pinyin):
+                    continue
+                if current is not None:
+                    self._remove(code)
+                    updated += 1
+                else:
+                    added += 1
+                self._add(code, name, pinyin, keep_sorted=not bulk)
+
+            if bulk:
+                for postings in self._grams.values():
+                    postings.sort()
+
+            if added or removed or updated:
+                keys = []
+                for code, (name, pinyin) in self._entries.items():
+                    keys.append((code.upper(), code))
+                    keys.append((name.upper(), code))
+                    if pinyin:
+                        keys.append((pinyin.upper(), code))
+                keys.sort()
+                self._keys = keys
+
+            if version is not None:
+                self.version = version
+            return {"added": added, "removed": removed, "updated": updated}
+
+    def _prefix_candidates(self, query: str, limit: int) -> Set[str]:
+        """在有序键数组中二分查找以 query 开头的键"""
+        candidates = set()
+        pos = bisect.bisect_left(self._keys, (query, ""))
+        while pos < len(self._keys) and len(candidates) < limit:
+            key, code = self._keys[pos]
+            if not key.startswith(query):
+                break
+            candidates.add(code)
+            pos += 1
+        return candidates
+
+    def _gram_candidates(self, query: str, limit: int) -> Set[str]:
+        """
+        子串匹配候选：遍历最短的倒排列表（按名称长度有序），
+        找到 limit 条真正包含查询的记录后即停止
+        """
+        grams = [query[i:i + 2] for i in range(len(query) - 1)] or [query]
+        postings = [self._grams.get(g) for g in grams]
+        if not all(postings):
+            return set()
+
+        candidates = set()
+        for _, code in min(postings, key=len):
+            if query in self._entries[code][0].upper():
+                candidates.add(code)
+                if len(candidates) >= limit:
+                    break
+        return candidates
+
+    def _score(self, code: str, query: str) -> int:
+        """计算单条记录与查询的匹配得分，不匹配返回0"""
+        name, pinyin = self._entries[code]
+        name_upper = name.upper()
+        pinyin_upper = pinyin.upper()
+        if code == query:
+            return SCORE_CODE_EXACT
+        if name_upper == query:
+            return SCORE_NAME_EXACT
+        if code.startswith(query):
+            return SCORE_CODE_PREFIX
+        if pinyin_upper and pinyin_upper == query:
+            return SCORE_PINYIN_EXACT
+        if name_upper.startswith(query):
+            return SCORE_NAME_PREFIX
+        if pinyin_upper and pinyin_upper.startswith(query):
+            return SCORE_PINYIN_PREFIX
+        if query in name_upper:
+            return SCORE_NAME_CONTAINS
+        return 0
+
+    def search(self, keyword: str, top_k: int = 5) -> List[Dict[str, str]]:
+        """
+        按相关度返回前 top_k 条结果
+
+        Args:
+            keyword: 代码、名称片段或拼音首字母
+            top_k: 返回条数
+
+        Returns:
+            list: [{"代码", "名称", "市场"}]
+        """
+        query = keyword.strip().upper()
+        if not query:
+            return []
+
+        with self._lock:
+            candidates = self._prefix_candidates(query, top_k * PREFIX_CANDIDATE_FACTOR)
+            candidates |= self._gram_candidates(query, top_k)
+
+            scored = []
+            for code in candidates:
+                score = self._score(code, query)
+                if score:
+                    name = self._entries[code][0]
+                    scored.append((-score, len(name), code, name))
+
+        scored.sort()
+        return [{"代码": code, "名称": name, "市场": self.market} for _, _, code, name in scored[:top_k]]
+
+
+# 基金目录搜索索引（随基金目录刷新增量同步）
+fund_search_index = SearchIndex(market="A股基金")
+
+
+def search_funds(keyword: str, top_k: int = 5) -> List[Dict[str, str]]:
+    """
+    在基金目录中搜索基金，基金目录刷新后先增量同步索引
+
+    Args:
+        keyword: 搜索关键词
+        top_k: 返回条数
+
+    Returns:
+        list: [{"代码", "名称", "市场"}]
+    """
+    frame = fund_directory.get_frame()
+    if fund_search_index.version != fund_directory.version:
+        records = dict(zip(frame["基金代码"], zip(frame["基金简称"], frame["拼音缩写"])))
+        fund_search_index.sync(records, version=fund_directory.version)
+    return fund_search_index.search(keyword, top_k=top_k)
@@ -0,0 +1,266 @@
+"""
+跨进程共享缓存模块
+轮询服务和各个 Streamlit 进程通过同一个本地 SQLite 文件共享缓存数据：
+每个进程保留一层内存 LRU（CacheEngine）作为一级缓存，未命中时读取共享文件；
+写入在单个事务中完成（原子更新），清空缓存时递增共享的代数（generation），
+其他进程在下一次同步代数时丢弃各自的一级缓存，实现跨进程失效
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from src.data.cache_engine import DEFAULT_JITTER_RATIO, DEFAULT_TTL, CacheEngine
+
+SHARED_CACHE_DB_FILE = os.path.join(os.path.dirname(__file__), '../../data/cache/shared_cache.db')
+
+# 两次读取共享代数的最小间隔（秒），即其他进程清空缓存后本进程一级缓存的最长滞后时间
+SHARED_CACHE_SYNC_SECONDS = float(os.getenv("SHARED_CACHE_SYNC_SECONDS", "1.0"))
+
+# 每写入多少次清理一次共享文件中的过期条目
+SHARED_CACHE_PURGE_EVERY = 500
+
+# 全部命名空间共用的代数键
+_ALL_NAMESPACES = "*"
+
+
+class SharedCache:
+    """
+    一级内存缓存 + 二级共享 SQLite 缓存，接口与 CacheEngine 一致
+
+    核心属性：
+        - path (str): 共享 SQLite 文件路径
+        - local (CacheEngine): 本进程的一级缓存
+        - namespace_ttls (dict): 各命名空间的 TTL（秒），未配置时使用 default_ttl
+        - sync_seconds (float): 同步共享代数的间隔（秒）
+
+    使用示例：
+        cache = SharedCache(namespace_ttls={"fund": 600})
+        cache.set("fund", "161725", data)       # 其他进程可读
+        data = cache.get("fund", "161725")
+        cache.clear()                            # 所有进程失效
+    """
+
+    def __init__(self, path: str = SHARED_CACHE_DB_FILE, local: Optional[CacheEngine] = None,
+                 default_ttl: float = DEFAULT_TTL, namespace_ttls: Optional[Dict[str, float]] = None,
+                 jitter_ratio: float = DEFAULT_JITTER_RATIO, sync_seconds: float = SHARED_CACHE_SYNC_SECONDS):
+        self.path = path
+        self.local = local or CacheEngine(default_ttl=default_ttl, namespace_ttls=namespace_ttls)
+        self.default_ttl = default_ttl
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self.jitter_ratio = jitter_ratio
+        self.sync_seconds = sync_seconds
+        # 本进程最近一次看到的各命名空间代数
+        self._generations: Dict[str, int] = {}
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"shared_hits": 0, "shared_misses": 0, "writes": 0, "invalidations": 0}
+        self._init_schema()
+        self._sync_generations(force=True)
+
+    @contextmanager
+    def _connect(self, immediate: bool = False):
+        """
+        每次调用新建连接（保证多线程、多进程安全），正常退出时提交并关闭
+
+        Args:
+            immediate: 是否立即获取写锁（读-改-写需要原子执行时使用）
+        """
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建缓存表和代数表"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect(immediate=True) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_generations (
+                    namespace TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                )
+            """)
+
+    def _sync_generations(self, force: bool = False):
+        """读取共享代数，有变化的命名空间清空一级缓存"""
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.sync_seconds:
+            return
+        with self._connect() as conn:
+            rows = dict(conn.execute("SELECT namespace, generation FROM cache_generations").fetchall())
+        with self._lock:
+            self._synced_at = now
+            previous, self._generations = self._generations, rows
+        if rows.get(_ALL_NAMESPACES, 0) != previous.get(_ALL_NAMESPACES, 0):
+            self.local.clear()
+            return
+        for namespace, generation in rows.items():
+            if previous.get(namespace, 0) != generation:
+                self.local.clear(namespace)
+
+    def _ttl(self, namespace: str, ttl: Optional[float], jitter: bool) -> float:
+        """计算带抖动的 TTL（秒）"""
+        base = ttl if ttl is not None else self.namespace_ttls.get(namespace, self.default_ttl)
+        if not jitter:
+            return base
+        spread = base * self.jitter_ratio
+        return base + random.uniform(-spread, spread)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        读取缓存：先查一级缓存，未命中时读取共享文件并回填一级缓存
+
+        Returns:
+            缓存值，不存在或已过期返回None
+        """
+        self._sync_generations()
+        value = self.local.get(namespace, key)
+        if value is not None:
+            return value
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        remaining = row[1] - time.time() if row else 0
+        if remaining <= 0:
+            with self._lock:
+                self._stats["shared_misses"] += 1
+            return None
+
+        value = pickle.loads(row[0])
+        with self._lock:
+            self._stats["shared_hits"] += 1
+        self.local.set(namespace, key, value, ttl=remaining, jitter=False)
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, jitter: bool = True):
+        """
+        写入缓存（一级缓存和共享文件同时写入）
+
+        Args:
+            namespace: 命名空间
+            key: 键
+            value: 值（须可 pickle）
+            ttl: 过期时间（秒），None 时使用命名空间 TTL
+            jitter: 是否对过期时间加抖动
+        """
+        ttl = self._ttl(namespace, ttl, jitter)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect(immediate=True) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, blob, time.time() + ttl)
+            )
+        with self._lock:
+            self._stats["writes"] += 1
+            purge = self._stats["writes"] % SHARED_CACHE_PURGE_EVERY == 0
+        self.local.set(namespace, key, value, ttl=ttl, jitter=False)
+        if purge:
+            self.purge_expired()
+
+    def update(self, namespace: str, key: str, fn: Callable[[Optional[Any]], Any],
+               ttl: Optional[float] = None, jitter: bool = True) -> Any:
+        """
+        原子地读-改-写一条缓存（持有共享写锁期间调用 fn，其他进程的写入会等待）
+
+        Args:
+            fn: 接收当前值（不存在或已过期为None），返回新值
+
+        Returns:
+            写入的新值
+        """
+        ttl = self._ttl(namespace, ttl, jitter)
+        with self._connect(immediate=True) as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            current = pickle.loads(row[0]) if row and row[1] > time.time() else None
+            value = fn(current)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time() + ttl)
+            )
+        with self._lock:
+            self._stats["writes"] += 1
+        self.local.set(namespace, key, value, ttl=ttl, jitter=False)
+        return value
+
+    def delete(self, namespace: str, key: str):
+        """删除单条缓存（其他进程的一级缓存在该条过期前仍可能命中）"""
+        with self._connect(immediate=True) as conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+        self.local.delete(namespace, key)
+
+    def clear(self, namespace: Optional[str] = None):
+        """
+        清空缓存并递增代数，所有进程的一级缓存随之失效
+
+        Args:
+            namespace: 只清空指定命名空间，None 表示全部
+        """
+        generation_key = namespace or _ALL_NAMESPACES
+        with self._connect(immediate=True) as conn:
+            if namespace is None:
+                conn.execute("DELETE FROM cache_entries")
+            else:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            conn.execute(
+                "INSERT INTO cache_generations (namespace, generation) VALUES (?, 1) "
+                "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+                (generation_key,)
+            )
+        with self._lock:
+            self._stats["invalidations"] += 1
+        self.local.clear(namespace)
+        self._sync_generations(force=True)
+
+    def purge_expired(self) -> int:
+        """删除共享文件中已过期的条目，返回删除条数"""
+        with self._connect(immediate=True) as conn:
+            cursor = conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+            return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 一级缓存统计（hits、misses、evictions、entries、bytes 等），
+                  hit_rate 为两级合计命中率，shared 为共享文件的命中、写入、失效次数、条目数和代数
+        """
+        stats = self.local.get_stats()
+        with self._lock:
+            shared = dict(self._stats)
+            shared["generations"] = dict(self._generations)
+        with self._connect() as conn:
+            shared["entries"] = conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + shared["shared_hits"]) / lookups if lookups else 0.0
+        stats["shared"] = shared
+        return stats
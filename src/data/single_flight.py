@@ -0,0 +1,88 @@
+"""
+请求合并（single-flight）模块
+同一个键同时只有一个请求真正访问上游，其余并发调用方等待并共享该请求的结果
+"""
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _InFlightCall:
+    """一次进行中的请求及其结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    按键合并并发请求
+
+    使用示例：
+        flight = SingleFlight()
+        data = flight.do("fund:512170", fetch_fund, "512170")
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        执行 fn(*args, **kwargs)；若同一键已有请求在进行中，则等待并返回它的结果
+
+        Args:
+            key: 合并键（相同键的并发请求只执行一次）
+            fn: 实际的请求函数
+
+        Returns:
+            fn 的返回值（并发调用方共享同一个对象）
+
+        异常：
+            fn 抛出的异常会传递给所有等待该请求的调用方
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        获取请求合并统计信息
+
+        Returns:
+            dict: calls（总调用数）、executions（实际执行数）、coalesced（被合并数）、
+                  errors（执行失败数）、in_flight（进行中的键数）
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
@@ -2,6 +2,12 @@ import yfinance as yf
 import pandas as pd
 from typing import Dict, Any, List, Optional
 
+from src.data.bar_store import price_bar_store
+from src.data.symbol_metadata import symbol_metadata
+
+# Maximum age of cached fundamentals (seconds) before .info is fetched again
+STOCK_INFO_MAX_AGE = 6 * 3600
+
 def get_stock_history(ticker: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
     """
     Fetches historical market data for a given ticker.
@@ -14,6 +20,15 @@ def get_stock_history(ticker: str, period: str = "1y", interval: str = "1d") ->
     Returns:
         pd.DataFrame: A DataFrame containing the historical data.
     """
+    try:
+        # Daily bars (and weekly/monthly bars resampled from them) come from
+        # the local bar store, which only downloads the missing date ranges.
+        history = price_bar_store.get_history(ticker, period=period, interval=interval)
+        if history is not None:
+            return history
+    except Exception as e:
+        print(f"Bar store unavailable for {ticker}, falling back to yfinance: {e}")
+
     stock = yf.Ticker(ticker)
     try:
         history = stock.history(period=period, interval=interval)
@@ -32,8 +47,9 @@ def get_stock_info(ticker: str) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: A dictionary containing stock info.
     """
-    stock = yf.Ticker(ticker)
-    return stock.info
+    # The full info dict is persisted alongside the symbol metadata and
+    # only re-fetched once it is older than STOCK_INFO_MAX_AGE.
+    return symbol_metadata.get_info(ticker, max_age=STOCK_INFO_MAX_AGE)
 
 def get_stock_news(ticker: str) -> List[Dict[str, Any]]:
     """
@@ -0,0 +1,297 @@
+"""
+代码元数据缓存模块
+yf.Ticker(...).info 是 yfinance 最慢的接口，而热点路径只需要名称、品种类型、交易所和币种，
+这些信息几乎不变：这里把它们（以及最近一次完整的 info）保存在本地 SQLite 中，长期有效；
+缺失或过期时在后台线程补齐，热点路径只读缓存，从不等待 .info
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import yfinance as yf
+
+from src.data.rate_limiter import YAHOO_FINANCE_HOST, rate_limiters
+from src.data.single_flight import SingleFlight
+
+SYMBOL_METADATA_DB_FILE = os.path.join(os.path.dirname(__file__), '../../data/cache/symbol_metadata.db')
+
+# 元数据有效期（秒），默认7天
+SYMBOL_METADATA_TTL = float(os.getenv("SYMBOL_METADATA_TTL", str(7 * 24 * 3600)))
+# 确认不存在的代码的有效期（秒），避免反复查询无效代码
+SYMBOL_METADATA_MISSING_TTL = float(os.getenv("SYMBOL_METADATA_MISSING_TTL", str(24 * 3600)))
+# 获取失败后的重试间隔（秒）：期间保留原有数据，不再重复请求
+SYMBOL_METADATA_RETRY_SECONDS = float(os.getenv("SYMBOL_METADATA_RETRY_SECONDS", "600"))
+SYMBOL_METADATA_WORKERS = int(os.getenv("SYMBOL_METADATA_WORKERS", "4"))
+
+
+def extract_metadata(symbol: str, info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    从 yfinance info 中提取元数据
+
+    Returns:
+        dict: symbol、name、quote_type、exchange、currency、found（有报价时为True）
+    """
+    info = info or {}
+    return {
+        "symbol": symbol,
+        "name": info.get("longName") or info.get("shortName"),
+        "quote_type": info.get("quoteType"),
+        "exchange": info.get("exchange"),
+        "currency": info.get("currency"),
+        "found": info.get("regularMarketPrice") is not None,
+    }
+
+
+class SymbolMetadataStore:
+    """
+    持久化的代码元数据缓存，缺失或过期时后台刷新
+
+    核心属性：
+        - path (str): SQLite 文件路径
+        - ttl (float): 元数据有效期（秒）
+        - missing_ttl (float): 不存在的代码的有效期（秒）
+        - retry_seconds (float): 获取失败后的重试间隔（秒），失败不会覆盖已有数据
+
+    使用示例：
+        store = SymbolMetadataStore()
+        name = store.get_name("AAPL", default="AAPL")   # 不阻塞，缺失时后台补齐
+        meta = store.get("AAPL", wait=True)              # 缺失时同步获取
+        info = store.get_info("AAPL", max_age=6 * 3600)  # 完整 info（基本面分析）
+    """
+
+    def __init__(self, path: str = SYMBOL_METADATA_DB_FILE, ttl: float = SYMBOL_METADATA_TTL,
+                 missing_ttl: float = SYMBOL_METADATA_MISSING_TTL, workers: int = SYMBOL_METADATA_WORKERS,
+                 retry_seconds: float = SYMBOL_METADATA_RETRY_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.retry_seconds = retry_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="symbol-metadata")
+        self._inflight = SingleFlight()
+        # 内存中的元数据（首次访问时从本地文件加载）：{代码: 元数据}
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        # 获取失败的代码下次允许重试的时间：{代码: 时间戳}
+        self._retry_at: Dict[str, float] = {}
+        self._loaded = False
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "fetches": 0, "errors": 0}
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """每次调用新建连接（保证多线程安全），正常退出时提交并关闭"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建元数据表"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbol_metadata (
+                    symbol TEXT PRIMARY KEY,
+                    name TEXT,
+                    quote_type TEXT,
+                    exchange TEXT,
+                    currency TEXT,
+                    found INTEGER NOT NULL,
+                    info_json TEXT,
+                    fetched_at REAL NOT NULL,
+                    retry_at REAL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(symbol_metadata)").fetchall()}
+            if "retry_at" not in columns:
+                conn.execute("ALTER TABLE symbol_metadata ADD COLUMN retry_at REAL")
+
+    def _ensure_loaded(self):
+        """首次访问时把本地文件中的元数据载入内存"""
+        if self._loaded:
+            return
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT symbol, name, quote_type, exchange, currency, found, fetched_at, retry_at FROM symbol_metadata"
+            ).fetchall()
+        with self._lock:
+            for symbol, name, quote_type, exchange, currency, found, fetched_at, retry_at in rows:
+                self._memory.setdefault(symbol, {
+                    "symbol": symbol, "name": name, "quote_type": quote_type, "exchange": exchange,
+                    "currency": currency, "found": bool(found), "fetched_at": fetched_at,
+                })
+                if retry_at:
+                    self._retry_at.setdefault(symbol, retry_at)
+            self._loaded = True
+
+    def _is_fresh(self, meta: Dict[str, Any]) -> bool:
+        ttl = self.ttl if meta["found"] else self.missing_ttl
+        return time.time() - meta["fetched_at"] < ttl
+
+    def _retry_pending(self, symbol: str) -> bool:
+        """最近一次获取失败且尚未到重试时间"""
+        with self._lock:
+            return time.time() < self._retry_at.get(symbol, 0.0)
+
+    @staticmethod
+    def _fetch_info(symbol: str) -> Dict[str, Any]:
+        """调用 yfinance 获取完整 info"""
+        rate_limiters.acquire(YAHOO_FINANCE_HOST)
+        return yf.Ticker(symbol).info or {}
+
+    def _refresh(self, symbol: str) -> Dict[str, Any]:
+        """从网络获取 info，写入本地文件和内存，返回完整 info；获取失败时保留原有数据并返回原有 info"""
+        with self._lock:
+            self._stats["fetches"] += 1
+        try:
+            info = self._fetch_info(symbol)
+            if not info:
+                raise ValueError("info 为空")
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            print(f"获取代码元数据失败 {symbol}: {e}")
+            return self._record_failure(symbol)
+
+        meta = extract_metadata(symbol, info)
+        meta["fetched_at"] = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO symbol_metadata "
+                "(symbol, name, quote_type, exchange, currency, found, info_json, fetched_at, retry_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                (symbol, meta["name"], meta["quote_type"], meta["exchange"], meta["currency"],
+                 int(meta["found"]), json.dumps(info, default=str, ensure_ascii=False), meta["fetched_at"])
+            )
+        with self._lock:
+            self._memory[symbol] = meta
+            self._retry_at.pop(symbol, None)
+        return info
+
+    def _record_failure(self, symbol: str) -> Dict[str, Any]:
+        """获取失败：不覆盖已有数据（也不记为不存在），只推迟下次重试时间，返回原有 info"""
+        retry_at = time.time() + self.retry_seconds
+        with self._lock:
+            self._retry_at[symbol] = retry_at
+        with self._connect() as conn:
+            conn.execute("UPDATE symbol_metadata SET retry_at = ? WHERE symbol = ?", (retry_at, symbol))
+            row = conn.execute("SELECT info_json FROM symbol_metadata WHERE symbol = ?", (symbol,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def _refresh_in_background(self, symbol: str):
+        """提交后台刷新任务（同一代码同时只提交一次）"""
+        with self._lock:
+            if symbol in self._pending:
+                return
+            self._pending.add(symbol)
+
+        def run():
+            try:
+                self._inflight.do(symbol, self._refresh, symbol)
+            finally:
+                with self._lock:
+                    self._pending.discard(symbol)
+
+        self._executor.submit(run)
+
+    def get(self, symbol: str, wait: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        读取元数据
+
+        Args:
+            symbol: yfinance 代码
+            wait: 本地没有时是否同步获取；为False时立即返回并在后台补齐
+
+        Returns:
+            dict: name、quote_type、exchange、currency、found、fetched_at；没有缓存且不等待时返回None
+        """
+        self._ensure_loaded()
+        with self._lock:
+            meta = self._memory.get(symbol)
+        if meta is not None:
+            fresh = self._is_fresh(meta)
+            with self._lock:
+                self._stats["hits" if fresh else "stale"] += 1
+            if not fresh and not self._retry_pending(symbol):
+                # 过期数据先照常返回，后台刷新
+                self._refresh_in_background(symbol)
+            return dict(meta)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        if self._retry_pending(symbol):
+            return None
+        if not wait:
+            self._refresh_in_background(symbol)
+            return None
+        self._inflight.do(symbol, self._refresh, symbol)
+        with self._lock:
+            meta = self._memory.get(symbol)
+        return dict(meta) if meta else None
+
+    def get_many(self, symbols: List[str], wait: bool = False) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        批量读取元数据（等待时缺失的代码并发获取）
+
+        Returns:
+            dict: {代码: 元数据或None}
+        """
+        if not wait:
+            return {symbol: self.get(symbol) for symbol in symbols}
+        return dict(zip(symbols, self._executor.map(lambda s: self.get(s, wait=True), symbols)))
+
+    def get_name(self, symbol: str, default: Optional[str] = None) -> Optional[str]:
+        """读取显示名称（不阻塞），没有缓存时返回 default"""
+        meta = self.get(symbol)
+        if meta and meta.get("name"):
+            return meta["name"]
+        return default
+
+    def get_info(self, symbol: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        读取完整 info（基本面等需要全部字段的场景），超过 max_age 时同步刷新
+
+        Args:
+            symbol: yfinance 代码
+            max_age: 可接受的最大缓存时间（秒），None 时使用元数据有效期
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT info_json, fetched_at FROM symbol_metadata WHERE symbol = ?", (symbol,)
+            ).fetchone()
+        has_info = bool(row and row[0] and row[0] != "{}")
+        if has_info and (time.time() - row[1] < max_age or self._retry_pending(symbol)):
+            # 未过期，或刚刷新失败尚未到重试时间时沿用已有 info
+            with self._lock:
+                self._stats["hits"] += 1
+            return json.loads(row[0])
+        if self._retry_pending(symbol):
+            return {}
+        return self._inflight.do(symbol, self._refresh, symbol)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中/未命中/过期/网络获取/失败次数及内存中的条目数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._memory)
+            stats["pending"] = len(self._pending)
+        return stats
+
+
+# 进程内共享的代码元数据缓存
+symbol_metadata = SymbolMetadataStore()
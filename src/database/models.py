@@ -76,3 +76,47 @@ class StockQuote(Base):
     data_source = Column(String(20), nullable=True)  # sina/akshare/yfinance
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class QuoteTick(Base):
+    """轮询行情快照（只追加），按 (symbol, ts) 聚簇存储"""
+    __tablename__ = "quote_ticks"
+    __table_args__ = {"sqlite_with_rowid": False}
+    
+    symbol = Column(String(20), primary_key=True)
+    ts = Column(DateTime, primary_key=True)  # UTC
+    price = Column(Float, nullable=False)
+    volume = Column(Float, nullable=True)  # 当日累计成交量
+
+class QuoteBar(Base):
+    """由轮询快照汇总的K线（1m / 30m / 1d）"""
+    __tablename__ = "quote_bars"
+    __table_args__ = {"sqlite_with_rowid": False}
+    
+    symbol = Column(String(20), primary_key=True)
+    interval = Column(String(4), primary_key=True)
+    bar_start = Column(DateTime, primary_key=True)  # UTC
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Float, nullable=True)
+
+class PollerWorker(Base):
+    """轮询服务工作进程注册表（按心跳判断存活）"""
+    __tablename__ = "poller_workers"
+    
+    worker_id = Column(String(100), primary_key=True)
+    host = Column(String(100), nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, nullable=False)  # UTC
+    expires_at = Column(DateTime, nullable=False, index=True)  # UTC，过期即视为已退出
+
+class PollerLease(Base):
+    """轮询分片租约：只有租约持有者轮询该分片的股票"""
+    __tablename__ = "poller_leases"
+    
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    owner = Column(String(100), nullable=True, index=True)
+    acquired_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)  # UTC，过期后其他工作进程可以接管
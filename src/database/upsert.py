@@ -0,0 +1,35 @@
+"""
+批量 upsert 语句构造
+按数据库方言生成单条多行 INSERT：SQLite / PostgreSQL 为 ON CONFLICT DO UPDATE，MySQL 为 ON DUPLICATE KEY UPDATE
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+
+def build_upsert(dialect_name: str, model, rows: List[Dict[str, Any]], key_columns: List[str],
+                 update_columns: List[str]):
+    """
+    构造批量插入语句，主键/唯一键冲突时更新指定列
+
+    Args:
+        dialect_name: 数据库方言（sqlite、mysql、postgresql）
+        model: ORM 模型类
+        rows: 列名到值的字典列表
+        key_columns: 冲突判断所用的唯一键列（MySQL 由表上的唯一键决定）
+        update_columns: 冲突时更新的列
+
+    Returns:
+        单条 INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE 语句
+    """
+    if dialect_name == "mysql":
+        stmt = mysql.insert(model).values(rows)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+    if dialect_name in ("sqlite", "postgresql"):
+        dialect = sqlite if dialect_name == "sqlite" else postgresql
+        stmt = dialect.insert(model).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[getattr(model, c) for c in key_columns],
+            set_={c: stmt.excluded[c] for c in update_columns}
+        )
+    raise ValueError(f"不支持批量写入的数据库类型: {dialect_name}")
@@ -0,0 +1,178 @@
+"""
+基金持仓刷新服务
+订阅时在后台线程获取持仓，不阻塞订阅流程；
+定时任务检查所有已订阅基金是否披露了新季度，只有出现新季度时才改写订阅的持仓
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import schedule
+from sqlalchemy.orm import Session
+
+from src.data.fund_loader import get_fund_holdings
+from src.data.holdings_store import fund_holdings_store
+from src.database.database import get_db
+from src.database.models import FundHolding, MarketType, Subscription
+
+# 定时检查新季度披露的间隔（小时）
+HOLDINGS_REFRESH_HOURS = float(os.getenv("HOLDINGS_REFRESH_HOURS", "6"))
+
+# 需要维护持仓的订阅市场类型：持仓只有国内基金可以获取（按季度披露，见 holdings_store），
+# 订阅时提交下载与定时检查新季度使用同一范围
+HOLDINGS_MARKET_TYPES = (MarketType.FUND,)
+
+
+def replace_subscription_holdings(db: Session, subscription_id: int, holdings: List[dict]) -> int:
+    """
+    用最新持仓替换订阅的全部持仓记录
+
+    Args:
+        db: 数据库会话
+        subscription_id: 订阅ID
+        holdings: [{"symbol", "name", "weight"}]
+
+    Returns:
+        int: 写入的持仓条数
+    """
+    db.query(FundHolding).filter(FundHolding.subscription_id == subscription_id).delete()
+    now = datetime.utcnow()
+    for h in holdings:
+        db.add(FundHolding(
+            subscription_id=subscription_id,
+            stock_symbol=h.get("symbol", ""),
+            stock_name=h.get("name", ""),
+            weight=h.get("weight", 0.0),
+            updated_at=now
+        ))
+    db.commit()
+    return len(holdings)
+
+
+class HoldingsRefreshService:
+    def __init__(self, interval_hours: float = HOLDINGS_REFRESH_HOURS, workers: int = 2):
+        """
+        初始化持仓刷新服务
+
+        Args:
+            interval_hours: 定时检查新季度的间隔（小时）
+            workers: 后台下载线程数
+        """
+        self.interval_hours = interval_hours
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="holdings-refresh")
+        self._scheduler = schedule.Scheduler()
+        self._thread = None
+        # 多个轮询进程同时运行时，只有该函数返回 True 的进程执行定时刷新（None 表示总是执行）
+        self.is_leader: Optional[Callable[[], bool]] = None
+        # 最近一次定时刷新的统计
+        self.last_refresh_stats: Dict[str, int] = {}
+
+    def sync_subscription(self, subscription_id: int, ticker: str) -> int:
+        """获取持仓并写入单个订阅（在后台线程中执行）"""
+        try:
+            holdings = get_fund_holdings(ticker)
+            if not holdings:
+                return 0
+            db = next(get_db())
+            try:
+                count = replace_subscription_holdings(db, subscription_id, holdings)
+            finally:
+                db.close()
+            print(f"[持仓] {ticker} 已写入 {count} 只成分股")
+            return count
+        except Exception as e:
+            print(f"[持仓] 获取 {ticker} 持仓失败: {e}")
+            return 0
+
+    def submit(self, subscription_id: int, ticker: str) -> Future:
+        """
+        提交后台持仓下载任务，立即返回
+
+        Args:
+            subscription_id: 订阅ID
+            ticker: 基金代码
+
+        Returns:
+            Future: 结果为写入的持仓条数
+        """
+        return self._executor.submit(self.sync_subscription, subscription_id, ticker)
+
+    def refresh_all(self) -> Dict[str, int]:
+        """
+        检查所有已订阅基金的新季度披露，只改写有新季度或尚无持仓的订阅
+
+        Returns:
+            dict: 检查的基金数、出现新季度的基金数、更新的订阅数
+        """
+        db = next(get_db())
+        stats = {"funds": 0, "new_quarters": 0, "subscriptions_updated": 0}
+        try:
+            subs = db.query(Subscription).filter(Subscription.market_type.in_(HOLDINGS_MARKET_TYPES)).all()
+            by_code: Dict[str, List[Subscription]] = {}
+            for sub in subs:
+                by_code.setdefault(sub.symbol, []).append(sub)
+
+            for code, code_subs in by_code.items():
+                stats["funds"] += 1
+                try:
+                    new_quarters = fund_holdings_store.update(code)
+                except Exception as e:
+                    print(f"[持仓] 检查 {code} 新季度失败: {e}")
+                    continue
+                if new_quarters:
+                    stats["new_quarters"] += 1
+
+                stale = [s for s in code_subs if new_quarters or not s.holdings]
+                if not stale:
+                    continue
+                quarter, holdings = fund_holdings_store.get_latest(code, refresh=False)
+                if not holdings:
+                    continue
+                for sub in stale:
+                    replace_subscription_holdings(db, sub.id, holdings)
+                    stats["subscriptions_updated"] += 1
+                print(f"[持仓] {code} 更新到 {quarter}，涉及 {len(stale)} 个订阅")
+        finally:
+            db.close()
+
+        self.last_refresh_stats = stats
+        return stats
+
+    def _run_refresh(self):
+        """定时任务入口（异常不影响后续调度；非负责进程跳过，避免重复下载和并发改写持仓）"""
+        if self.is_leader is not None and not self.is_leader():
+            return
+        try:
+            self.refresh_all()
+        except Exception as e:
+            print(f"[持仓] 定时刷新失败: {e}")
+
+    def start(self):
+        """启动调度器（阻塞）"""
+        self._run_refresh()
+        self._scheduler.every(self.interval_hours).hours.do(self._run_refresh)
+        print(f"基金持仓刷新服务已启动，每 {self.interval_hours:g} 小时检查一次新季度披露")
+
+        while True:
+            self._scheduler.run_pending()
+            time.sleep(60)
+
+    def start_background(self, is_leader: Optional[Callable[[], bool]] = None) -> threading.Thread:
+        """
+        在后台守护线程中启动调度器（重复调用只启动一次）
+
+        Args:
+            is_leader: 多进程轮询时判断本进程是否负责刷新（每次定时任务时检查，负责进程变化时自动切换）
+        """
+        self.is_leader = is_leader
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.start, name="holdings-refresher", daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# 进程内共享的持仓刷新服务
+holdings_refresher = HoldingsRefreshService()
@@ -0,0 +1,198 @@
+"""
+持仓股票轮询优先级调度
+按引用该股票的订阅数和持仓权重之和为每只股票打分，分档设置刷新周期（每 N 轮刷新一次），
+每轮在预算内优先刷新到期最久、影响最大的股票：
+全量股票无法每轮刷新时，基金贡献度用到的高权重股票仍保持新鲜
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from src.database.models import FundHolding
+
+# 刷新分档：“排名上限:每几轮刷新一次”，逗号分隔，* 表示其余全部
+# 默认：前50只每轮刷新，第51-200只每3轮，其余每6轮
+DEFAULT_POLL_TIERS = "50:1,200:3,*:6"
+POLL_TIERS = os.getenv("POLL_TIERS", DEFAULT_POLL_TIERS)
+
+# 每轮最多刷新的股票数（0 表示不限）
+POLL_BUDGET = int(os.getenv("POLL_BUDGET", "0"))
+
+# 打分时每个订阅折算的权重（百分比），得分 = 订阅数 × 该值 + 持仓权重之和
+POLL_SUBSCRIPTION_SCORE = float(os.getenv("POLL_SUBSCRIPTION_SCORE", "5"))
+
+
+def parse_poll_tiers(spec: str) -> List[Tuple[Optional[int], int]]:
+    """
+    解析刷新分档配置
+
+    Args:
+        spec: 如 "50:1,200:3,*:6"
+
+    Returns:
+        list: [(排名上限（None 表示不限）, 每几轮刷新一次)]，按排名上限升序
+    """
+    tiers: List[Tuple[Optional[int], int]] = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        limit, every = item.split(":")
+        tiers.append((None if limit.strip() == "*" else int(limit), max(1, int(every))))
+    tiers.sort(key=lambda t: float("inf") if t[0] is None else t[0])
+    if not tiers or tiers[-1][0] is not None:
+        # 未覆盖的尾部按最后一档的周期刷新
+        tiers.append((None, tiers[-1][1] if tiers else 1))
+    return tiers
+
+
+class SymbolPriority:
+    """单只股票的优先级信息"""
+
+    def __init__(self, symbol: str, subscriptions: int, weight: float):
+        self.symbol = symbol
+        self.subscriptions = subscriptions
+        self.weight = weight
+        self.score = subscriptions * POLL_SUBSCRIPTION_SCORE + weight
+        # 所在分档序号及刷新周期（轮），由 PollScheduler.assign_tiers 设置
+        self.tier = 0
+        self.every = 1
+
+    def __repr__(self) -> str:
+        return f"SymbolPriority({self.symbol!r}, score={self.score:.2f}, tier={self.tier})"
+
+
+class PollScheduler:
+    """
+    按优先级分档的轮询调度器
+
+    核心属性：
+        - tiers (list): [(排名上限, 每几轮刷新一次)]
+        - budget (int): 每轮最多刷新的股票数（0 表示不限）
+
+    使用示例：
+        scheduler = PollScheduler()
+        symbols = scheduler.plan(db)   # 本轮需要刷新的股票（已按优先级排序）
+        scheduler.mark_polled(written)  # 只记录实际获取并写入的股票，失败的下一轮仍到期
+    """
+
+    def __init__(self, tiers: Optional[str] = None, budget: int = POLL_BUDGET):
+        self.tiers = parse_poll_tiers(tiers or POLL_TIERS)
+        self.budget = budget
+        self.cycle = 0
+        # {股票代码: 上次刷新所在轮次}
+        self._last_polled: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.last_plan_stats: Dict[str, object] = {}
+
+    @staticmethod
+    def rank(db: Session) -> List[SymbolPriority]:
+        """
+        按订阅数和持仓权重之和为全部持仓股票打分
+
+        Returns:
+            list: SymbolPriority 列表，按得分降序
+        """
+        rows = db.query(
+            FundHolding.stock_symbol,
+            func.count(func.distinct(FundHolding.subscription_id)),
+            func.coalesce(func.sum(FundHolding.weight), 0.0)
+        ).filter(FundHolding.stock_symbol.isnot(None), FundHolding.stock_symbol != "").group_by(
+            FundHolding.stock_symbol
+        ).all()
+        priorities = [SymbolPriority(symbol, int(subs), float(weight)) for symbol, subs, weight in rows]
+        priorities.sort(key=lambda p: (-p.score, p.symbol))
+        return priorities
+
+    def assign_tiers(self, priorities: List[SymbolPriority]):
+        """按排名为每只股票设置分档和刷新周期（priorities 须已按得分降序）"""
+        for rank, priority in enumerate(priorities, start=1):
+            for index, (limit, every) in enumerate(self.tiers):
+                if limit is None or rank <= limit:
+                    priority.tier, priority.every = index, every
+                    break
+
+    def select(self, priorities: List[SymbolPriority]) -> List[SymbolPriority]:
+        """
+        选出本轮到期的股票：到期程度（距上次刷新的轮数 / 刷新周期）× 得分越高越优先，
+        超出预算的股票顺延到下一轮（到期程度继续增大，不会一直得不到刷新）
+
+        Returns:
+            list: 本轮需要刷新的股票，按优先级降序
+        """
+        due = []
+        for priority in priorities:
+            last = self._last_polled.get(priority.symbol)
+            # 从未刷新过的股票视为已到期一个完整周期以上
+            elapsed = self.cycle - last if last is not None else self.cycle + priority.every
+            if elapsed >= priority.every:
+                due.append((elapsed / priority.every * max(priority.score, 0.01), priority))
+        due.sort(key=lambda item: (-item[0], item[1].symbol))
+        selected = [priority for _, priority in due]
+        if self.budget > 0:
+            selected = selected[:self.budget]
+        return selected
+
+    def mark_polled(self, symbols: List[str]):
+        """记录本轮已刷新的股票（由轮询服务在行情写入成功后调用）"""
+        with self._lock:
+            for symbol in symbols:
+                self._last_polled[symbol] = self.cycle
+
+    def plan(self, db: Session, symbol_filter: Optional[Callable[[str], bool]] = None,
+             market_filter: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        进入下一轮并返回本轮需要刷新的股票代码（按优先级降序）；
+        不记录为已刷新，获取失败的股票在下一轮仍然到期，写入成功后由调用方调用 mark_polled
+
+        Args:
+            db: 数据库会话
+            symbol_filter: 只调度返回 True 的股票（分片轮询时为本进程持有的分片；
+                           分档按全部股票的排名计算，预算只用于本进程的股票）
+            market_filter: 只保留调用方能够获取的股票（如轮询服务只写入A股），在分档前排除；
+                           否则无法写入的股票永远不会被标记为已刷新，会一直占据预算
+
+        Returns:
+            list: 股票代码
+        """
+        with self._lock:
+            self.cycle += 1
+        priorities = self.rank(db)
+        if market_filter is not None:
+            priorities = [p for p in priorities if market_filter(p.symbol)]
+        self.assign_tiers(priorities)
+        if symbol_filter is not None:
+            priorities = [p for p in priorities if symbol_filter(p.symbol)]
+        selected = self.select(priorities)
+        # 预算不足而顺延的到期股票
+        selected_symbols = {p.symbol for p in selected}
+        deferred = sum(1 for p in priorities if p.symbol not in selected_symbols and self._is_due(p))
+
+        # 清理已不在持仓中的股票
+        universe = {p.symbol for p in priorities}
+        with self._lock:
+            for symbol in [s for s in self._last_polled if s not in universe]:
+                del self._last_polled[symbol]
+
+        tier_counts: Dict[int, int] = {}
+        for priority in selected:
+            tier_counts[priority.tier] = tier_counts.get(priority.tier, 0) + 1
+        self.last_plan_stats = {
+            "cycle": self.cycle,
+            "universe": len(priorities),
+            "selected": len(selected),
+            "deferred": deferred,
+            "tiers": {f"tier{index}": tier_counts.get(index, 0) for index in range(len(self.tiers))},
+        }
+        return [p.symbol for p in selected]
+
+    def _is_due(self, priority: SymbolPriority) -> bool:
+        last = self._last_polled.get(priority.symbol)
+        return last is None or self.cycle - last >= priority.every
+
+    def get_stats(self) -> Dict[str, object]:
+        """最近一轮调度的统计：轮次、股票总数、本轮刷新数、因预算顺延数及各档刷新数"""
+        return dict(self.last_plan_stats)
@@ -0,0 +1,247 @@
+"""
+轮询分片协调
+多个轮询进程（可在不同主机上）通过数据库中的租约行划分持仓股票：
+股票按代码哈希到固定数量的分片，分片按一致性哈希分配给存活的工作进程，
+每个工作进程只轮询自己持有有效租约的分片。工作进程定期心跳续约，
+退出或失联后其租约过期，分片自动由其他工作进程接管；新增工作进程时只迁移少量分片
+"""
+import bisect
+import hashlib
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, List, Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from src.database.database import SessionLocal
+from src.database.models import PollerLease, PollerWorker
+from src.database.upsert import build_upsert
+
+# 分片数量（所有工作进程必须一致），应明显大于工作进程数
+POLLER_SHARDS = int(os.getenv("POLLER_SHARDS", "64"))
+
+# 租约有效期与心跳间隔（秒）：心跳间隔应小于有效期的一半
+POLLER_LEASE_TTL_SECONDS = float(os.getenv("POLLER_LEASE_TTL_SECONDS", "90"))
+POLLER_HEARTBEAT_SECONDS = float(os.getenv("POLLER_HEARTBEAT_SECONDS", "30"))
+
+# 一致性哈希环上每个工作进程的虚拟节点数
+POLLER_VNODES = int(os.getenv("POLLER_VNODES", "64"))
+
+# 持有该分片租约的工作进程同时负责全局任务（如持仓刷新），保证多个工作进程中只有一个执行
+POLLER_LEADER_SHARD = 0
+
+
+def symbol_shard(symbol: str, shard_count: int = POLLER_SHARDS) -> int:
+    """股票代码所属分片（跨进程、跨主机稳定）"""
+    return zlib.crc32(symbol.encode("utf-8")) % shard_count
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+def assign_shards(workers: List[str], shard_count: int = POLLER_SHARDS,
+                  vnodes: int = POLLER_VNODES) -> Dict[int, str]:
+    """
+    按一致性哈希把分片分配给工作进程
+
+    Args:
+        workers: 存活的工作进程 ID
+        shard_count: 分片数量
+        vnodes: 每个工作进程的虚拟节点数
+
+    Returns:
+        dict: {分片: 工作进程 ID}，没有工作进程时返回空字典
+    """
+    if not workers:
+        return {}
+    ring = sorted((_ring_hash(f"{worker}#{i}"), worker) for worker in set(workers) for i in range(vnodes))
+    points = [point for point, _ in ring]
+    assignment = {}
+    for shard in range(shard_count):
+        index = bisect.bisect(points, _ring_hash(f"shard-{shard}")) % len(ring)
+        assignment[shard] = ring[index][1]
+    return assignment
+
+
+def database_now(db) -> datetime:
+    """
+    数据库服务器的当前时间（UTC，不带时区），所有主机的租约以同一时钟写入和判断过期，
+    不受各主机本地时钟偏差影响
+    """
+    value = db.execute(select(func.now())).scalar()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ShardCoordinator:
+    """
+    基于数据库租约的分片协调器
+
+    核心属性：
+        - worker_id (str): 本工作进程 ID（默认 主机名-进程号-随机串）
+        - owned_shards (frozenset): 当前持有有效租约的分片
+
+    使用示例：
+        coordinator = ShardCoordinator()
+        coordinator.start_background()        # 后台心跳：注册、续约、按一致性哈希认领/释放分片
+        if coordinator.owns("600519"): ...
+        if coordinator.is_leader(): ...       # 只在一个工作进程中执行的全局任务
+        coordinator.stop()                    # 释放租约，分片立即由其他工作进程接管
+    """
+
+    def __init__(self, worker_id: Optional[str] = None, shard_count: int = POLLER_SHARDS,
+                 lease_ttl: float = POLLER_LEASE_TTL_SECONDS,
+                 heartbeat_seconds: float = POLLER_HEARTBEAT_SECONDS,
+                 session_factory=SessionLocal):
+        self.host = socket.gethostname()
+        self.worker_id = worker_id or f"{self.host}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.shard_count = shard_count
+        self.lease_ttl = lease_ttl
+        self.heartbeat_seconds = heartbeat_seconds
+        self.session_factory = session_factory
+        self.owned_shards: FrozenSet[int] = frozenset()
+        # 本地判断租约是否仍有效（心跳停滞时不再轮询，避免与接管者重复请求）
+        self._valid_until = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_heartbeat_stats: Dict[str, int] = {}
+
+    def owns(self, symbol: str) -> bool:
+        """本进程是否负责轮询该股票"""
+        if time.monotonic() >= self._valid_until:
+            return False
+        return symbol_shard(symbol, self.shard_count) in self.owned_shards
+
+    def is_leader(self) -> bool:
+        """本进程是否持有 POLLER_LEADER_SHARD 的有效租约（负责只需执行一次的全局任务）"""
+        if time.monotonic() >= self._valid_until:
+            return False
+        return POLLER_LEADER_SHARD in self.owned_shards
+
+    def _ensure_shards(self, db):
+        """补齐分片租约行（多个进程同时补齐时忽略主键冲突）"""
+        existing = {row[0] for row in db.query(PollerLease.shard).all()}
+        missing = [shard for shard in range(self.shard_count) if shard not in existing]
+        if not missing:
+            return
+        try:
+            db.add_all([PollerLease(shard=shard) for shard in missing])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+
+    def heartbeat(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        心跳一次：续约工作进程注册并清理已过期的注册，按存活工作进程重新计算分配，
+        释放不再分配给本进程的分片，续约或认领分配给本进程且无人持有（或已过期）的分片
+
+        Args:
+            now: 当前时间（UTC），默认数据库服务器的当前时间
+
+        Returns:
+            dict: workers（存活工作进程数）、assigned（分配给本进程的分片数）、
+                  owned（实际持有的分片数）、pending（等待原持有者释放或过期的分片数）
+        """
+        start = time.monotonic()
+        db = self.session_factory()
+        try:
+            now = now or database_now(db)
+            expires_at = now + timedelta(seconds=self.lease_ttl)
+            dialect_name = db.get_bind().dialect.name
+            db.execute(build_upsert(dialect_name, PollerWorker, [{
+                "worker_id": self.worker_id, "host": self.host, "started_at": now,
+                "heartbeat_at": now, "expires_at": expires_at,
+            }], ["worker_id"], ["host", "heartbeat_at", "expires_at"]))
+            # 清理已退出或失联的工作进程注册
+            db.query(PollerWorker).filter(PollerWorker.expires_at <= now).delete(synchronize_session=False)
+            db.commit()
+            self._ensure_shards(db)
+
+            workers = [row[0] for row in db.query(PollerWorker.worker_id).filter(PollerWorker.expires_at > now).all()]
+            assignment = assign_shards(workers, self.shard_count)
+            assigned = [shard for shard, worker in assignment.items() if worker == self.worker_id]
+
+            # 释放已分配给其他工作进程的分片
+            db.query(PollerLease).filter(
+                PollerLease.owner == self.worker_id, PollerLease.shard.notin_(assigned)
+            ).update({"owner": None, "expires_at": None}, synchronize_session=False)
+            # 续约仍持有的分片
+            db.query(PollerLease).filter(
+                PollerLease.owner == self.worker_id, PollerLease.shard.in_(assigned)
+            ).update({"heartbeat_at": now, "expires_at": expires_at}, synchronize_session=False)
+            # 认领无人持有或租约已过期的分片（条件更新保证同一分片只有一个持有者）
+            db.query(PollerLease).filter(
+                PollerLease.shard.in_(assigned),
+                or_(PollerLease.owner.is_(None), PollerLease.expires_at.is_(None), PollerLease.expires_at <= now)
+            ).update({"owner": self.worker_id, "acquired_at": now, "heartbeat_at": now, "expires_at": expires_at},
+                     synchronize_session=False)
+            db.commit()
+
+            owned = frozenset(row[0] for row in db.query(PollerLease.shard).filter(
+                PollerLease.owner == self.worker_id, PollerLease.expires_at > now
+            ).all())
+        except Exception as e:
+            db.rollback()
+            print(f"[分片] 心跳失败: {e}")
+            return self.last_heartbeat_stats
+        finally:
+            db.close()
+
+        if owned != self.owned_shards:
+            print(f"[分片] {self.worker_id} 持有分片 {len(self.owned_shards)} → {len(owned)}")
+        self.owned_shards = owned
+        self._valid_until = start + self.lease_ttl
+        self.last_heartbeat_stats = {
+            "workers": len(workers),
+            "assigned": len(assigned),
+            "owned": len(owned),
+            "pending": len(set(assigned) - owned),
+        }
+        return self.last_heartbeat_stats
+
+    def release(self):
+        """释放本进程的全部租约并注销（正常退出时调用，分片立即可被接管）"""
+        self.owned_shards = frozenset()
+        self._valid_until = 0.0
+        db = self.session_factory()
+        try:
+            db.query(PollerLease).filter(PollerLease.owner == self.worker_id).update(
+                {"owner": None, "expires_at": None}, synchronize_session=False
+            )
+            db.query(PollerWorker).filter(PollerWorker.worker_id == self.worker_id).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[分片] 释放租约失败: {e}")
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop_event.wait(self.heartbeat_seconds):
+            self.heartbeat()
+
+    def start_background(self) -> threading.Thread:
+        """在后台守护线程中定期心跳（重复调用只启动一次），首次心跳在返回前完成"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self.heartbeat()
+            self._thread = threading.Thread(target=self._run, name="poller-shards", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """停止心跳并释放租约"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.release()
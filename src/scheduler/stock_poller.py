@@ -2,201 +2,372 @@
 股票数据轮询服务
 定期从外部API获取股票数据并存入数据库
 """
+import os
 import time
-import random
-import schedule
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 from sqlalchemy.orm import Session
 from src.database.database import get_db
-from src.database.models import FundHolding, StockQuote, MarketType
+from src.database.models import FundHolding, MarketType
+from src.data.realtime_data import get_stock_realtime_data_east_money_batch, route_stock_quote
+from src.data.market_hours import trading_calendar
+from src.data.circuit_breaker import CircuitOpenError, get_breaker
+from src.data.rate_limiter import rate_limiters
+from src.scheduler.poll_scheduler import PollScheduler
+from src.scheduler.shard_coordinator import ShardCoordinator
+from src.services.quote_history_service import QuoteHistoryService
+from src.services.stock_quote_service import StockQuoteService
 import akshare as ak
 
+# 东方财富数据源熔断器（与行情模块共享）
+east_money_breaker = get_breaker("east_money")
+
+# akshare 全市场接口所在主机（限流配置见 rate_limiter.DEFAULT_RATE_LIMITS / RATE_LIMITS）
+EAST_MONEY_HOST = "push2.eastmoney.com"
+
+# 交易时段结束后多久执行最终轮询（秒，等待收盘集合竞价结果发布），以及超过多久不再补做
+POLL_POST_CLOSE_DELAY_SECONDS = float(os.getenv("POLL_POST_CLOSE_DELAY_SECONDS", "120"))
+POLL_POST_CLOSE_WINDOW_SECONDS = float(os.getenv("POLL_POST_CLOSE_WINDOW_SECONDS", "1800"))
+
+def is_a_share_symbol(symbol: str) -> bool:
+    """是否为轮询服务可获取并写入的A股代码（6位数字）"""
+    return symbol.isdigit() and len(symbol) == 6
+
 class StockPollerService:
-    def __init__(self, batch_size=15, interval_minutes=10):
+    def __init__(self, batch_size=15, interval_minutes=10, snapshot_mode=True, fetch_workers=4,
+                 poll_scheduler: Optional[PollScheduler] = None, coordinator: Optional[ShardCoordinator] = None):
         """
         初始化轮询服务
         
         Args:
             batch_size: 每批处理的股票数量
             interval_minutes: 轮询间隔（分钟）
+            snapshot_mode: 是否每轮只拉取一次全市场快照（关闭后回退为经行情路由逐只请求）
+            fetch_workers: 逐只请求时的并发线程数（请求速率由按主机的令牌桶控制）
+            poll_scheduler: 轮询优先级调度器（按订阅数和持仓权重分档刷新，默认读取 POLL_TIERS/POLL_BUDGET）
+            coordinator: 分片协调器（多个轮询进程按数据库租约划分股票；为 None 时本进程轮询全部股票）
         """
         self.batch_size = batch_size
         self.interval_minutes = interval_minutes
+        self.snapshot_mode = snapshot_mode
+        self.fetch_workers = fetch_workers
+        self.poll_scheduler = poll_scheduler or PollScheduler()
+        self.coordinator = coordinator
+        # 最近一轮轮询的耗时统计
+        self.last_cycle_stats: Dict[str, float] = {}
+        # 本轮批量写入数据库的行数、语句数和耗时
+        self.db_stats: Dict[str, float] = {"rows": 0, "statements": 0, "seconds": 0.0}
+        # 本轮快照时间（UTC，同一轮的快照共用），以及上次执行历史数据保留策略的时间
+        self.cycle_ts: Optional[datetime] = None
+        self.retention_applied_at = 0.0
+        # 轮询的市场（交易日历），以及已执行过最终轮询的交易时段收盘时间
+        self.market = "CN"
+        self.last_close_polled: Optional[datetime] = None
     
-    def is_trading_time(self) -> bool:
+    def is_trading_time(self, now: Optional[datetime] = None) -> bool:
         """
-        判断当前是否为A股交易时间
+        判断当前是否为A股交易时间（按交易日历排除节假日）
         
         交易时间:
-        - 周一至周五
+        - 交易日（周一至周五，且不在休市日列表中）
         - 9:30-11:30 (上午)
         - 13:00-15:00 (下午)
         
         Returns:
             bool: 是否在交易时间内
         """
-        now = datetime.now()
-        
-        # 检查是否为交易日（周一到周五）
-        if now.weekday() >= 5:  # 周六、周日
+        return trading_calendar.is_open(self.market, now)
+    
+    def _is_day_close(self, close: datetime) -> bool:
+        """该时段结束时间是否为当日最后一个交易时段的收盘（午间休市不算）"""
+        sessions = trading_calendar.sessions(self.market, close.date())
+        return bool(sessions) and sessions[-1][1] == close
+    
+    def needs_post_close_poll(self, now: Optional[datetime] = None) -> bool:
+        """
+        是否需要收盘后最终轮询：当日最后一个交易时段已结束超过 POLL_POST_CLOSE_DELAY_SECONDS
+        （收盘集合竞价结果已发布），且尚未为该交易日执行过最终轮询
+        """
+        now = now or datetime.now(timezone.utc)
+        last_close = trading_calendar.last_close(self.market, now)
+        if last_close is None or last_close == self.last_close_polled or not self._is_day_close(last_close):
             return False
+        elapsed = (now - last_close).total_seconds()
+        return POLL_POST_CLOSE_DELAY_SECONDS <= elapsed <= POLL_POST_CLOSE_WINDOW_SECONDS
+    
+    def next_wakeup(self, now: Optional[datetime] = None) -> datetime:
+        """
+        计算下一次唤醒时间：交易时段内按轮询间隔，但不晚于当日收盘后的最终轮询时间；
+        休市时直接休眠到最终轮询时间或下一个交易时段开始
         
-        # 检查是否在交易时间段
-        hour = now.hour
-        minute = now.minute
-        
-        # 上午: 9:30-11:30
-        is_morning = (hour == 9 and minute >= 30) or (10 <= hour < 11) or (hour == 11 and minute <= 30)
-        
-        # 下午: 13:00-15:00
-        is_afternoon = 13 <= hour < 15
+        Returns:
+            datetime: 下一次唤醒时间（带时区）
+        """
+        now = now or datetime.now(timezone.utc)
+        session = trading_calendar.current_session(self.market, now)
+        if session is not None:
+            wakeup = now + timedelta(minutes=self.interval_minutes)
+            if self._is_day_close(session[1]):
+                wakeup = min(wakeup, session[1] + timedelta(seconds=POLL_POST_CLOSE_DELAY_SECONDS))
+            return wakeup
         
-        return is_morning or is_afternoon
+        wakeup = trading_calendar.next_open(self.market, now)
+        last_close = trading_calendar.last_close(self.market, now)
+        if last_close is not None and last_close != self.last_close_polled and self._is_day_close(last_close):
+            post_close = last_close + timedelta(seconds=POLL_POST_CLOSE_DELAY_SECONDS)
+            if now < post_close:
+                wakeup = min(wakeup, post_close)
+        return wakeup
     
     def get_all_symbols_to_update(self, db: Session):
         """获取所有需要更新的股票代码（从FundHolding表）"""
         symbols = db.query(FundHolding.stock_symbol).distinct().all()
         return [s[0] for s in symbols if s[0]]  # 过滤空值
     
-    def fetch_stock_data_east_money(self, symbol: str):
+    @staticmethod
+    def _parse_east_money_row(row) -> dict:
+        """将东方财富行情表中的一行转换为行情字典"""
+        return {
+            "name": row['名称'],
+            "price": float(row['最新价']),
+            "prev_close": float(row['昨收']),
+            "change_pct": float(row['涨跌幅']),
+            "volume": float(row['成交量']),
+            "high": float(row['最高']),
+            "low": float(row['最低']),
+            "data_source": "east_money"
+        }
+    
+    def fetch_market_snapshot(self) -> Optional[Dict[str, dict]]:
         """
-        使用东方财富接口获取A股数据（akshare稳定版）
+        拉取一次全市场A股行情快照，并按代码建立索引
+        
+        东方财富接口每次都会返回全市场约5000只股票，
+        因此每轮轮询只请求一次，所有股票都从该索引中读取。
         
-        Args:
-            symbol: 股票代码（6位数字）
-            
         Returns:
-            dict: 股票数据，失败返回None
+            dict: {股票代码: 行情字典}，失败返回None
         """
         try:
-            # 东方财富接口：比新浪稳定
-            df = ak.stock_zh_a_spot_em()
-            match = df[df['代码'] == symbol]
-            
-            if not match.empty:
-                row = match.iloc[0]
-                return {
-                    "name": row['名称'],
-                    "price": float(row['最新价']),
-                    "prev_close": float(row['昨收']),
-                    "change_pct": float(row['涨跌幅']),
-                    "volume": float(row['成交量']),
-                    "high": float(row['最高']),
-                    "low": float(row['最低']),
-                    "data_source": "east_money"
-                }
+            rate_limiters.acquire(EAST_MONEY_HOST)
+            df = east_money_breaker.call(ak.stock_zh_a_spot_em)
+        except CircuitOpenError:
+            print("东方财富接口熔断中，跳过全市场快照")
+            return None
         except Exception as e:
-            print(f"东方财富接口获取 {symbol} 失败: {e}")
+            print(f"东方财富全市场快照获取失败: {e}")
+            return None
+        
+        snapshot = {}
+        for row in df.to_dict("records"):
+            try:
+                snapshot[str(row['代码'])] = self._parse_east_money_row(row)
+            except (TypeError, ValueError):
+                # 停牌等情况下字段可能为空，跳过该行
+                continue
+        return snapshot
+    
+    def fetch_quotes_batch(self, symbols: list) -> Optional[Dict[str, dict]]:
+        """
+        通过东方财富多代码行情接口批量拉取指定A股（异步并发，复用长连接）
+        
+        Args:
+            symbols: 股票代码列表
+            
+        Returns:
+            dict: {股票代码: 行情字典}，全部失败返回None
+        """
+        cn_symbols = [s for s in symbols if is_a_share_symbol(s)]
+        if not cn_symbols:
+            return None
+        quotes = get_stock_realtime_data_east_money_batch(cn_symbols)
+        return quotes or None
+    
+    def fetch_stock_data_routed(self, symbol: str):
+        """
+        通过行情路由获取单只A股（按各数据源实测延迟和成功率选择，慢时对冲到次优数据源）
         
-        return None
+        Args:
+            symbol: 股票代码（6位数字）
+            
+        Returns:
+            dict: 股票数据（data_source 为实际提供数据的数据源），失败返回None
+        """
+        return route_stock_quote(symbol, market="CN")
     
-    def update_stock_batch(self, db: Session, symbols: list):
+    def update_stock_batch(self, db: Session, symbols: list, snapshot: Optional[Dict[str, dict]] = None):
         """
-        批量更新股票数据（优化版：防反爬）
+        批量更新股票数据：整批行情通过一条批量 upsert 语句写入，不再逐只查询
+        （逐只请求时按主机令牌桶限速，不再固定休眠）
         
         Args:
             db: 数据库会话
             symbols: 股票代码列表
+            snapshot: 本轮全市场快照（传入时直接从快照读取，不再逐只请求）
             
         Returns:
             tuple: (成功数, 失败数)
         """
-        success_count = 0
-        fail_count = 0
+        # 没有快照时逐只请求：多线程并发经行情路由获取，实际速率由各数据源主机的令牌桶决定
+        if snapshot is None:
+            cn_symbols = [s for s in symbols if is_a_share_symbol(s)]
+            with ThreadPoolExecutor(max_workers=max(1, self.fetch_workers)) as pool:
+                snapshot = dict(zip(cn_symbols, pool.map(self.fetch_stock_data_routed, cn_symbols)))
         
-        for symbol in symbols:
-            try:
-                # A股：使用东方财富接口（优先）
-                if symbol.isdigit() and len(symbol) == 6:
-                    data = self.fetch_stock_data_east_money(symbol)
-                    
-                    if data:
-                        # 更新或插入
-                        quote = db.query(StockQuote).filter(
-                            StockQuote.symbol == symbol
-                        ).first()
-                        
-                        if quote:
-                            # 更新
-                            quote.name = data['name']
-                            quote.price = data['price']
-                            quote.prev_close = data['prev_close']
-                            quote.change_pct = data['change_pct']
-                            quote.volume = data['volume']
-                            quote.high = data['high']
-                            quote.low = data['low']
-                            quote.data_source = data['data_source']
-                            quote.updated_at = datetime.utcnow()
-                        else:
-                            # 插入
-                            quote = StockQuote(
-                                symbol=symbol,
-                                name=data['name'],
-                                price=data['price'],
-                                prev_close=data['prev_close'],
-                                change_pct=data['change_pct'],
-                                volume=data['volume'],
-                                high=data['high'],
-                                low=data['low'],
-                                market_type=MarketType.CN_STOCK,
-                                data_source=data['data_source']
-                            )
-                            db.add(quote)
-                        
-                        success_count += 1
-                
-                # 防反爬：随机延迟1-3秒
-                time.sleep(random.uniform(1, 3))
-                
-            except Exception as e:
-                print(f"更新股票 {symbol} 失败: {e}")
-                fail_count += 1
+        # A股：有行情的代码一次性写入
+        quotes = {
+            symbol: snapshot[symbol]
+            for symbol in symbols
+            if is_a_share_symbol(symbol) and snapshot.get(symbol)
+        }
+        if not quotes:
+            return 0, 0
+        
+        try:
+            start = time.perf_counter()
+            result = StockQuoteService.bulk_upsert(db, quotes, market_type=MarketType.CN_STOCK)
+            # 同时追加到盘中行情历史（与最新行情在同一事务中提交）
+            QuoteHistoryService.append_ticks(db, quotes, ts=self.cycle_ts)
+            db.commit()
+            self.db_stats["rows"] += result["rows"]
+            self.db_stats["statements"] += result["statements"]
+            self.db_stats["seconds"] += time.perf_counter() - start
+        except Exception as e:
+            db.rollback()
+            print(f"批量写入 {len(quotes)} 只股票失败: {e}")
+            return 0, len(quotes)
+        
+        # 只有实际写入的股票记为已刷新，获取或写入失败的下一轮仍然到期
+        self.poll_scheduler.mark_polled(list(quotes))
+        return len(quotes), 0
+    
+    def rollup_history(self, db: Session, symbols: list) -> float:
+        """
+        把本轮快照汇总为 1m/30m/日K，并每小时清理一次过期的快照和K线
         
-        db.commit()
-        return success_count, fail_count
+        Returns:
+            float: 耗时（秒）
+        """
+        start = time.perf_counter()
+        try:
+            QuoteHistoryService.rollup(db, since=self.cycle_ts, symbols=symbols)
+            if time.time() - self.retention_applied_at >= 3600:
+                deleted = QuoteHistoryService.apply_retention(db)
+                self.retention_applied_at = time.time()
+                print(f"盘中历史保留策略: 删除 {deleted}")
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"汇总盘中行情历史失败: {e}")
+        return time.perf_counter() - start
     
-    def poll_task(self):
-        """轮询任务主逻辑"""
+    def poll_task(self, post_close: bool = False):
+        """
+        轮询任务主逻辑
+        
+        Args:
+            post_close: 是否为收盘后最终轮询（不检查交易时间，用于记录收盘价）
+        """
         now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{now_str}] 检查是否为交易时间...")
         
         # 检查交易时间
-        if not self.is_trading_time():
-            print("❌ 当前不在交易时间（周一至周五 9:30-11:30, 13:00-15:00），跳过轮询")
+        if post_close:
+            print("✅ 交易时段已结束，执行收盘后最终轮询...")
+        elif not self.is_trading_time():
+            print("❌ 当前不在交易时间（交易日 9:30-11:30, 13:00-15:00），跳过轮询")
             return
-        
-        print("✅ 当前为交易时间，开始股票数据轮询...")
+        else:
+            print("✅ 当前为交易时间，开始股票数据轮询...")
         
         db = next(get_db())
+        cycle_start = time.perf_counter()
         
         try:
-            # 获取所有股票
-            symbols = self.get_all_symbols_to_update(db)
-            print(f"需要更新的股票: {len(symbols)} 只")
+            # 按优先级选出本轮到期的股票（高影响股票在前，受每轮预算限制；分片时只选本进程负责的股票）
+            symbols = self.poll_scheduler.plan(db, symbol_filter=self.coordinator.owns if self.coordinator else None,
+                                               market_filter=is_a_share_symbol)
+            plan_stats = self.poll_scheduler.get_stats()
+            print(f"需要更新的股票: {len(symbols)}/{plan_stats['universe']} 只"
+                  f"（因预算顺延 {plan_stats['deferred']} 只）")
             
-            if len(symbols) == 0:
+            if plan_stats["universe"] == 0:
                 print("无需更新的股票")
                 return
             
+            # 快照模式：本轮只拉取一次全市场行情（分片时各进程只批量拉取自己的股票，避免重复拉取全市场）
+            snapshot = None
+            snapshot_seconds = 0.0
+            if self.snapshot_mode and self.coordinator is None:
+                fetch_start = time.perf_counter()
+                snapshot = self.fetch_market_snapshot()
+                snapshot_seconds = time.perf_counter() - fetch_start
+                if snapshot is None:
+                    print("全市场快照不可用，改用多代码行情接口批量拉取")
+                else:
+                    print(f"全市场快照: {len(snapshot)} 只, 耗时 {snapshot_seconds:.2f} 秒")
+                    # 快照已包含全部股票，不额外消耗请求，整轮写入所有持仓股票
+                    symbols = self.get_all_symbols_to_update(db)
+            
+            if len(symbols) == 0:
+                print("本轮没有到期的股票")
+                return
+            
+            # 快照不可用时，通过异步抓取引擎并发批量拉取订阅的股票，仍失败才逐只请求
+            if self.snapshot_mode and snapshot is None and symbols:
+                fetch_start = time.perf_counter()
+                snapshot = self.fetch_quotes_batch(symbols)
+                snapshot_seconds = time.perf_counter() - fetch_start
+                if snapshot is None:
+                    print("批量行情不可用，本轮回退为逐只请求")
+                else:
+                    print(f"批量行情: {len(snapshot)} 只, 耗时 {snapshot_seconds:.2f} 秒")
+            
             # 分批处理
             total_success = 0
             total_fail = 0
+            update_start = time.perf_counter()
+            east_money_bucket = rate_limiters.get(EAST_MONEY_HOST)
+            wait_before = east_money_bucket.get_stats()["wait_seconds"]
+            
+            self.db_stats = {"rows": 0, "statements": 0, "seconds": 0.0}
+            self.cycle_ts = datetime.utcnow().replace(microsecond=0)
             
-            for i in range(0, len(symbols), self.batch_size):
-                batch = symbols[i:i + self.batch_size]
-                print(f"处理批次 {i//self.batch_size + 1}: {len(batch)} 只股票")
+            # 已有快照时整轮一次写入；逐只请求时按批次获取并写入
+            batch_size = len(symbols) if snapshot is not None else self.batch_size
+            for i in range(0, len(symbols), batch_size):
+                batch = symbols[i:i + batch_size]
+                print(f"处理批次 {i//batch_size + 1}: {len(batch)} 只股票")
                 
-                success, fail = self.update_stock_batch(db, batch)
+                success, fail = self.update_stock_batch(db, batch, snapshot=snapshot)
                 total_success += success
                 total_fail += fail
-                
-                # 批次间延迟2-4秒（防反爬）
-                if i + self.batch_size < len(symbols):
-                    delay = random.uniform(2, 4)
-                    print(f"批次延迟 {delay:.1f} 秒...")
-                    time.sleep(delay)
             
-            print(f"轮询完成: 成功 {total_success}, 失败 {total_fail}")
+            # 盘中历史：汇总本轮涉及的K线，每小时执行一次保留策略
+            rollup_seconds = self.rollup_history(db, symbols)
+            
+            self.last_cycle_stats = {
+                "symbols": len(symbols),
+                "universe": plan_stats["universe"],
+                "deferred": plan_stats["deferred"] if snapshot is None else 0,
+                "shards": len(self.coordinator.owned_shards) if self.coordinator else None,
+                "success": total_success,
+                "fail": total_fail,
+                "snapshot_rows": len(snapshot) if snapshot is not None else 0,
+                "snapshot_seconds": round(snapshot_seconds, 3),
+                "update_seconds": round(time.perf_counter() - update_start, 3),
+                "rate_limit_wait_seconds": round(east_money_bucket.get_stats()["wait_seconds"] - wait_before, 3),
+                "db_rows": self.db_stats["rows"],
+                "db_statements": self.db_stats["statements"],
+                "db_seconds": round(self.db_stats["seconds"], 3),
+                "rollup_seconds": round(rollup_seconds, 3),
+                "total_seconds": round(time.perf_counter() - cycle_start, 3)
+            }
+            print(f"轮询完成: 成功 {total_success}, 失败 {total_fail}, "
+                  f"写入 {self.db_stats['rows']} 行/{self.db_stats['statements']} 条语句, "
+                  f"数据库耗时 {self.last_cycle_stats['db_seconds']:.3f} 秒, "
+                  f"总耗时 {self.last_cycle_stats['total_seconds']:.2f} 秒")
             
         except Exception as e:
             print(f"轮询任务异常: {e}")
@@ -205,18 +376,34 @@ class StockPollerService:
         finally:
             db.close()
     
+    def run_once(self, now: Optional[datetime] = None):
+        """按交易日历执行一次调度：交易时段内轮询，收盘后执行一次最终轮询，其余时间不轮询"""
+        now = now or datetime.now(timezone.utc)
+        if self.is_trading_time(now):
+            self.poll_task()
+        elif self.needs_post_close_poll(now):
+            self.poll_task(post_close=True)
+            self.last_close_polled = trading_calendar.last_close(self.market, now)
+    
     def start(self):
-        """启动调度器"""
+        """启动调度器：按交易日历计算下一次唤醒时间，休市期间休眠到下一个交易时段"""
         print(f"股票轮询服务启动中...")
+        if self.coordinator is not None:
+            self.coordinator.start_background()
+            print(f"分片轮询: 工作进程 {self.coordinator.worker_id}, "
+                  f"持有 {len(self.coordinator.owned_shards)}/{self.coordinator.shard_count} 个分片")
+        print(f"股票轮询服务已启动，交易时段内每 {self.interval_minutes} 分钟更新一次")
         
-        # 立即执行一次
-        self.poll_task()
-        
-        # 定时执行
-        schedule.every(self.interval_minutes).minutes.do(self.poll_task)
-        
-        print(f"股票轮询服务已启动，每 {self.interval_minutes} 分钟更新一次")
-        
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
+        try:
+            while True:
+                self.run_once()
+                
+                wakeup = self.next_wakeup()
+                seconds = max(1.0, (wakeup - datetime.now(timezone.utc)).total_seconds())
+                if not self.is_trading_time():
+                    print(f"休市中，休眠至 {wakeup.strftime('%Y-%m-%d %H:%M %Z')}（{seconds / 3600:.1f} 小时）")
+                time.sleep(seconds)
+        finally:
+            # 退出时释放分片租约，由其他工作进程立即接管
+            if self.coordinator is not None:
+                self.coordinator.stop()
@@ -0,0 +1,276 @@
+"""
+盘中行情历史服务
+轮询服务每轮把行情快照追加到 quote_ticks（按 (symbol, ts) 聚簇），
+再把受影响的时间段汇总为 1 分钟、30 分钟和日K写入 quote_bars，并按保留策略清理旧数据；
+看板的盘中走势图直接读取汇总K线，不再额外请求 yfinance
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from src.database.models import QuoteBar, QuoteTick
+from src.database.upsert import build_upsert
+
+# 汇总周期：名称 → pandas 频率（日K按 UTC 日期划分，A股/港股/美股的交易时段都不跨 UTC 日）
+ROLLUP_INTERVALS = {"1m": "1min", "30m": "30min", "1d": "1D"}
+
+# 保留天数：快照和各周期K线（None 表示永久保留）
+QUOTE_TICK_RETENTION_DAYS = float(os.getenv("QUOTE_TICK_RETENTION_DAYS", "3"))
+QUOTE_BAR_RETENTION_DAYS = {
+    "1m": float(os.getenv("QUOTE_BAR_1M_RETENTION_DAYS", "7")),
+    "30m": float(os.getenv("QUOTE_BAR_30M_RETENTION_DAYS", "90")),
+    "1d": None,
+}
+
+# 单条 INSERT 语句最多包含的行数
+HISTORY_CHUNK_SIZE = 500
+
+
+def aggregate_bars(ticks: pd.DataFrame, interval: str,
+                   prev_volumes: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    把快照汇总为K线
+
+    Args:
+        ticks: 列为 symbol、ts、price、volume（当日累计成交量）
+        interval: 汇总周期（1m、30m、1d）
+        prev_volumes: {股票代码: ticks 之前最后一个快照的累计成交量}，用于计算第一个快照的成交量增量
+
+    Returns:
+        pd.DataFrame: 列为 symbol、interval、bar_start、open、high、low、close、volume；
+                      分钟K的成交量为区间内各快照相对上一个快照的累计成交量增量之和，日K为当日最后的累计成交量
+    """
+    columns = ["symbol", "interval", "bar_start", "open", "high", "low", "close", "volume"]
+    if ticks.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = ticks.sort_values(["symbol", "ts"]).copy()
+    df["bar_start"] = df["ts"].dt.floor(ROLLUP_INTERVALS[interval])
+    # 每个快照相对同一股票上一个快照的成交量增量（轮询间隔大于K线周期时，增量记入快照所在的K线）
+    volume = pd.to_numeric(df["volume"], errors="coerce")
+    delta = volume.groupby(df["symbol"]).diff()
+    if prev_volumes:
+        first = ~df["symbol"].duplicated()
+        baseline = pd.to_numeric(df.loc[first, "symbol"].map(prev_volumes), errors="coerce")
+        delta.loc[first] = volume.loc[first] - baseline
+    df["delta"] = delta.fillna(0).clip(lower=0)
+
+    grouped = df.groupby(["symbol", "bar_start"], sort=False)
+    bars = grouped["price"].agg(open="first", high="max", low="min", close="last")
+    if interval == "1d":
+        bars["volume"] = grouped["volume"].last()
+    else:
+        bars["volume"] = grouped["delta"].sum()
+    bars = bars.reset_index()
+    bars["interval"] = interval
+    return bars[columns]
+
+
+class QuoteHistoryService:
+    @staticmethod
+    def _write(db: Session, model, rows: List[Dict[str, Any]], key_columns: List[str],
+               update_columns: List[str]) -> int:
+        """分块批量 upsert，返回写入行数"""
+        dialect_name = db.get_bind().dialect.name
+        for i in range(0, len(rows), HISTORY_CHUNK_SIZE):
+            db.execute(build_upsert(dialect_name, model, rows[i:i + HISTORY_CHUNK_SIZE], key_columns, update_columns))
+        return len(rows)
+
+    @staticmethod
+    def append_ticks(db: Session, quotes: Dict[str, Dict[str, Any]], ts: Optional[datetime] = None) -> int:
+        """
+        追加一轮行情快照（调用方负责提交）
+
+        Args:
+            db: 数据库会话
+            quotes: {股票代码: 行情字典(price, volume)}
+            ts: 快照时间（UTC），默认当前时间
+
+        Returns:
+            int: 写入行数
+        """
+        ts = (ts or datetime.utcnow()).replace(microsecond=0)
+        rows = [
+            {"symbol": symbol, "ts": ts, "price": data["price"], "volume": data.get("volume")}
+            for symbol, data in quotes.items()
+            if data.get("price") is not None
+        ]
+        return QuoteHistoryService._write(db, QuoteTick, rows, ["symbol", "ts"], ["price", "volume"])
+
+    @staticmethod
+    def _prev_volumes(db: Session, day_start: datetime, window_start: datetime,
+                      symbols: Optional[List[str]]) -> Dict[str, float]:
+        """同一交易日内 window_start 之前最后一个快照的累计成交量"""
+        latest = db.query(QuoteTick.symbol, func.max(QuoteTick.ts).label("ts")).filter(
+            QuoteTick.ts >= day_start, QuoteTick.ts < window_start
+        )
+        if symbols is not None:
+            latest = latest.filter(QuoteTick.symbol.in_(symbols))
+        latest = latest.group_by(QuoteTick.symbol).subquery()
+        rows = db.query(QuoteTick.symbol, QuoteTick.volume).join(
+            latest, and_(QuoteTick.symbol == latest.c.symbol, QuoteTick.ts == latest.c.ts)
+        ).all()
+        return {symbol: volume for symbol, volume in rows if volume is not None}
+
+    @staticmethod
+    def rollup(db: Session, since: datetime, symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        增量汇总K线（调用方负责提交）：只读取 since 所在 30 分钟区间起的快照，
+        重算受影响的 1m/30m K线，并把新快照合并进当日日K
+
+        Args:
+            db: 数据库会话
+            since: 本轮最早的快照时间（UTC）
+            symbols: 只汇总这些代码，None 表示全部
+
+        Returns:
+            dict: 各周期写入的K线数及耗时（秒）
+        """
+        start = time.perf_counter()
+        day_start = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        window_start = pd.Timestamp(since).floor(ROLLUP_INTERVALS["30m"]).to_pydatetime()
+        query = db.query(QuoteTick.symbol, QuoteTick.ts, QuoteTick.price, QuoteTick.volume).filter(
+            QuoteTick.ts >= window_start, QuoteTick.ts < day_start + timedelta(days=1)
+        )
+        if symbols is not None:
+            query = query.filter(QuoteTick.symbol.in_(symbols))
+        ticks = pd.DataFrame(query.all(), columns=["symbol", "ts", "price", "volume"])
+        if not ticks.empty:
+            ticks["ts"] = pd.to_datetime(ticks["ts"])
+        prev_volumes = QuoteHistoryService._prev_volumes(db, day_start, window_start, symbols) if not ticks.empty else {}
+
+        stats: Dict[str, Any] = {}
+        for interval in ROLLUP_INTERVALS:
+            bars = aggregate_bars(ticks, interval, prev_volumes)
+            if interval == "1d":
+                bars = QuoteHistoryService._merge_daily(db, bars)
+            else:
+                # 分钟K只需重算 since 所在的区间及之后
+                bars = bars[bars["bar_start"] >= pd.Timestamp(since).floor(ROLLUP_INTERVALS[interval])]
+            rows = [
+                {**row, "bar_start": pd.Timestamp(row["bar_start"]).to_pydatetime(),
+                 "volume": None if pd.isna(row["volume"]) else float(row["volume"])}
+                for row in bars.to_dict("records")
+            ]
+            stats[interval] = QuoteHistoryService._write(
+                db, QuoteBar, rows, ["symbol", "interval", "bar_start"], ["open", "high", "low", "close", "volume"]
+            )
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    @staticmethod
+    def _merge_daily(db: Session, bars: pd.DataFrame) -> pd.DataFrame:
+        """把本次窗口汇总出的日K与库中已有的当日日K合并：保留开盘价，最高/最低取极值，收盘价和成交量取最新"""
+        if bars.empty:
+            return bars
+        existing = {
+            (row.symbol, row.bar_start): row
+            for row in db.query(QuoteBar).filter(
+                QuoteBar.interval == "1d",
+                QuoteBar.symbol.in_(bars["symbol"].unique().tolist()),
+                QuoteBar.bar_start.in_(list(pd.DatetimeIndex(bars["bar_start"].unique()).to_pydatetime()))
+            ).all()
+        }
+        merged = bars.copy()
+        for index, row in bars.iterrows():
+            old = existing.get((row["symbol"], pd.Timestamp(row["bar_start"]).to_pydatetime()))
+            if old is None:
+                continue
+            merged.at[index, "open"] = old.open
+            merged.at[index, "high"] = max(old.high, row["high"])
+            merged.at[index, "low"] = min(old.low, row["low"])
+        return merged
+
+    @staticmethod
+    def apply_retention(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        按保留策略删除旧快照和旧K线（调用方负责提交）
+
+        Returns:
+            dict: 快照及各周期K线的删除行数
+        """
+        now = now or datetime.utcnow()
+        deleted = {
+            "ticks": db.query(QuoteTick).filter(
+                QuoteTick.ts < now - timedelta(days=QUOTE_TICK_RETENTION_DAYS)
+            ).delete(synchronize_session=False)
+        }
+        for interval, days in QUOTE_BAR_RETENTION_DAYS.items():
+            if days is None:
+                continue
+            deleted[interval] = db.query(QuoteBar).filter(
+                QuoteBar.interval == interval,
+                QuoteBar.bar_start < now - timedelta(days=days)
+            ).delete(synchronize_session=False)
+        return deleted
+
+    @staticmethod
+    def get_bars(db: Session, symbol: str, interval: str = "1m", start: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        读取汇总K线
+
+        Args:
+            db: 数据库会话
+            symbol: 股票代码
+            interval: 周期（1m、30m、1d）
+            start: 起始时间（UTC，含），None 表示全部
+
+        Returns:
+            pd.DataFrame: 以 bar_start（UTC）为索引，列为 Open、High、Low、Close、Volume
+        """
+        query = db.query(
+            QuoteBar.bar_start, QuoteBar.open, QuoteBar.high, QuoteBar.low, QuoteBar.close, QuoteBar.volume
+        ).filter(QuoteBar.symbol == symbol, QuoteBar.interval == interval)
+        if start is not None:
+            query = query.filter(QuoteBar.bar_start >= start)
+        df = pd.DataFrame(
+            query.order_by(QuoteBar.bar_start).all(),
+            columns=["Date", "Open", "High", "Low", "Close", "Volume"]
+        )
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.set_index("Date")
+
+    @staticmethod
+    def get_recent_closes(db: Session, symbols: List[str], interval: str = "30m", hours: float = 24,
+                          lookback_days: float = 7, now: Optional[datetime] = None) -> Dict[str, List[float]]:
+        """
+        批量读取多只股票最近的收盘价序列（持仓列表的走势小图用，一次查询）
+
+        休市期间（夜间、周末、节假日）没有新K线，因此按每只股票最新一根K线往前取 hours 小时
+
+        Args:
+            db: 数据库会话
+            symbols: 股票代码列表
+            interval: 周期（1m、30m、1d）
+            hours: 每只股票截至最新K线的时间窗口（小时）
+            lookback_days: 最多向前查找的天数
+            now: 当前时间（UTC），默认当前时间
+
+        Returns:
+            dict: {股票代码: [收盘价（按时间升序）]}，没有K线的股票不包含在结果中
+        """
+        if not symbols:
+            return {}
+        now = now or datetime.utcnow()
+        rows = db.query(QuoteBar.symbol, QuoteBar.bar_start, QuoteBar.close).filter(
+            QuoteBar.symbol.in_(symbols),
+            QuoteBar.interval == interval,
+            QuoteBar.bar_start >= now - timedelta(days=lookback_days),
+        ).order_by(QuoteBar.symbol, QuoteBar.bar_start).all()
+        if not rows:
+            return {}
+        df = pd.DataFrame(rows, columns=["symbol", "bar_start", "close"])
+        df["bar_start"] = pd.to_datetime(df["bar_start"])
+        latest = df.groupby("symbol")["bar_start"].transform("max")
+        df = df[df["bar_start"] > latest - pd.Timedelta(hours=hours)]
+        return {symbol: group["close"].tolist() for symbol, group in df.groupby("symbol")}
+
+    @staticmethod
+    def get_recent_bars(db: Session, symbol: str, interval: str = "1m", hours: float = 24) -> pd.DataFrame:
+        """读取最近 hours 小时的汇总K线（盘中走势图用）"""
+        return QuoteHistoryService.get_bars(db, symbol, interval, start=datetime.utcnow() - timedelta(hours=hours))
@@ -1,11 +1,34 @@
 """
 股票行情数据访问服务
-从数据库读取股票实时数据
+从数据库读取股票实时数据，批量写入轮询结果
 """
+import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from src.database.models import StockQuote
+from src.database.models import MarketType, StockQuote
+from src.database.upsert import build_upsert as build_model_upsert
+
+# 单条 INSERT 语句最多包含的行数（SQLite 单语句绑定参数上限为 32766）
+UPSERT_CHUNK_SIZE = 500
+
+# 冲突时更新的列（created_at 保持首次写入时间）
+UPSERT_UPDATE_COLUMNS = [
+    "name", "price", "prev_close", "change_pct", "volume", "high", "low",
+    "market_type", "data_source", "updated_at",
+]
+
+
+def build_upsert(dialect_name: str, rows: List[Dict[str, Any]]):
+    """
+    构造按 symbol 去重的 StockQuote 批量插入语句
+
+    Args:
+        dialect_name: 数据库方言（sqlite、mysql、postgresql）
+        rows: StockQuote 列名到值的字典列表
+    """
+    return build_model_upsert(dialect_name, StockQuote, rows, ["symbol"], UPSERT_UPDATE_COLUMNS)
+
 
 class StockQuoteService:
     @staticmethod
@@ -66,6 +89,49 @@ class StockQuoteService:
         
         return results
     
+    @staticmethod
+    def bulk_upsert(db: Session, quotes: Dict[str, Dict[str, Any]],
+                    market_type: MarketType = MarketType.CN_STOCK) -> Dict[str, Any]:
+        """
+        批量写入行情：每个分块一条 INSERT ... ON CONFLICT(symbol) DO UPDATE（MySQL 为 ON DUPLICATE KEY UPDATE），
+        不逐只查询、不构造 ORM 对象（调用方负责提交）
+
+        Args:
+            db: 数据库会话
+            quotes: {股票代码: 行情字典(name, price, prev_close, change_pct, volume, high, low, data_source)}
+            market_type: 市场类型
+
+        Returns:
+            dict: rows（写入行数）、statements（执行的语句数）、seconds（数据库耗时）
+        """
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        rows = [
+            {
+                "symbol": symbol,
+                "name": data.get("name"),
+                "price": data.get("price"),
+                "prev_close": data.get("prev_close"),
+                "change_pct": data.get("change_pct"),
+                "volume": data.get("volume"),
+                "high": data.get("high"),
+                "low": data.get("low"),
+                "market_type": market_type,
+                "data_source": data.get("data_source"),
+                "updated_at": now,
+                "created_at": now,
+            }
+            for symbol, data in quotes.items()
+        ]
+
+        dialect_name = db.get_bind().dialect.name
+        statements = 0
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            db.execute(build_upsert(dialect_name, rows[i:i + UPSERT_CHUNK_SIZE]))
+            statements += 1
+
+        return {"rows": len(rows), "statements": statements, "seconds": time.perf_counter() - start}
+    
     @staticmethod
     def is_data_fresh(db: Session, max_age_minutes=15) -> bool:
         """
@@ -1,10 +1,10 @@
 from langchain.tools import tool
 from typing import Optional
-from datetime import datetime
 from src.database.database import get_db
-from src.database.models import Subscription, FundHolding, MarketType
+from src.database.models import Subscription, MarketType
 from src.data.fund import analyze_fund
-from src.data.fund_loader import get_fund_holdings, get_fund_info
+from src.data.fund_loader import get_fund_info
+from src.scheduler.holdings_refresher import HOLDINGS_MARKET_TYPES, holdings_refresher
 from src.agent.user_context import get_current_user_id
 from src.utils.viz_utils import VizUtils
 
@@ -24,23 +24,6 @@ def _guess_market_type(ticker: str) -> MarketType:
     else:
         return MarketType.US_STOCK
 
-def _store_fund_holdings(subscription_id: int, ticker: str, db):
-    """Fetch and store fund holdings for a subscription."""
-    holdings = get_fund_holdings(ticker)
-    if holdings:
-        for h in holdings:
-            holding = FundHolding(
-                subscription_id=subscription_id,
-                stock_symbol=h.get("symbol", ""),
-                stock_name=h.get("name", ""),
-                weight=h.get("weight", 0.0),
-                updated_at=datetime.utcnow()
-            )
-            db.add(holding)
-        db.commit()
-        return len(holdings)
-    return 0
-
 @tool
 def add_fund_tool(ticker: str, market: str = "AUTO") -> str:
     """
@@ -100,17 +83,18 @@ def add_fund_tool(ticker: str, market: str = "AUTO") -> str:
         db.refresh(sub)
         print(f"[DEBUG add_fund_tool] Created subscription id={sub.id}")
         
-        # If it's a fund/ETF, fetch and store holdings
-        holdings_count = 0
-        if market_type in [MarketType.FUND, MarketType.US_STOCK]:
-            holdings_count = _store_fund_holdings(sub.id, ticker, db)
+        # If it's a fund, fetch and store holdings in the background (never blocks subscribing);
+        # same market types as the scheduled refresh, US ETF holdings are not available from yfinance
+        holdings_pending = market_type in HOLDINGS_MARKET_TYPES
+        if holdings_pending:
+            holdings_refresher.submit(sub.id, ticker)
         
         db.close()
         
         result = f"✅ 成功订阅 {ticker} ({info.get('name', ticker)})！\n"
         result += f"市场类型: {market_type.value}\n"
-        if holdings_count > 0:
-            result += f"已获取 {holdings_count} 只成分股信息。\n"
+        if holdings_pending:
+            result += "成分股信息正在后台获取。\n"
         result += "您可以在监控看板中查看实时数据。"
         return result
         
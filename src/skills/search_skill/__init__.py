@@ -3,29 +3,19 @@
 支持搜索股票、基金、期货，并在会话中保持搜索结果以便用户选择
 """
 from langchain.tools import tool
-import yfinance as yf
-import akshare as ak
 from typing import List, Dict, Optional
 
+from src.data.search_index import search_funds
+from src.data.symbol_metadata import symbol_metadata
+
 # 搜索结果缓存（用于保持上下文）
 _last_search_results: List[Dict] = []
 
 def _search_cn_funds(keyword: str) -> List[Dict]:
-    """搜索中国基金"""
+    """搜索中国基金（基于预建的代码/简称/拼音索引）"""
     results = []
     try:
-        # 使用 akshare 获取基金列表
-        df = ak.fund_name_em()
-        if not df.empty:
-            # 搜索基金代码或名称包含关键词的
-            mask = df['基金代码'].str.contains(keyword) | df['基金简称'].str.contains(keyword, case=False, na=False)
-            matches = df[mask].head(5)
-            for _, row in matches.iterrows():
-                results.append({
-                    "代码": row['基金代码'],
-                    "名称": row['基金简称'],
-                    "市场": "A股基金"
-                })
+        results = search_funds(keyword, top_k=5)
     except Exception as e:
         print(f"搜索中国基金失败: {e}")
     return results
@@ -41,19 +31,22 @@ def _search_yfinance(keyword: str) -> List[Dict]:
         (f"{keyword}.HK", "港股"),
     ]
     
+    # 代码是否存在及名称读取本地元数据缓存，缺失的代码并发获取
+    try:
+        metadata = symbol_metadata.get_many([code for code, _ in test_codes], wait=True)
+    except Exception as e:
+        print(f"读取代码元数据失败: {e}")
+        return results
+
     for code, market in test_codes:
-        try:
-            ticker = yf.Ticker(code)
-            info = ticker.info
-            if info and info.get("regularMarketPrice"):
-                name = info.get("longName", info.get("shortName", code))
-                results.append({
-                    "代码": code,
-                    "名称": name[:30] if name else code,  # 截断过长名称
-                    "市场": market
-                })
-        except:
-            pass
+        meta = metadata.get(code)
+        if meta and meta.get("found"):
+            name = meta.get("name") or code
+            results.append({
+                "代码": code,
+                "名称": name[:30],  # 截断过长名称
+                "市场": market
+            })
     return results
 
 # 常用产品映射
@@ -74,6 +67,30 @@ COMMON_PRODUCTS = {
     "科技": [("159941", "科技ETF", "A股基金"), ("QQQ", "纳斯达克100ETF", "美股ETF")],
 }
 
+def _build_substring_index(keys) -> Dict[str, List[str]]:
+    """建立关键词的子串索引：{子串（大写）: [包含该子串的关键词]}"""
+    index: Dict[str, List[str]] = {}
+    for key in keys:
+        substrings = {key[i:j].upper() for i in range(len(key)) for j in range(i + 1, len(key) + 1)}
+        for part in substrings:
+            index.setdefault(part, []).append(key)
+    return index
+
+# 常用产品关键词的子串索引，用于匹配“关键词包含输入”的情况
+_COMMON_PRODUCT_SUBSTRINGS = _build_substring_index(COMMON_PRODUCTS)
+
+def _match_common_products(keyword: str) -> List[str]:
+    """查找与输入相关的常用产品关键词（输入包含关键词，或关键词包含输入）"""
+    keyword_upper = keyword.upper().strip()
+    matched = list(_COMMON_PRODUCT_SUBSTRINGS.get(keyword_upper, []))
+    # 输入包含关键词：枚举输入的子串直接查表
+    for i in range(len(keyword)):
+        for j in range(i + 1, len(keyword) + 1):
+            part = keyword[i:j]
+            if part in COMMON_PRODUCTS and part not in matched:
+                matched.append(part)
+    return matched
+
 @tool
 def search_markets_tool(keyword: str) -> str:
     """
@@ -88,10 +105,9 @@ def search_markets_tool(keyword: str) -> str:
     keyword_upper = keyword.upper().strip()
     
     # 1. 先检查常用映射
-    for key, products in COMMON_PRODUCTS.items():
-        if key in keyword or keyword in key or keyword_upper in key.upper():
-            for code, name, market in products:
-                results.append({"代码": code, "名称": name, "市场": market})
+    for key in _match_common_products(keyword):
+        for code, name, market in COMMON_PRODUCTS[key]:
+            results.append({"代码": code, "名称": name, "市场": market})
     
     # 2. 如果是6位数字，搜索中国基金
     if keyword.isdigit() and len(keyword) == 6:
@@ -104,8 +120,8 @@ def search_markets_tool(keyword: str) -> str:
         if not any(existing["代码"] == r["代码"] for existing in results):
             results.append(r)
     
-    # 4. 如果关键词是中文，也搜索中国基金
-    if any('\u4e00' <= c <= '\u9fff' for c in keyword):
+    # 4. 如果关键词是中文或拼音首字母，也搜索中国基金
+    if any('\u4e00' <= c <= '\u9fff' for c in keyword) or keyword_upper.isalpha():
         cn_results = _search_cn_funds(keyword)
         for r in cn_results:
             if not any(existing["代码"] == r["代码"] for existing in results):
@@ -4,7 +4,6 @@ Dashboard UI - 监控看板
 """
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import plotly.express as px
@@ -14,15 +13,21 @@ from src.database.database import get_db
 from src.database.models import Subscription, MarketType
 from src.ui.charts import render_candlestick_chart
 from src.data.stock import get_stock_history
+from src.data.price_panel import get_price_panel, latest_closes
 from src.analysis.technical import add_technical_indicators
 from src.data.realtime_data import (
     get_fund_realtime_data,
     get_stock_realtime_data,
     get_holdings_prices_from_db,
     analyze_trend_24h,
-    clear_cache
+    clear_cache,
+    get_cache_stats
 )
 
+def is_fund_subscription(sub) -> bool:
+    """判断订阅是否按基金处理（基金或6位数字代码的A股订阅）"""
+    return sub.market_type in [MarketType.FUND, MarketType.CN_STOCK] and sub.symbol.isdigit() and len(sub.symbol) == 6
+
 def get_market_indices_with_history():
     """Fetch major market indices with recent history for sparklines."""
     tickers = {
@@ -33,27 +38,25 @@ def get_market_indices_with_history():
         "Oil": "CL=F"
     }
     
+    # 一次批量下载全部指数（带缓存，交易时段内短缓存、休市时长缓存）
+    panel = get_price_panel(list(tickers.values()), period="1mo")
+    closes = latest_closes(panel)
+    
     indices_data = []
     
     for name, symbol in tickers.items():
-        try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="1mo")
-            
-            if not hist.empty:
-                latest = hist.iloc[-1]
-                prev = hist.iloc[-2] if len(hist) > 1 else latest
-                change_pct = ((latest['Close'] - prev['Close']) / prev['Close']) * 100
-                
-                indices_data.append({
-                    "Name": name,
-                    "Symbol": symbol,
-                    "Current": latest['Close'],
-                    "Change": change_pct,
-                    "History": hist
-                })
-        except Exception as e:
-            print(f"Error fetching {name}: {e}")
+        if symbol not in closes:
+            print(f"Error fetching {name}: no data")
+            continue
+        
+        hist = panel[panel["Ticker"] == symbol].set_index("Date")
+        indices_data.append({
+            "Name": name,
+            "Symbol": symbol,
+            "Current": closes[symbol]["close"],
+            "Change": closes[symbol]["change_pct"],
+            "History": hist
+        })
             
     return indices_data
 
@@ -150,7 +153,7 @@ def render_dashboard():
         
         try:
             # 判断是基金还是股票
-            is_fund = sub.market_type in [MarketType.FUND, MarketType.CN_STOCK] and sub.symbol.isdigit() and len(sub.symbol) == 6
+            is_fund = is_fund_subscription(sub)
             
             if is_fund:
                 # 获取基金实时数据
@@ -165,7 +168,7 @@ def render_dashboard():
                 name = data.get("name", sub.notes or sub.symbol)
                 price = data.get("price")
                 change_pct = data.get("change_pct")
-                # 获取历史数据用于图表
+                # 24h走势：轮询服务只汇总A股持仓的盘中K线（见持仓列表），这里的美股/港股从 yfinance 读取
                 history = get_stock_history(sub.symbol, period="1d")
                 if history.empty:
                     history = get_stock_history(sub.symbol, period="5d")
@@ -242,7 +245,7 @@ def render_dashboard():
                 db.close()
                 return
             
-            is_fund = sub.market_type in [MarketType.FUND, MarketType.CN_STOCK] and sub.symbol.isdigit() and len(sub.symbol) == 6
+            is_fund = is_fund_subscription(sub)
             
             if is_fund:
                 # ========== 基金详细分析 ==========
@@ -343,14 +346,16 @@ def render_dashboard():
                         df_display['贡献度'] = df_display['贡献度'].apply(lambda x: f"{x:+.4f}%")
                         
                         # 选择要显示的列
-                        df_final = df_display[['序号', 'code', 'name', '权重%', '最新价', '涨跌%', '贡献度']]
-                        df_final.columns = ['序号', '股票代码', '股票名称', '权重%', '最新价', '涨跌%', '贡献度']
+                        df_final = df_display[['序号', 'code', 'name', '权重%', '最新价', '涨跌%', '贡献度', 'trend']]
+                        df_final.columns = ['序号', '股票代码', '股票名称', '权重%', '最新价', '涨跌%', '贡献度', '24h走势']
                         
+                        # 24h走势读取轮询服务汇总的30分钟K（本地数据，不请求外部接口）
                         st.dataframe(
                             df_final,
                             width=None,
                             hide_index=True,
-                            height=600
+                            height=600,
+                            column_config={"24h走势": st.column_config.LineChartColumn("24h走势")}
                         )
                         
                         # 持仓涨跌分布
@@ -522,3 +527,12 @@ def render_admin():
         st.dataframe([{"ID": s.id, "User": s.user.username, "Symbol": s.symbol} for s in subs])
         
         db.close()
+        
+        st.subheader("Quote Cache")
+        cache_stats = get_cache_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Entries", cache_stats["entries"])
+        col2.metric("Size", f"{cache_stats['bytes'] / 1024:.1f} KB")
+        col3.metric("Hit Rate", f"{cache_stats['hit_rate']:.1%}")
+        col4.metric("Evictions", cache_stats["evictions"])
+        st.json(cache_stats)
@@ -0,0 +1,131 @@
+import sys
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.bar_store import PriceBarStore, _merge_ranges, _missing_ranges, _settled_date
+
+
+class FakeBarStore(PriceBarStore):
+    """用生成的日K替代 yfinance，记录每次下载的区间"""
+
+    def __init__(self, path):
+        self.downloads = []
+        # 分红日期（yfinance 在 Dividends 列中返回）
+        self.dividends = set()
+        super().__init__(path=path)
+
+    def _download(self, ticker, start, end):
+        self.downloads.append((start, end))
+        days = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        return pd.DataFrame({
+            "Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100.0,
+            "Dividends": [0.5 if d.strftime("%Y-%m-%d") in self.dividends else 0.0 for d in days],
+        }, index=days)
+
+
+def test_range_helpers():
+    assert _merge_ranges([("2024-01-10", "2024-01-20"), ("2024-01-01", "2024-01-10")]) == [("2024-01-01", "2024-01-20")]
+    covered = [("2024-01-05", "2024-01-10"), ("2024-01-15", "2024-01-20")]
+    assert _missing_ranges(covered, "2024-01-01", "2024-01-25") == [
+        ("2024-01-01", "2024-01-05"), ("2024-01-10", "2024-01-15"), ("2024-01-20", "2024-01-25")
+    ]
+    assert _missing_ranges(covered, "2024-01-06", "2024-01-09") == []
+
+
+def test_only_missing_gaps_are_downloaded():
+    store = FakeBarStore(os.path.join(tempfile.mkdtemp(), "price_bars.db"))
+    start = date(2024, 1, 1)
+
+    store.fill_range("AAPL", start + timedelta(days=30), start + timedelta(days=60))
+    store.fill_range("AAPL", start, start + timedelta(days=90))
+    assert store.downloads == [
+        ("2024-01-31", "2024-03-01"), ("2024-01-01", "2024-01-31"), ("2024-03-01", "2024-03-31")
+    ]
+    assert store.get_coverage("AAPL") == [("2024-01-01", "2024-03-31")]
+
+    store.fill_range("AAPL", start + timedelta(days=10), start + timedelta(days=20))
+    assert len(store.downloads) == 3
+
+    df = store.read_range("AAPL", start, start + timedelta(days=90))
+    assert len(df) == len(pd.bdate_range("2024-01-01", "2024-03-30"))
+
+
+def test_weekly_and_monthly_resample():
+    store = FakeBarStore(os.path.join(tempfile.mkdtemp(), "price_bars.db"))
+    store.fill_range("AAPL", date(2024, 1, 1), date(2024, 3, 1))
+    daily = store.read_range("AAPL", date(2024, 1, 1), date(2024, 3, 1))
+
+    weekly = store.resample(daily, "1wk")
+    monthly = store.resample(daily, "1mo")
+    assert weekly.index[0] == pd.Timestamp("2024-01-01")
+    assert weekly.iloc[0]["Volume"] == 500.0
+    assert list(monthly.index) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01")]
+    assert len(store.downloads) == 1
+
+
+def test_recent_sessions_stay_uncovered():
+    store = FakeBarStore(os.path.join(tempfile.mkdtemp(), "price_bars.db"))
+    settled = _settled_date()
+    store.fill_range("GC=F", settled - timedelta(days=10), settled + timedelta(days=3))
+    # 覆盖区间只记到 UTC 日期减一天，最近交易日的K线下次仍会重新下载
+    assert store.get_coverage("GC=F") == [((settled - timedelta(days=10)).isoformat(), settled.isoformat())]
+
+
+def test_new_dividend_invalidates_adjusted_bars():
+    store = FakeBarStore(os.path.join(tempfile.mkdtemp(), "price_bars.db"))
+    store.dividends.add("2024-01-10")
+    store.fill_range("AAPL", date(2024, 1, 1), date(2024, 2, 1))
+    # 首次下载时的历史分红不触发重新下载
+    assert len(store.downloads) == 1
+
+    # 新区间中出现新的分红：清空后重新下载整个请求区间
+    store.dividends.add("2024-02-15")
+    store.fill_range("AAPL", date(2024, 1, 1), date(2024, 3, 1))
+    assert store.downloads[1:] == [("2024-02-01", "2024-03-01"), ("2024-01-01", "2024-03-01")]
+    assert store.get_coverage("AAPL") == [("2024-01-01", "2024-03-01")]
+
+    store.fill_range("AAPL", date(2024, 1, 1), date(2024, 3, 1))
+    assert len(store.downloads) == 3
+
+
+def test_slow_ticker_does_not_block_others():
+    class SlowBarStore(FakeBarStore):
+        def __init__(self, path):
+            self.release = threading.Event()
+            super().__init__(path)
+
+        def _download(self, ticker, start, end):
+            if ticker == "SLOW":
+                self.release.wait(5)
+            return super()._download(ticker, start, end)
+
+    store = SlowBarStore(os.path.join(tempfile.mkdtemp(), "price_bars.db"))
+    slow = threading.Thread(target=store.fill_range, args=("SLOW", date(2024, 1, 1), date(2024, 2, 1)))
+    waiter = threading.Thread(target=store.fill_range, args=("SLOW", date(2024, 1, 1), date(2024, 3, 1)))
+    slow.start()
+    waiter.start()
+    try:
+        # 另一只代码的下载不等待慢代码的网络请求
+        assert store.fill_range("AAPL", date(2024, 1, 1), date(2024, 2, 1)) == 1
+        assert slow.is_alive()
+    finally:
+        store.release.set()
+        slow.join()
+        waiter.join()
+    # 合并到较短区间下载的调用方随后补齐了自己的区间
+    assert store.get_coverage("SLOW") == [("2024-01-01", "2024-03-01")]
+
+
+if __name__ == "__main__":
+    test_range_helpers()
+    test_only_missing_gaps_are_downloaded()
+    test_weekly_and_monthly_resample()
+    test_recent_sessions_stay_uncovered()
+    test_new_dividend_invalidates_adjusted_bars()
+    test_slow_ticker_does_not_block_others()
+    print("✅ PriceBarStore tests passed.")
@@ -0,0 +1,76 @@
+import sys
+import os
+import time
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.cache_engine import CacheEngine, estimate_size
+
+
+def test_namespace_ttl_and_expiry():
+    cache = CacheEngine(namespace_ttls={"sina": 0.05, "fund": 60}, jitter_ratio=0)
+    cache.set("sina", "600519", {"price": 1500.0})
+    cache.set("fund", "161725", {"latest_nav": 1.02})
+
+    assert cache.get("sina", "600519") == {"price": 1500.0}
+    time.sleep(0.1)
+    assert cache.get("sina", "600519") is None
+    assert cache.get("fund", "161725") == {"latest_nav": 1.02}
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+    assert stats["namespaces"] == {"fund": 1}
+
+
+def test_lru_eviction_by_entries():
+    cache = CacheEngine(max_entries=2)
+    cache.set("stock", "A", 1)
+    cache.set("stock", "B", 2)
+    cache.get("stock", "A")
+    cache.set("stock", "C", 3)
+
+    assert cache.get("stock", "B") is None
+    assert cache.get("stock", "A") == 1
+    assert cache.get("stock", "C") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes():
+    frame = pd.DataFrame({"单位净值": range(10000)})
+    cache = CacheEngine(max_bytes=estimate_size(frame) * 2 + 1)
+    for key in ["a", "b", "c"]:
+        cache.set("fund", key, frame)
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= cache.max_bytes
+    assert cache.get("fund", "a") is None
+
+
+def test_jitter_spreads_expiry():
+    cache = CacheEngine(default_ttl=100, jitter_ratio=0.1)
+    expiries = {round(cache._expiry("stock", None) - time.monotonic(), 3) for _ in range(20)}
+    assert len(expiries) > 1
+    assert all(89.9 <= e <= 110.1 for e in expiries)
+
+
+def test_clear_namespace():
+    cache = CacheEngine()
+    cache.set("fund", "1", 1)
+    cache.set("stock", "1", 1)
+    cache.clear("fund")
+    assert cache.get_stats()["namespaces"] == {"stock": 1}
+    cache.clear()
+    assert cache.get_stats()["bytes"] == 0
+
+
+if __name__ == "__main__":
+    test_namespace_ttl_and_expiry()
+    test_lru_eviction_by_entries()
+    test_eviction_by_bytes()
+    test_jitter_spreads_expiry()
+    test_clear_namespace()
+    print("✅ CacheEngine tests passed.")
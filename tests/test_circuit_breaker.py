@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+def failing():
+    raise TimeoutError("read timed out")
+
+
+def test_opens_on_failure_rate_and_fails_fast():
+    breaker = CircuitBreaker("sina", failure_rate=0.5, min_calls=4, window_seconds=60, open_seconds=30)
+
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED  # 未达到最少调用数
+
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN  # 2/4 失败
+
+    calls = []
+    start = time.perf_counter()
+    try:
+        breaker.call(lambda: calls.append(1))
+        assert False, "熔断期间应直接失败"
+    except CircuitOpenError:
+        pass
+    assert time.perf_counter() - start < 0.01
+    assert calls == []
+    assert breaker.get_stats()["rejected"] == 1
+
+
+def test_half_open_trial_closes_or_reopens():
+    breaker = CircuitBreaker("east_money", failure_rate=0.5, min_calls=2, open_seconds=0.05)
+    for _ in range(2):
+        try:
+            breaker.call(failing)
+        except TimeoutError:
+            pass
+    assert breaker.state == STATE_OPEN
+
+    time.sleep(0.06)
+    assert breaker.state == STATE_HALF_OPEN
+    # 半开状态只放行一个试探请求，试探失败重新熔断
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == STATE_CLOSED
+    assert breaker.get_stats()["opened"] == 2
+
+
+def test_old_failures_leave_the_window():
+    breaker = CircuitBreaker("yfinance", failure_rate=0.5, min_calls=3, window_seconds=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+
+
+if __name__ == "__main__":
+    test_opens_on_failure_rate_and_fails_fast()
+    test_half_open_trial_closes_or_reopens()
+    test_old_failures_leave_the_window()
+    print("✅ CircuitBreaker tests passed.")
@@ -0,0 +1,110 @@
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.fetch_engine import AsyncFetchEngine
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """本地桩服务：/slow 延迟返回，/gbk 返回 gbk 编码正文，其余路径回显路径"""
+    protocol_version = "HTTP/1.1"
+    active = 0
+    max_active = 0
+    client_ports = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+            cls.client_ports.add(self.client_address[1])
+        try:
+            if self.path.startswith("/slow"):
+                time.sleep(0.2)
+            if self.path.startswith("/gbk"):
+                body = 'var hq_str_sh600519="贵州茅台";'.encode("gbk")
+            else:
+                body = self.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    StubHandler.active = 0
+    StubHandler.max_active = 0
+    StubHandler.client_ports = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_get_decodes_and_reuses_connections():
+    server, base = start_stub_server()
+    engine = AsyncFetchEngine()
+    try:
+        result = engine.get(f"{base}/gbk", encoding="gbk")
+        assert result.ok
+        assert "贵州茅台" in result.text
+
+        for i in range(5):
+            assert engine.get(f"{base}/echo", params={"i": i}).text == f"/echo?i={i}"
+        # 顺序请求复用同一条长连接
+        assert len(StubHandler.client_ports) == 1
+    finally:
+        engine.close()
+        server.shutdown()
+
+
+def test_get_many_respects_per_host_limit():
+    server, base = start_stub_server()
+    engine = AsyncFetchEngine(host_limits={"127.0.0.1": 2})
+    try:
+        start = time.perf_counter()
+        results = engine.get_many([{"url": f"{base}/slow/{i}"} for i in range(6)])
+        elapsed = time.perf_counter() - start
+
+        assert [r.text for r in results] == [f"/slow/{i}" for i in range(6)]
+        assert StubHandler.max_active == 2
+        # 6 个请求、并发 2，约 3 轮
+        assert 0.5 < elapsed < 2.0
+        assert engine.get_stats()["hosts"]["127.0.0.1"]["requests"] == 6
+    finally:
+        engine.close()
+        server.shutdown()
+
+
+def test_timeout_and_connection_errors_are_reported():
+    server, base = start_stub_server()
+    engine = AsyncFetchEngine()
+    try:
+        slow, refused = engine.get_many([
+            {"url": f"{base}/slow", "timeout": 0.05},
+            {"url": "http://127.0.0.1:9/unreachable"},
+        ])
+        assert not slow.ok and slow.error is not None
+        assert not refused.ok and refused.error is not None
+        assert engine.get_stats()["errors"] == 2
+    finally:
+        engine.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_get_decodes_and_reuses_connections()
+    test_get_many_respects_per_host_limit()
+    test_timeout_and_connection_errors_are_reported()
+    print("✅ AsyncFetchEngine tests passed.")
@@ -0,0 +1,67 @@
+import sys
+import os
+import tempfile
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data import fund_directory as fd
+
+
+def _fake_fund_list(calls):
+    def loader():
+        calls.append(1)
+        return pd.DataFrame({
+            "基金代码": ["000001", "161725"],
+            "拼音缩写": ["HXCZHH", "ZSZZBJZSA"],
+            "基金简称": ["华夏成长混合", "招商中证白酒指数A"],
+            "基金类型": ["混合型-偏股", "指数型-股票"],
+            "拼音全称": ["HUAXIA", "ZHAOSHANG"],
+        })
+    return loader
+
+
+def test_cold_start_reads_local_file():
+    calls = []
+    original = fd.ak.fund_name_em
+    fd.ak.fund_name_em = _fake_fund_list(calls)
+    try:
+        path = os.path.join(tempfile.mkdtemp(), "fund_directory.parquet")
+
+        first = fd.FundDirectory(path=path)
+        assert first.get_name("161725") == "招商中证白酒指数A"
+        assert first.get_name("999999") is None
+        assert os.path.exists(path)
+        assert len(calls) == 1
+
+        # 新实例（模拟进程重启）应直接读取本地文件
+        second = fd.FundDirectory(path=path)
+        assert second.get_name("000001") == "华夏成长混合"
+        assert list(second.get_frame().columns) == fd.FUND_DIRECTORY_COLUMNS
+        assert len(calls) == 1
+    finally:
+        fd.ak.fund_name_em = original
+
+
+def test_stale_file_used_when_download_fails():
+    calls = []
+    original = fd.ak.fund_name_em
+    fd.ak.fund_name_em = _fake_fund_list(calls)
+    try:
+        path = os.path.join(tempfile.mkdtemp(), "fund_directory.parquet")
+        fd.FundDirectory(path=path).ensure_loaded()
+
+        def broken():
+            raise ConnectionError("network down")
+        fd.ak.fund_name_em = broken
+
+        stale = fd.FundDirectory(path=path, max_age_hours=0)
+        assert stale.get_name("000001") == "华夏成长混合"
+    finally:
+        fd.ak.fund_name_em = original
+
+
+if __name__ == "__main__":
+    test_cold_start_reads_local_file()
+    test_stale_file_used_when_download_fails()
+    print("✅ FundDirectory tests passed.")
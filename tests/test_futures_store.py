@@ -0,0 +1,105 @@
+import sys
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.futures_store import BAR_COLUMNS, FuturesBarStore
+
+
+def make_bars(rows):
+    """rows: [(日期, 开, 高, 低, 收, 量, 持仓)] → _fetch 返回格式"""
+    df = pd.DataFrame(rows, columns=["Date", "Open", "High", "Low", "Close", "Volume", "OpenInterest"])
+    df["Settlement"] = df["Close"]
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.set_index("Date")[BAR_COLUMNS].astype("float64")
+
+
+class FakeFuturesStore(FuturesBarStore):
+    """用内存中的日K代替 akshare"""
+
+    def __init__(self, path, bars):
+        self.bars = bars
+        self.fetch_starts = []
+        super().__init__(path=path, refresh_seconds=3600)
+
+    def _fetch(self, symbol, start_date=None):
+        self.fetch_starts.append(start_date)
+        if start_date is None:
+            return self.bars
+        return self.bars[self.bars.index >= pd.Timestamp(start_date)]
+
+
+def test_incremental_append_and_rolls():
+    with tempfile.TemporaryDirectory() as tmp:
+        bars = make_bars([
+            ("2026-10-12", 3000, 3010, 2990, 3005, 1000, 100000),
+            ("2026-10-13", 3005, 3020, 3000, 3015, 1100, 101000),
+        ])
+        store = FakeFuturesStore(os.path.join(tmp, "futures.db"), bars)
+
+        assert store.update("RB0") == 2
+        df = store.get_history("RB0", refresh=False)
+        assert list(df.columns) == BAR_COLUMNS
+        assert all(dtype == "float64" for dtype in df.dtypes)
+        assert df["Close"].iloc[-1] == 3015
+
+        # 刷新间隔内不访问网络
+        assert store.update("RB0") == 0
+        assert store.fetch_starts == [None]
+
+        # 新交易日：从最后一个交易日开始追加；持仓量突增识别为换月
+        store.bars = make_bars([
+            ("2026-10-12", 3000, 3010, 2990, 3005, 1000, 100000),
+            ("2026-10-13", 3005, 3020, 3000, 3018, 1100, 101000),
+            ("2026-10-14", 3100, 3110, 3090, 3105, 2000, 200000),
+        ])
+        assert store.update("RB0", force=True) == 2
+        assert store.fetch_starts[-1] == "2026-10-13"
+        df = store.get_history("RB0", refresh=False)
+        assert len(df) == 3
+        assert df.loc["2026-10-13", "Close"] == 3018
+
+        rolls = store.get_rolls("RB0")
+        assert len(rolls) == 1
+        assert rolls["roll_date"].iloc[0] == pd.Timestamp("2026-10-14")
+        assert rolls["price_gap"].iloc[0] == 3100 - 3018
+
+        # 复权后换月前价格平移价差，最新价格不变
+        adjusted = store.get_history("RB0", refresh=False, adjusted=True)
+        assert adjusted.loc["2026-10-13", "Close"] == 3018 + 82
+        assert adjusted.loc["2026-10-14", "Close"] == 3105
+
+
+def test_slow_contract_does_not_block_others():
+    class SlowFuturesStore(FakeFuturesStore):
+        def __init__(self, path, bars):
+            self.release = threading.Event()
+            super().__init__(path, bars)
+
+        def _fetch(self, symbol, start_date=None):
+            if symbol == "SLOW":
+                self.release.wait(5)
+            return super()._fetch(symbol, start_date)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bars = make_bars([("2026-10-12", 3000, 3010, 2990, 3005, 1000, 100000)])
+        store = SlowFuturesStore(os.path.join(tmp, "futures.db"), bars)
+        slow = threading.Thread(target=store.update, args=("SLOW",))
+        slow.start()
+        try:
+            # 另一个合约的更新不等待慢合约的网络请求
+            assert store.update("RB0") == 1
+            assert slow.is_alive()
+        finally:
+            store.release.set()
+            slow.join()
+
+
+if __name__ == "__main__":
+    test_incremental_append_and_rolls()
+    test_slow_contract_does_not_block_others()
+    print("futures store tests passed")
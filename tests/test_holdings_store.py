@@ -0,0 +1,93 @@
+import sys
+import os
+import tempfile
+import threading
+from datetime import date
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.holdings_store import FundHoldingsStore, expected_latest_quarter, parse_quarter
+
+
+class FakeHoldingsStore(FundHoldingsStore):
+    """用内存中的披露数据代替 akshare"""
+
+    def __init__(self, path, disclosures):
+        self.disclosures = disclosures
+        self.fetched_years = []
+        super().__init__(path=path, recheck_seconds=3600)
+
+    def _fetch_year(self, code, year):
+        self.fetched_years.append(year)
+        return {q: rows for q, rows in self.disclosures.items() if q.startswith(str(year))}
+
+
+def test_quarter_helpers():
+    assert parse_quarter("2024年3季度股票投资明细") == "2024Q3"
+    assert parse_quarter("无效") is None
+    assert expected_latest_quarter(date(2026, 10, 17)) == "2026Q2"
+    assert expected_latest_quarter(date(2026, 10, 30)) == "2026Q3"
+    assert expected_latest_quarter(date(2026, 1, 10)) == "2025Q3"
+
+
+def test_only_new_quarters_are_downloaded():
+    with tempfile.TemporaryDirectory() as tmp:
+        disclosures = {
+            "2026Q1": [("600519", "贵州茅台", 9.5), ("000858", "五粮液", 8.1)],
+            "2026Q2": [("000858", "五粮液", 9.9), ("600519", "贵州茅台", 9.0)],
+        }
+        store = FakeHoldingsStore(os.path.join(tmp, "holdings.db"), disclosures)
+
+        # 首次加载：只保留最新季度
+        assert store.update("161725", today=date(2026, 10, 17)) == ["2026Q2"]
+        quarter, holdings = store.get_latest("161725", refresh=False)
+        assert quarter == "2026Q2"
+        assert holdings[0] == {"symbol": "000858", "name": "五粮液", "weight": 9.9}
+
+        # 本地已有预计的最新季度：不访问网络
+        store.fetched_years.clear()
+        assert store.update("161725", today=date(2026, 10, 20)) == []
+        assert store.fetched_years == []
+
+        # 三季度披露期已过但尚未出现：在重试间隔内不再检查
+        assert store.update("161725", today=date(2026, 11, 1)) == []
+        assert store.fetched_years == [2026]
+        assert store.update("161725", today=date(2026, 11, 2)) == []
+        assert store.fetched_years == [2026]
+
+        # 新季度出现后只写入新季度
+        disclosures["2026Q3"] = [("300750", "宁德时代", 7.7)]
+        assert store.update("161725", force=True, today=date(2026, 11, 3)) == ["2026Q3"]
+        assert store.get_latest("161725", refresh=False)[0] == "2026Q3"
+        assert len(store.get_quarter("161725", "2026Q2")) == 2
+
+
+def test_slow_fund_does_not_block_others():
+    class SlowHoldingsStore(FakeHoldingsStore):
+        def __init__(self, path, disclosures):
+            self.release = threading.Event()
+            super().__init__(path, disclosures)
+
+        def _fetch_year(self, code, year):
+            if code == "SLOW":
+                self.release.wait(5)
+            return super()._fetch_year(code, year)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SlowHoldingsStore(os.path.join(tmp, "holdings.db"), {"2026Q2": [("600519", "贵州茅台", 9.0)]})
+        slow = threading.Thread(target=store.update, args=("SLOW",), kwargs={"today": date(2026, 10, 17)})
+        slow.start()
+        try:
+            # 另一只基金的更新不等待慢基金的网络请求
+            assert store.update("161725", today=date(2026, 10, 17)) == ["2026Q2"]
+            assert slow.is_alive()
+        finally:
+            store.release.set()
+            slow.join()
+
+
+if __name__ == "__main__":
+    test_quarter_helpers()
+    test_only_new_quarters_are_downloaded()
+    test_slow_fund_does_not_block_others()
+    print("✅ FundHoldingsStore tests passed.")
@@ -0,0 +1,107 @@
+import sys
+import os
+import contextlib
+import io
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.market_hours import (
+    QUOTE_OPEN_TTL,
+    TradingCalendar,
+    is_market_open,
+    is_round_the_clock,
+    next_session_open,
+    quote_ttl,
+    trading_calendar,
+)
+
+SHANGHAI = ZoneInfo("Asia/Shanghai")
+NEW_YORK = ZoneInfo("America/New_York")
+HONG_KONG = ZoneInfo("Asia/Hong_Kong")
+
+
+def test_sessions_and_next_open():
+    # 2026-10-16 为周五
+    assert is_market_open("CN", datetime(2026, 10, 16, 10, 0, tzinfo=SHANGHAI))
+    assert not is_market_open("CN", datetime(2026, 10, 16, 12, 0, tzinfo=SHANGHAI))
+
+    # 午间休市：下一个时段为当天13:00
+    lunch = datetime(2026, 10, 16, 12, 0, tzinfo=SHANGHAI)
+    assert next_session_open("CN", lunch) == datetime(2026, 10, 16, 13, 0, tzinfo=SHANGHAI)
+
+    # 周五收盘后：下一个时段为周一9:30
+    friday_close = datetime(2026, 10, 16, 16, 0, tzinfo=SHANGHAI)
+    assert next_session_open("CN", friday_close) == datetime(2026, 10, 19, 9, 30, tzinfo=SHANGHAI)
+
+
+def test_quote_ttl():
+    assert quote_ttl("CN", datetime(2026, 10, 16, 10, 0, tzinfo=SHANGHAI)) == QUOTE_OPEN_TTL
+    # 收盘宽限期内仍为短缓存
+    assert quote_ttl("CN", datetime(2026, 10, 16, 15, 2, tzinfo=SHANGHAI)) == QUOTE_OPEN_TTL
+    # 周五收盘后缓存到周一开盘
+    friday_evening = datetime(2026, 10, 16, 20, 0, tzinfo=SHANGHAI)
+    expected = (datetime(2026, 10, 19, 9, 30, tzinfo=SHANGHAI) - friday_evening).total_seconds()
+    assert quote_ttl("CN", friday_evening) == expected
+    # 美股盘前（纽约时间8:30）缓存1小时
+    assert quote_ttl("US", datetime(2026, 10, 16, 8, 30, tzinfo=NEW_YORK)) == 3600
+
+    assert is_round_the_clock("GC=F") and is_round_the_clock("BTC-USD")
+    assert not is_round_the_clock("AAPL")
+
+
+def test_holidays_and_half_days():
+    # 国庆长假期间休市，节后第一个交易日为 10月8日
+    assert not is_market_open("CN", datetime(2026, 10, 5, 10, 0, tzinfo=SHANGHAI))
+    assert next_session_open("CN", datetime(2026, 9, 30, 16, 0, tzinfo=SHANGHAI)) == \
+        datetime(2026, 10, 8, 9, 30, tzinfo=SHANGHAI)
+
+    # 美股感恩节次日半日市 13:00 收盘
+    assert is_market_open("US", datetime(2026, 11, 27, 12, 30, tzinfo=NEW_YORK))
+    assert not is_market_open("US", datetime(2026, 11, 27, 14, 0, tzinfo=NEW_YORK))
+    assert trading_calendar.last_close("US", datetime(2026, 11, 27, 14, 0, tzinfo=NEW_YORK)) == \
+        datetime(2026, 11, 27, 13, 0, tzinfo=NEW_YORK)
+
+    # 港股平安夜半日市只有上午时段
+    assert trading_calendar.sessions("HK", datetime(2026, 12, 24).date()) == [
+        (datetime(2026, 12, 24, 9, 30, tzinfo=HONG_KONG), datetime(2026, 12, 24, 12, 0, tzinfo=HONG_KONG))
+    ]
+    # 节礼日适逢周六，顺延至周一补假
+    assert not trading_calendar.is_trading_day("HK", datetime(2026, 12, 28).date())
+
+    # 休市日的缓存持续到下一个交易时段
+    holiday = datetime(2026, 10, 7, 20, 0, tzinfo=SHANGHAI)
+    assert quote_ttl("CN", holiday) == (datetime(2026, 10, 8, 9, 30, tzinfo=SHANGHAI) - holiday).total_seconds()
+
+
+def test_missing_calendar_falls_back_to_weekdays():
+    calendar = TradingCalendar(path="/nonexistent/trading_calendar.json")
+    assert calendar.is_open("CN", datetime(2026, 10, 5, 10, 0, tzinfo=SHANGHAI))
+
+
+def test_warns_once_past_calendar_coverage():
+    # 2027 年已配置：元旦休市，不警告
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        assert not trading_calendar.is_trading_day("CN", datetime(2027, 1, 1).date())
+        assert not trading_calendar.is_trading_day("US", datetime(2027, 11, 25).date())
+    assert output.getvalue() == ""
+
+    calendar = TradingCalendar()
+    last_year = calendar.last_year["CN"]
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        calendar.is_trading_day("CN", datetime(last_year + 1, 1, 4).date())
+        calendar.is_trading_day("CN", datetime(last_year + 1, 1, 5).date())
+    # 超出日历范围：每个市场每年只警告一次
+    assert output.getvalue().count("交易日历只覆盖到") == 1
+
+
+if __name__ == "__main__":
+    test_sessions_and_next_open()
+    test_quote_ttl()
+    test_holidays_and_half_days()
+    test_missing_calendar_falls_back_to_weekdays()
+    test_warns_once_past_calendar_coverage()
+    print("market hours tests passed")
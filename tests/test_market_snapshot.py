@@ -0,0 +1,127 @@
+import sys
+import os
+import time
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.market_snapshot import MarketSnapshot
+
+
+def _make_loader(calls):
+    def loader():
+        calls.append(time.monotonic())
+        return pd.DataFrame([
+            {"代码": "600519", "名称": "贵州茅台", "最新价": 1500.0},
+            {"代码": "000001", "名称": "平安银行", "最新价": 10.5},
+        ])
+    return loader
+
+
+def test_snapshot_shared_within_ttl():
+    calls = []
+    snapshot = MarketSnapshot(_make_loader(calls), ttl_seconds=60)
+
+    assert snapshot.get("600519")["名称"] == "贵州茅台"
+    assert snapshot.get("000001")["最新价"] == 10.5
+    assert snapshot.get("999999") is None
+    assert len(calls) == 1
+    # 有效期内读取不请求数据源
+    assert snapshot.lookup("600519")[1] is False
+
+    stats = snapshot.get_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+    assert stats["refreshes"] == 1
+    assert stats["rows"] == 2
+
+
+def test_snapshot_refreshes_after_ttl_and_invalidate():
+    calls = []
+    snapshot = MarketSnapshot(_make_loader(calls), ttl_seconds=0.05)
+
+    snapshot.get("600519")
+    time.sleep(0.1)
+    snapshot.get("600519")
+    assert len(calls) == 2
+
+    snapshot.ttl_seconds = 60
+    snapshot.invalidate()
+    snapshot.get("600519")
+    assert len(calls) == 3
+
+
+def test_snapshot_keeps_old_data_on_refresh_error():
+    state = {"fail": False}
+
+    def loader():
+        if state["fail"]:
+            raise ConnectionError("upstream down")
+        return pd.DataFrame([{"代码": "600519", "名称": "贵州茅台"}])
+
+    snapshot = MarketSnapshot(loader, ttl_seconds=60)
+    snapshot.get("600519")
+    state["fail"] = True
+    snapshot.invalidate()
+    assert snapshot.get("600519")["名称"] == "贵州茅台"
+    assert snapshot.get_stats()["refresh_errors"] == 1
+
+
+def test_snapshot_rejected_after_max_staleness():
+    state = {"fail": False}
+
+    def loader():
+        if state["fail"]:
+            raise ConnectionError("upstream down")
+        return pd.DataFrame([{"代码": "600519", "名称": "贵州茅台"}])
+
+    snapshot = MarketSnapshot(loader, ttl_seconds=0.01, max_staleness=0.2, retry_seconds=0)
+    snapshot.get("600519")
+    state["fail"] = True
+    time.sleep(0.05)
+    # 刷新失败但旧快照仍在最长可用时间内：继续使用
+    assert snapshot.get("600519")["名称"] == "贵州茅台"
+    time.sleep(0.2)
+    # 超过最长可用时间：返回None，由路由改用其他数据源
+    assert snapshot.get("600519") is None
+    assert snapshot.get_stats()["stale_rejected"] == 1
+
+    state["fail"] = False
+    assert snapshot.get("600519")["名称"] == "贵州茅台"
+
+
+def test_snapshot_waits_before_retrying_failed_refresh():
+    calls = []
+    state = {"fail": False}
+
+    def loader():
+        calls.append(time.monotonic())
+        if state["fail"]:
+            raise ConnectionError("upstream down")
+        return pd.DataFrame([{"代码": "600519", "名称": "贵州茅台"}])
+
+    snapshot = MarketSnapshot(loader, ttl_seconds=0.01, retry_seconds=0.2)
+    snapshot.get("600519")
+    state["fail"] = True
+    time.sleep(0.05)
+    # 刷新失败：本次请求了数据源，之后的读取在重试间隔内直接使用旧快照
+    assert snapshot.lookup("600519") == ({"代码": "600519", "名称": "贵州茅台"}, True)
+    assert snapshot.lookup("600519") == ({"代码": "600519", "名称": "贵州茅台"}, False)
+    assert snapshot.get("000001") is None
+    assert len(calls) == 2
+    assert snapshot.get_stats()["refresh_skipped"] == 2
+
+    # 重试间隔过后再次请求数据源
+    state["fail"] = False
+    time.sleep(0.2)
+    assert snapshot.lookup("600519")[1] is True
+    assert len(calls) == 3
+
+
+if __name__ == "__main__":
+    test_snapshot_shared_within_ttl()
+    test_snapshot_refreshes_after_ttl_and_invalidate()
+    test_snapshot_keeps_old_data_on_refresh_error()
+    test_snapshot_rejected_after_max_staleness()
+    test_snapshot_waits_before_retrying_failed_refresh()
+    print("✅ MarketSnapshot tests passed.")
@@ -0,0 +1,189 @@
+import sys
+import os
+import tempfile
+import threading
+from datetime import datetime
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.nav_store import (
+    CN_TIMEZONE,
+    FUND_NAV_BULK_RETRY_SECONDS,
+    FundNavStore,
+    expected_nav_date,
+    nav_cache_ttl,
+    parse_daily_table,
+)
+
+
+def make_daily_table():
+    """ak.fund_open_fund_daily_em() 格式的全市场净值表"""
+    return pd.DataFrame({
+        "基金代码": ["161725", "000001", "000002"],
+        "基金简称": ["招商中证白酒指数A", "华夏成长", "未公布"],
+        "2024-05-21-单位净值": ["1.0300", "2.0000", ""],
+        "2024-05-21-累计净值": ["", "", ""],
+        "2024-05-20-单位净值": ["1.0200", "1.9800", "3.0000"],
+        "2024-05-20-累计净值": ["", "", ""],
+        "日增长值": ["0.0100", "0.0200", ""],
+        "日增长率": ["0.98", "1.01", ""],
+    })
+
+
+class FakeNavStore(FundNavStore):
+    """用内存数据替代网络接口，记录调用情况"""
+
+    def __init__(self, path):
+        self.full_calls = 0
+        self.since_calls = []
+        self.new_rows = []
+        self.daily_calls = 0
+        super().__init__(path=path, refresh_seconds=0)
+
+    def _fetch_full(self, code):
+        self.full_calls += 1
+        return [("2024-05-16", 1.00, None), ("2024-05-17", 1.01, 1.0), ("2024-05-20", 1.02, 0.99)]
+
+    def _fetch_since(self, code, start_date):
+        self.since_calls.append(start_date)
+        return [r for r in self.new_rows if r[0] >= start_date]
+
+    def _fetch_daily_table(self):
+        self.daily_calls += 1
+        return make_daily_table()
+
+
+def test_full_load_then_incremental_append():
+    store = FakeNavStore(os.path.join(tempfile.mkdtemp(), "fund_nav.db"))
+
+    assert store.update("161725") == 3
+    assert store.full_calls == 1
+    assert store.get_last_date("161725") == "2024-05-20"
+
+    store.new_rows = [("2024-05-21", 1.03, 0.98)]
+    assert store.update("161725") == 1
+    assert store.since_calls == ["2024-05-21"]
+    assert store.full_calls == 1
+
+    latest = store.get_latest("161725", count=2, refresh=False)
+    assert list(latest['单位净值']) == [1.02, 1.03]
+
+
+def test_range_scan():
+    store = FakeNavStore(os.path.join(tempfile.mkdtemp(), "fund_nav.db"))
+    store.update("161725")
+
+    df = store.get_history("161725", start_date=datetime(2024, 5, 17), end_date=datetime(2024, 5, 17), refresh=False)
+    assert len(df) == 1
+    assert df.iloc[0]['单位净值'] == 1.01
+    assert isinstance(df.iloc[0]['净值日期'], pd.Timestamp)
+    assert store.get_history("000001", refresh=False).empty
+
+
+def test_parse_daily_table():
+    nav_date, prev_date, rows = parse_daily_table(make_daily_table())
+    assert (nav_date, prev_date) == ("2024-05-21", "2024-05-20")
+    # 最新净值尚未公布的基金以前一日净值作为最新净值
+    assert rows == [
+        ("161725", "2024-05-21", 1.03, "2024-05-20", 1.02, 0.98),
+        ("000001", "2024-05-21", 2.0, "2024-05-20", 1.98, 1.01),
+        ("000002", "2024-05-20", 3.0, None, None, None),
+    ]
+
+
+def test_bulk_ingest_once_per_publication_window():
+    store = FakeNavStore(os.path.join(tempfile.mkdtemp(), "fund_nav.db"))
+    store.update("161725")
+
+    evening = datetime(2024, 5, 21, 20, 0, tzinfo=CN_TIMEZONE)
+    assert store.ingest_daily_table(now=evening) == 3
+    # 同一窗口内未超过重试间隔：不再下载
+    assert store.ingest_daily_table(now=evening.replace(minute=10)) == 0
+    assert store.daily_calls == 1
+    # 次日白天尚未到下一个公布窗口：不下载
+    assert not store.needs_bulk_refresh(datetime(2024, 5, 22, 10, 0, tzinfo=CN_TIMEZONE))
+    assert store.needs_bulk_refresh(datetime(2024, 5, 22, 18, 30, tzinfo=CN_TIMEZONE))
+
+
+    # 周五窗口已下载：周末晚间没有公布窗口，不再下载
+    friday = datetime(2024, 5, 24, 20, 0, tzinfo=CN_TIMEZONE)
+    store.ingest_daily_table(now=friday)
+    daily_calls = store.daily_calls
+    assert not store.needs_bulk_refresh(datetime(2024, 5, 25, 19, 0, tzinfo=CN_TIMEZONE))
+    assert not store.needs_bulk_refresh(datetime(2024, 5, 26, 23, 0, tzinfo=CN_TIMEZONE))
+    assert store.ingest_daily_table(now=datetime(2024, 5, 25, 19, 0, tzinfo=CN_TIMEZONE)) == 0
+    assert store.daily_calls == daily_calls
+    assert store.needs_bulk_refresh(datetime(2024, 5, 27, 18, 30, tzinfo=CN_TIMEZONE))
+
+    snapshot = store.get_daily_snapshot("161725", now=evening)
+    assert snapshot["unit_nav"] == 1.03 and snapshot["prev_nav"] == 1.02 and snapshot["daily_growth"] == 0.98
+    lagging = store.get_daily_snapshot("000002", now=evening)
+    assert lagging["nav_date"] == "2024-05-20" and lagging["unit_nav"] == 3.0 and lagging["prev_nav"] is None
+    assert store.get_daily_snapshot("999999", now=evening) is None
+
+    # 全市场净值表持续下载失败：快照早于应已公布的日期时不再使用
+    assert store.get_daily_snapshot("161725", now=datetime(2024, 5, 23, 10, 0, tzinfo=CN_TIMEZONE)) is None
+
+    # 本地历史停在前一净值日期的基金直接追加；没有本地历史的基金不写入历史（避免缺口）
+    assert store.get_last_date("161725") == "2024-05-21"
+    assert store.get_last_date("000001") is None
+
+
+def test_expected_nav_date():
+    # 公布窗口结束前，应已公布的是前一个交易日
+    assert expected_nav_date(datetime(2024, 5, 21, 20, 0, tzinfo=CN_TIMEZONE)) == "2024-05-20"
+    assert expected_nav_date(datetime(2024, 5, 22, 10, 0, tzinfo=CN_TIMEZONE)) == "2024-05-21"
+    # 周一上午：上一个交易日为周五
+    assert expected_nav_date(datetime(2024, 5, 27, 10, 0, tzinfo=CN_TIMEZONE)) == "2024-05-24"
+
+
+def test_nav_cache_ttl():
+    # 周五白天：缓存到当晚公布窗口开始
+    friday_noon = datetime(2024, 5, 24, 12, 0, tzinfo=CN_TIMEZONE)
+    assert nav_cache_ttl("2024-05-23", friday_noon) == 6 * 3600
+    # 公布窗口内尚未拿到当日净值：按重试间隔刷新
+    friday_evening = datetime(2024, 5, 24, 19, 0, tzinfo=CN_TIMEZONE)
+    assert nav_cache_ttl("2024-05-23", friday_evening) == FUND_NAV_BULK_RETRY_SECONDS
+    # 已拿到当日净值：缓存到下周一晚间
+    monday_publish = datetime(2024, 5, 27, 18, 0, tzinfo=CN_TIMEZONE)
+    assert nav_cache_ttl("2024-05-24", friday_evening) == (monday_publish - friday_evening).total_seconds()
+
+    # 国庆节假日的工作日：不在公布窗口内重试，缓存到节后第一个交易日晚间
+    holiday_evening = datetime(2026, 10, 5, 19, 0, tzinfo=CN_TIMEZONE)
+    after_holiday = datetime(2026, 10, 8, 18, 0, tzinfo=CN_TIMEZONE)
+    assert nav_cache_ttl("2026-09-30", holiday_evening) == (after_holiday - holiday_evening).total_seconds()
+
+
+def test_slow_fund_does_not_block_others():
+    class SlowNavStore(FakeNavStore):
+        def __init__(self, path):
+            self.release = threading.Event()
+            super().__init__(path)
+
+        def _fetch_full(self, code):
+            if code == "SLOW":
+                self.release.wait(5)
+            return super()._fetch_full(code)
+
+    store = SlowNavStore(os.path.join(tempfile.mkdtemp(), "fund_nav.db"))
+    slow = threading.Thread(target=store.update, args=("SLOW",))
+    slow.start()
+    try:
+        # 另一只基金的更新不等待慢基金的网络请求
+        assert store.update("161725") == 3
+        assert slow.is_alive()
+    finally:
+        store.release.set()
+        slow.join()
+
+
+if __name__ == "__main__":
+    test_full_load_then_incremental_append()
+    test_range_scan()
+    test_parse_daily_table()
+    test_bulk_ingest_once_per_publication_window()
+    test_expected_nav_date()
+    test_nav_cache_ttl()
+    test_slow_fund_does_not_block_others()
+    print("✅ FundNavStore tests passed.")
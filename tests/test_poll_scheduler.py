@@ -0,0 +1,128 @@
+import sys
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.database.database import Base
+from src.database.models import FundHolding, MarketType, Subscription
+from src.scheduler.poll_scheduler import PollScheduler, parse_poll_tiers
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    # 600519 被三只基金重仓，000001 被两只基金持有，其余只出现一次
+    holdings = {
+        "F1": [("600519", 9.0), ("000001", 1.0), ("300750", 0.5)],
+        "F2": [("600519", 8.0), ("000001", 1.0)],
+        "F3": [("600519", 7.0), ("601318", 0.2)],
+    }
+    for code, rows in holdings.items():
+        sub = Subscription(symbol=code, market_type=MarketType.FUND)
+        db.add(sub)
+        db.flush()
+        for symbol, weight in rows:
+            db.add(FundHolding(subscription_id=sub.id, stock_symbol=symbol, stock_name=symbol, weight=weight))
+    db.commit()
+    return db
+
+
+def plan_and_mark(scheduler, db, **kwargs):
+    """模拟轮询服务：本轮计划的股票全部写入成功"""
+    symbols = scheduler.plan(db, **kwargs)
+    scheduler.mark_polled(symbols)
+    return symbols
+
+
+def test_parse_tiers():
+    assert parse_poll_tiers("200:3,50:1,*:6") == [(50, 1), (200, 3), (None, 6)]
+    assert parse_poll_tiers("10:1") == [(10, 1), (None, 1)]
+
+
+def test_rank_by_subscriptions_and_weight():
+    db = make_session()
+    ranked = PollScheduler.rank(db)
+    assert [p.symbol for p in ranked] == ["600519", "000001", "300750", "601318"]
+    assert ranked[0].subscriptions == 3 and ranked[0].weight == 24.0
+
+
+def test_tiers_refresh_hot_symbols_more_often():
+    db = make_session()
+    scheduler = PollScheduler(tiers="1:1,*:3")
+
+    polled = [plan_and_mark(scheduler, db) for _ in range(4)]
+    assert polled[0] == ["600519", "000001", "300750", "601318"]
+    assert polled[1] == ["600519"]
+    assert polled[2] == ["600519"]
+    assert set(polled[3]) == {"600519", "000001", "300750", "601318"}
+
+
+def test_budget_defers_without_starving():
+    db = make_session()
+    scheduler = PollScheduler(tiers="*:1", budget=2)
+
+    seen = set()
+    for _ in range(4):
+        selected = plan_and_mark(scheduler, db)
+        assert len(selected) == 2
+        seen.update(selected)
+    # 高影响股票每轮优先，低影响股票顺延后最终也会被刷新
+    assert seen == {"600519", "000001", "300750", "601318"}
+    assert scheduler.get_stats()["deferred"] == 2
+
+
+def test_symbol_filter_keeps_global_tiers():
+    db = make_session()
+    scheduler = PollScheduler(tiers="1:1,*:3", budget=1)
+    assert scheduler.plan(db, symbol_filter=lambda s: s != "600519") == ["000001"]
+    assert scheduler.get_stats()["universe"] == 3
+
+
+
+def test_failed_symbols_stay_due():
+    db = make_session()
+    scheduler = PollScheduler(tiers="*:3")
+    assert len(scheduler.plan(db)) == 4
+    # 只有 600519 写入成功：其余股票下一轮仍然到期
+    scheduler.mark_polled(["600519"])
+    assert scheduler.plan(db) == ["000001", "300750", "601318"]
+
+
+
+def test_unfetchable_symbols_do_not_take_budget():
+    db = make_session()
+    # 港股持仓（轮询服务不写入）权重更高
+    sub = Subscription(symbol="F4", market_type=MarketType.FUND)
+    db.add(sub)
+    db.flush()
+    db.add_all([FundHolding(subscription_id=sub.id, stock_symbol=symbol, stock_name=symbol, weight=50.0)
+                for symbol in ("00700", "09988")])
+    db.commit()
+
+    scheduler = PollScheduler(tiers="*:1", budget=2)
+    is_a_share = lambda s: s.isdigit() and len(s) == 6
+    polled = []
+    for _ in range(5):
+        selected = scheduler.plan(db, market_filter=is_a_share)
+        assert len(selected) == 2 and "00700" not in selected and "09988" not in selected
+        scheduler.mark_polled(selected)
+        polled.append(selected)
+    assert polled[0] == ["600519", "000001"]
+    assert set(sum(polled, [])) == {"600519", "000001", "300750", "601318"}
+    assert scheduler.get_stats()["universe"] == 4
+
+
+if __name__ == "__main__":
+    test_parse_tiers()
+    test_rank_by_subscriptions_and_weight()
+    test_tiers_refresh_hot_symbols_more_often()
+    test_budget_defers_without_starving()
+    test_symbol_filter_keeps_global_tiers()
+    test_failed_symbols_stay_due()
+    test_unfetchable_symbols_do_not_take_budget()
+    print("poll scheduler tests passed")
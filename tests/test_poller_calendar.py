@@ -0,0 +1,60 @@
+import sys
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.scheduler.stock_poller import POLL_POST_CLOSE_DELAY_SECONDS, StockPollerService
+
+SHANGHAI = ZoneInfo("Asia/Shanghai")
+
+
+class RecordingPoller(StockPollerService):
+    def __init__(self):
+        super().__init__(interval_minutes=10)
+        self.polls = []
+
+    def poll_task(self, post_close=False):
+        self.polls.append(post_close)
+
+
+def test_next_wakeup():
+    poller = RecordingPoller()
+
+    # 交易时段内按轮询间隔唤醒
+    assert poller.next_wakeup(datetime(2026, 10, 16, 10, 0, tzinfo=SHANGHAI)) == \
+        datetime(2026, 10, 16, 10, 10, tzinfo=SHANGHAI)
+    # 临近收盘时唤醒时间为收盘后的最终轮询时间
+    close_poll = datetime(2026, 10, 16, 15, 0, tzinfo=SHANGHAI).timestamp() + POLL_POST_CLOSE_DELAY_SECONDS
+    assert poller.next_wakeup(datetime(2026, 10, 16, 14, 55, tzinfo=SHANGHAI)).timestamp() == close_poll
+
+    # 午间休市前按轮询间隔唤醒，午间休市期间休眠到下午开盘，不做最终轮询
+    assert poller.next_wakeup(datetime(2026, 10, 16, 11, 25, tzinfo=SHANGHAI)) == \
+        datetime(2026, 10, 16, 11, 35, tzinfo=SHANGHAI)
+    assert poller.next_wakeup(datetime(2026, 10, 16, 11, 31, tzinfo=SHANGHAI)) == \
+        datetime(2026, 10, 16, 13, 0, tzinfo=SHANGHAI)
+
+    # 最终轮询完成后休眠到下一个交易日（国庆长假前跳到节后）
+    poller.last_close_polled = datetime(2026, 9, 30, 15, 0, tzinfo=SHANGHAI)
+    assert poller.next_wakeup(datetime(2026, 9, 30, 15, 5, tzinfo=SHANGHAI)) == \
+        datetime(2026, 10, 8, 9, 30, tzinfo=SHANGHAI)
+
+
+def test_post_close_poll_runs_once():
+    poller = RecordingPoller()
+
+    # 午间休市不是当日收盘
+    poller.run_once(datetime(2026, 10, 16, 11, 33, tzinfo=SHANGHAI))
+    poller.run_once(datetime(2026, 10, 16, 14, 50, tzinfo=SHANGHAI))
+    poller.run_once(datetime(2026, 10, 16, 15, 3, tzinfo=SHANGHAI))
+    poller.run_once(datetime(2026, 10, 16, 15, 10, tzinfo=SHANGHAI))
+    # 节假日不轮询
+    poller.run_once(datetime(2026, 10, 5, 10, 0, tzinfo=SHANGHAI))
+    assert poller.polls == [False, True]
+
+
+if __name__ == "__main__":
+    test_next_wakeup()
+    test_post_close_poll_runs_once()
+    print("poller calendar tests passed")
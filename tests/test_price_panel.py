@@ -0,0 +1,89 @@
+import sys
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data import price_panel
+from src.data.price_panel import (
+    PRICE_PANEL_CLOSED_TTL,
+    PRICE_PANEL_OPEN_TTL,
+    get_price_panel,
+    latest_closes,
+    panel_ttl,
+)
+
+
+def make_batch(tickers, dates):
+    """构造 yf.download(group_by="ticker") 形式的多层列结果"""
+    frames = {}
+    for i, ticker in enumerate(tickers):
+        close = [100.0 + i + d for d in range(len(dates))]
+        frames[ticker] = pd.DataFrame({
+            "Open": close, "High": close, "Low": close, "Close": close,
+            "Adj Close": close, "Volume": [1000] * len(dates)
+        }, index=pd.DatetimeIndex(dates, name="Date"))
+    return pd.concat(frames, axis=1)
+
+
+def test_batch_download_with_fallback_and_cache():
+    dates = ["2026-10-12", "2026-10-13", "2026-10-14"]
+    calls = {"download": 0, "history": []}
+
+    def fake_download(tickers, **kwargs):
+        calls["download"] += 1
+        # 批量结果缺少 CL=F，应由线程池单独补齐
+        return make_batch([t for t in tickers if t != "CL=F"], dates)
+
+    class FakeTicker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, period, interval):
+            calls["history"].append(self.ticker)
+            return make_batch([self.ticker], dates)[self.ticker]
+
+    saved = (price_panel.yf.download, price_panel.yf.Ticker)
+    price_panel.yf.download = fake_download
+    price_panel.yf.Ticker = FakeTicker
+    price_panel.clear_price_panel_cache()
+    try:
+        tickers = ["^GSPC", "GC=F", "CL=F"]
+        panel = get_price_panel(tickers, period="1mo")
+        assert list(panel.columns) == price_panel.PANEL_COLUMNS
+        assert list(panel["Ticker"].unique()) == tickers
+        assert len(panel) == 9
+        assert calls["history"] == ["CL=F"]
+
+        closes = latest_closes(panel)
+        assert closes["^GSPC"]["close"] == 102.0
+        assert round(closes["GC=F"]["change_pct"], 4) == round(1 / 102 * 100, 4)
+
+        # 第二次读取命中缓存
+        get_price_panel(tickers, period="1mo")
+        assert calls["download"] == 1
+    finally:
+        price_panel.yf.download, price_panel.yf.Ticker = saved
+        price_panel.clear_price_panel_cache()
+
+
+def test_ttl_follows_market_hours():
+    us_open = datetime(2026, 10, 14, 10, 0, tzinfo=ZoneInfo("America/New_York"))
+    us_closed = datetime(2026, 10, 14, 20, 0, tzinfo=ZoneInfo("America/New_York"))
+    saturday = datetime(2026, 10, 17, 11, 0, tzinfo=ZoneInfo("America/New_York"))
+
+    assert panel_ttl(["^GSPC"], now=us_open) == PRICE_PANEL_OPEN_TTL
+    assert panel_ttl(["^GSPC"], now=us_closed) == PRICE_PANEL_CLOSED_TTL
+    assert panel_ttl(["^GSPC", "000001.SS"], now=saturday) == PRICE_PANEL_CLOSED_TTL
+    # 美东 21:30 为北京时间次日 9:30，A股开盘
+    cn_open = datetime(2026, 10, 13, 21, 30, tzinfo=ZoneInfo("America/New_York"))
+    assert panel_ttl(["^GSPC", "000001.SS"], now=cn_open) == PRICE_PANEL_OPEN_TTL
+
+
+if __name__ == "__main__":
+    test_batch_download_with_fallback_and_cache()
+    test_ttl_follows_market_hours()
+    print("price panel tests passed")
@@ -0,0 +1,115 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.database.database import Base
+from src.database.models import FundHolding, QuoteBar, QuoteTick, StockQuote
+from src.data.realtime_data import get_holdings_prices_from_db
+from src.services.quote_history_service import QuoteHistoryService
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def poll(db, ts, price, volume):
+    QuoteHistoryService.append_ticks(db, {"600519": {"price": price, "volume": volume}}, ts=ts)
+    QuoteHistoryService.rollup(db, since=ts)
+    db.commit()
+
+
+def test_rollups():
+    db = make_session()
+    day = datetime(2026, 10, 16, 1, 30)  # 北京时间 9:30
+
+    poll(db, day, 1500.0, 100)
+    poll(db, day + timedelta(seconds=20), 1510.0, 150)
+    poll(db, day + timedelta(minutes=1), 1490.0, 180)
+    poll(db, day + timedelta(minutes=31), 1520.0, 300)
+
+    one_minute = QuoteHistoryService.get_bars(db, "600519", "1m")
+    assert len(one_minute) == 3
+    first = one_minute.iloc[0]
+    assert (first["Open"], first["High"], first["Low"], first["Close"]) == (1500.0, 1510.0, 1500.0, 1510.0)
+    assert first["Volume"] == 50
+    # 跨分钟的成交量增量记入后一根K线，30分钟K之间不丢失成交量
+    assert one_minute.iloc[1]["Volume"] == 30
+
+    thirty = QuoteHistoryService.get_bars(db, "600519", "30m")
+    assert list(thirty.index) == [day, day + timedelta(minutes=30)]
+    assert thirty.iloc[0]["Low"] == 1490.0 and thirty.iloc[0]["Close"] == 1490.0
+    assert list(thirty["Volume"]) == [80, 120]
+
+    daily = QuoteHistoryService.get_bars(db, "600519", "1d")
+    assert len(daily) == 1
+    bar = daily.iloc[0]
+    assert (bar["Open"], bar["High"], bar["Low"], bar["Close"], bar["Volume"]) == (1500.0, 1520.0, 1490.0, 1520.0, 300)
+
+    # 同一时间重复写入不产生重复行
+    poll(db, day, 1500.0, 100)
+    assert db.query(QuoteTick).count() == 4
+
+
+def test_volume_with_sparse_polls():
+    db = make_session()
+    day = datetime(2026, 10, 16, 1, 30)
+    # 每10分钟轮询一次，累计成交量 100 → 500
+    for i, volume in enumerate([100, 200, 300, 400, 500]):
+        poll(db, day + timedelta(minutes=10 * i), 10.0 + i, volume)
+
+    one_minute = QuoteHistoryService.get_bars(db, "600519", "1m")
+    assert list(one_minute["Volume"]) == [0, 100, 100, 100, 100]
+    thirty = QuoteHistoryService.get_bars(db, "600519", "30m")
+    assert list(thirty["Volume"]) == [200, 200]
+    assert thirty["Volume"].sum() == 400
+
+    daily = QuoteHistoryService.get_bars(db, "600519", "1d").iloc[0]
+    assert (daily["Open"], daily["High"], daily["Low"], daily["Close"], daily["Volume"]) == (10.0, 14.0, 10.0, 14.0, 500)
+
+
+def test_retention():
+    db = make_session()
+    now = datetime(2026, 10, 16, 2, 0)
+    poll(db, now - timedelta(days=10), 10.0, 1)
+    poll(db, now, 11.0, 2)
+
+    deleted = QuoteHistoryService.apply_retention(db, now=now)
+    db.commit()
+    assert deleted["ticks"] == 1 and deleted["1m"] == 1 and deleted["30m"] == 0
+    assert db.query(QuoteTick).count() == 1
+    # 日K永久保留
+    assert db.query(QuoteBar).filter(QuoteBar.interval == "1d").count() == 2
+
+
+def test_holdings_view_reads_rollups():
+    db = make_session()
+    # 两天前（如周五）的两根30分钟K：休市期间打开看板仍显示最近交易日的走势
+    last_session = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=2)
+    poll(db, last_session, 1500.0, 100)
+    poll(db, last_session + timedelta(minutes=30), 1510.0, 200)
+    db.add(StockQuote(symbol="600519", name="贵州茅台", price=1510.0, change_pct=1.0,
+                      updated_at=last_session + timedelta(minutes=30)))
+    db.commit()
+
+    assert QuoteHistoryService.get_recent_closes(db, ["600519", "000001"]) == {"600519": [1500.0, 1510.0]}
+
+    holdings = [FundHolding(stock_symbol="600519", stock_name="贵州茅台", weight=10.0),
+                FundHolding(stock_symbol="000001", stock_name="平安银行", weight=5.0)]
+    rows = {row["code"]: row for row in get_holdings_prices_from_db(db, holdings)}
+    assert rows["600519"]["trend"] == [1500.0, 1510.0] and rows["600519"]["贡献度"] == 0.1
+    assert rows["000001"]["trend"] == [] and rows["000001"]["price"] is None
+
+
+if __name__ == "__main__":
+    test_rollups()
+    test_volume_with_sparse_polls()
+    test_retention()
+    test_holdings_view_reads_rollups()
+    print("quote history tests passed")
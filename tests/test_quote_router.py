@@ -0,0 +1,100 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.quote_router import NoUpstreamCall, QuoteRouter, detect_market
+
+
+def make_provider(name, delay, calls, fail=False):
+    def fetch(ticker):
+        calls.append(name)
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError("403 Forbidden")
+        return {"name": ticker, "price": 10.0}
+    return fetch
+
+
+def test_prior_order_then_failover():
+    calls = []
+    router = QuoteRouter()
+    router.register("sina", make_provider("sina", 0.0, calls, fail=True), markets={"CN"}, prior_latency=0.2)
+    router.register("east_money", make_provider("east_money", 0.0, calls), markets={"CN"}, prior_latency=0.3)
+    router.register("yfinance", make_provider("yfinance", 0.0, calls), markets={"US", "CN"}, prior_latency=1.0)
+
+    provider, data = router.route("600519")
+    assert provider == "east_money"
+    assert data["price"] == 10.0
+    assert calls == ["sina", "east_money"]
+    assert router.get_stats()["failovers"] == 1
+
+    # 美股只路由到适用的数据源
+    assert router.route("AAPL")[0] == "yfinance"
+
+
+def test_ranking_follows_measured_latency_and_success():
+    calls = []
+    router = QuoteRouter()
+    router.register("slow", make_provider("slow", 0.05, calls), markets={"CN"}, prior_latency=0.1)
+    router.register("fast", make_provider("fast", 0.0, calls), markets={"CN"}, prior_latency=0.5)
+    assert router.rank("CN") == ["slow", "fast"]
+
+    for _ in range(6):
+        router._call("slow", "CN", "600519")
+        router._call("fast", "CN", "600519")
+    assert router.rank("CN") == ["fast", "slow"]
+
+    stats = router.get_stats()["markets"]["CN"]
+    assert stats["fast"]["samples"] == 6
+    assert stats["slow"]["p50"] >= 0.05
+
+
+def test_hedges_when_primary_exceeds_p95():
+    calls = []
+    router = QuoteRouter()
+    router.register("primary", make_provider("primary", 0.01, calls), markets={"CN"}, prior_latency=0.1)
+    router.register("backup", make_provider("backup", 0.01, calls), markets={"CN"}, prior_latency=0.2)
+    for _ in range(6):
+        router._call("primary", "CN", "600519")
+
+    # 首选数据源突然变慢，超过其 p95 后对冲到备用数据源
+    router._providers["primary"]["fetch"] = make_provider("primary", 1.0, calls)
+    start = time.perf_counter()
+    provider, _ = router.route("600519")
+    assert provider == "backup"
+    assert time.perf_counter() - start < 0.5
+    assert router.get_stats()["hedged"] == 1
+
+
+def test_cache_hits_are_not_provider_samples():
+    cache = {"600519": {"name": "贵州茅台", "price": 1500.0}}
+
+    def fetch(ticker):
+        if ticker in cache:
+            raise NoUpstreamCall(cache[ticker])
+        # 负缓存：近期确认无数据，不请求上游
+        raise NoUpstreamCall()
+
+    router = QuoteRouter()
+    router.register("sina", fetch, markets={"CN"}, prior_latency=0.2)
+    assert router.route("600519") == ("sina", cache["600519"])
+    assert router.route("000000") is None
+    assert router.get_stats()["markets"]["CN"]["sina"]["samples"] == 0
+
+
+def test_detect_market():
+    assert detect_market("600519") == "CN"
+    assert detect_market("00700") == "HK"
+    assert detect_market("0700.HK") == "HK"
+    assert detect_market("AAPL") == "US"
+
+
+if __name__ == "__main__":
+    test_prior_order_then_failover()
+    test_ranking_follows_measured_latency_and_success()
+    test_hedges_when_primary_exceeds_p95()
+    test_cache_hits_are_not_provider_samples()
+    test_detect_market()
+    print("✅ QuoteRouter tests passed.")
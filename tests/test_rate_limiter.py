@@ -0,0 +1,64 @@
+import sys
+import os
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.rate_limiter import RateLimiterRegistry, TokenBucket, parse_rate_limits
+
+
+def test_burst_then_steady_rate():
+    bucket = TokenBucket(rate=20, burst=5)
+    start = time.perf_counter()
+    for _ in range(5):
+        assert bucket.acquire() == 0.0
+    assert time.perf_counter() - start < 0.05
+
+    # 之后每个请求间隔 1/20 秒
+    start = time.perf_counter()
+    for _ in range(4):
+        bucket.acquire()
+    assert 0.15 < time.perf_counter() - start < 0.4
+    assert not bucket.try_acquire()
+
+
+def test_threads_share_bucket_budget():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(11)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 1 个突发 + 10 个按 50/s 发放，约 0.2 秒
+    assert 0.15 < time.perf_counter() - start < 0.5
+    assert bucket.get_stats()["acquired"] == 11
+
+
+def test_hosts_are_limited_independently():
+    limiters = RateLimiterRegistry({"push2.eastmoney.com": (10, 1), "hq.sinajs.cn": (10, 1)})
+    assert limiters.get("82.push2.eastmoney.com") is limiters.get("push2.eastmoney.com")
+    assert limiters.get("hq.sinajs.cn") is not limiters.get("push2.eastmoney.com")
+
+    limiters.acquire("push2.eastmoney.com")
+    start = time.perf_counter()
+    # 东方财富的桶已空，新浪不受影响
+    assert limiters.acquire("hq.sinajs.cn") == 0.0
+    assert time.perf_counter() - start < 0.02
+    assert limiters.acquire("push2.eastmoney.com") > 0
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("hq.sinajs.cn=5:10, push2.eastmoney.com=0.5") == {
+        "hq.sinajs.cn": (5.0, 10),
+        "push2.eastmoney.com": (0.5, 1),
+    }
+
+
+if __name__ == "__main__":
+    test_burst_then_steady_rate()
+    test_threads_share_bucket_budget()
+    test_hosts_are_limited_independently()
+    test_parse_rate_limits()
+    print("✅ RateLimiter tests passed.")
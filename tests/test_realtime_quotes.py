@@ -0,0 +1,119 @@
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+import src.data.realtime_data as realtime_data
+from src.data.cache_engine import CacheEngine
+from src.data.circuit_breaker import get_breaker
+from src.data.fetch_engine import FetchResult
+from src.data.quote_router import QuoteRouter
+from src.data.shared_cache import SharedCache
+
+
+def sina_line(symbol, name, prev_close, price):
+    """构造一行新浪行情（32个字段，日期时间在第30、31个字段）"""
+    fields = [name, str(prev_close), str(prev_close), str(price), str(price), str(price)] + ["0"] * 24
+    fields[8] = "1000"
+    fields += ["2026-10-16", "15:00:00", "00"]
+    return f'var hq_str_{symbol}="{",".join(fields)}";'
+
+
+class FakeFetchEngine:
+    """按 URL 返回预设的响应正文，记录请求"""
+
+    def __init__(self, text):
+        self.text = text
+        self.requests = []
+
+    def get_many(self, requests):
+        results = []
+        for request in requests:
+            self.requests.append(request["url"])
+            result = FetchResult(request["url"])
+            result.status = 200
+            result.text = self.text
+            results.append(result)
+        return results
+
+
+class QuoteEnv:
+    """把行情缓存、负缓存、抓取引擎和行情路由替换为测试用的实例"""
+
+    def __init__(self, text):
+        self.engine = FakeFetchEngine(text)
+        self.routed = []
+        self.router = QuoteRouter()
+        self.router.register("east_money", self._route_fetch, markets={"CN"}, prior_latency=0.1)
+
+    def _route_fetch(self, ticker):
+        self.routed.append(ticker)
+        return {"name": ticker, "price": 1.0}
+
+    def __enter__(self):
+        self.saved = {name: getattr(realtime_data, name)
+                      for name in ("_cache", "_negative_cache", "fetch_engine", "quote_router")}
+        realtime_data._cache = SharedCache(
+            path=os.path.join(tempfile.mkdtemp(), "shared_cache.db"),
+            local=CacheEngine(namespace_ttls=realtime_data.CACHE_NAMESPACE_TTLS),
+            namespace_ttls=realtime_data.CACHE_NAMESPACE_TTLS,
+        )
+        realtime_data._negative_cache = CacheEngine(default_ttl=60)
+        realtime_data.fetch_engine = self.engine
+        realtime_data.quote_router = self.router
+        get_breaker("sina").reset()
+        return self
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(realtime_data, name, value)
+
+
+def test_prefetch_serves_routed_reads():
+    text = "\n".join([sina_line("sh600519", "贵州茅台", 1500.0, 1530.0), sina_line("sz000001", "平安银行", 10.0, 10.5)])
+    with QuoteEnv(text) as env:
+        realtime_data.prefetch_stock_realtime_data(["600519", "000001", "AAPL"])
+        assert len(env.engine.requests) == 1
+
+        # 预取结果写入行情缓存：逐只读取不再经行情路由请求其他数据源
+        data = realtime_data.get_stock_realtime_data("600519")
+        assert data["price"] == 1530.0 and data["data_source"] == "sina"
+        assert realtime_data.get_stock_realtime_data("000001")["name"] == "平安银行"
+        assert env.routed == []
+
+        # 已缓存的代码不再重复预取
+        realtime_data.prefetch_stock_realtime_data(["600519"])
+        assert len(env.engine.requests) == 1
+
+
+def test_sina_batch_parsing_and_negative_cache():
+    # 多行响应：停牌行字段为空、无效代码返回空串
+    text = "\n".join([
+        sina_line("sh600519", "贵州茅台", 1500.0, 1530.0),
+        sina_line("sz000001", "平安银行", 10.0, 10.5),
+        'var hq_str_sh600000="浦发银行,,,,,,";',
+        'var hq_str_sz399999="";',
+    ])
+    with QuoteEnv(text) as env:
+        quotes = realtime_data.get_stock_realtime_data_sina_batch(["600519", "000001", "600000", "399999"], chunk_size=3)
+        assert len(env.engine.requests) == 2
+        assert "sh600519,sz000001,sh600000" in env.engine.requests[0]
+        assert sorted(quotes) == ["000001", "600519"]
+        moutai = quotes["600519"]
+        assert moutai["name"] == "贵州茅台" and moutai["price"] == 1530.0 and moutai["prev_close"] == 1500.0
+        assert round(moutai["change_pct"], 6) == 2.0 and moutai["volume"] == 1000.0
+        assert moutai["update_time"] == "2026-10-16 15:00:00"
+
+        # 请求成功但没有数据的代码进入负缓存，有数据的代码写入缓存：再次请求时都不访问新浪
+        assert realtime_data._is_known_bad("sina", "600000") and realtime_data._is_known_bad("sina", "399999")
+        assert not realtime_data._is_known_bad("sina", "600519")
+        again = realtime_data.get_stock_realtime_data_sina_batch(["600519", "600000", "399999"])
+        assert list(again) == ["600519"]
+        assert len(env.engine.requests) == 2
+
+
+if __name__ == "__main__":
+    test_prefetch_serves_routed_reads()
+    test_sina_batch_parsing_and_negative_cache()
+    print("realtime quote tests passed")
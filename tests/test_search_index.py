@@ -0,0 +1,64 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.search_index import SearchIndex
+
+RECORDS = {
+    "161725": ("招商中证白酒指数A", "ZSZZBJZSA"),
+    "012414": ("招商中证白酒指数C", "ZSZZBJZSC"),
+    "512170": ("医疗ETF", "YLETF"),
+    "000001": ("华夏成长混合", "HXCZHH"),
+}
+
+
+def test_search_ranks_code_name_and_pinyin():
+    index = SearchIndex(market="A股基金")
+    index.sync(RECORDS)
+
+    assert index.search("161725")[0]["代码"] == "161725"
+    assert [r["代码"] for r in index.search("白酒")] == ["012414", "161725"]
+    assert index.search("zszzbjzsa")[0]["代码"] == "161725"
+    assert index.search("HXCZ")[0]["名称"] == "华夏成长混合"
+    assert index.search("5121")[0]["代码"] == "512170"
+    assert index.search("不存在的基金") == []
+    assert len(index.search("招商", top_k=1)) == 1
+
+
+def test_incremental_sync():
+    index = SearchIndex(market="A股基金")
+    assert index.sync(RECORDS, version=1) == {"added": 4, "removed": 0, "updated": 0}
+
+    changed = dict(RECORDS)
+    del changed["000001"]
+    changed["512170"] = ("医疗ETF联接", "YLETFLJ")
+    changed["159995"] = ("芯片ETF", "XPETF")
+    assert index.sync(changed, version=2) == {"added": 1, "removed": 1, "updated": 1}
+
+    assert index.version == 2
+    assert index.search("华夏") == []
+    assert index.search("联接")[0]["代码"] == "512170"
+    assert index.search("芯片")[0]["代码"] == "159995"
+
+
+def test_search_is_fast_on_large_directory():
+    index = SearchIndex(market="A股基金")
+    records = {f"{i:06d}": (f"测试基金{i}号混合", f"CSJJ{i}HH") for i in range(20000)}
+    records["161725"] = ("招商中证白酒指数A", "ZSZZBJZSA")
+    index.sync(records)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        results = index.search("白酒")
+    elapsed_ms = (time.perf_counter() - start) * 1000 / 100
+    assert results[0]["代码"] == "161725"
+    assert elapsed_ms < 5
+
+
+if __name__ == "__main__":
+    test_search_ranks_code_name_and_pinyin()
+    test_incremental_sync()
+    test_search_is_fast_on_large_directory()
+    print("✅ SearchIndex tests passed.")
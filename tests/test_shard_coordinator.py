@@ -0,0 +1,102 @@
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.database.database import Base
+from src.database.models import PollerWorker
+from src.scheduler.shard_coordinator import ShardCoordinator, assign_shards, database_now, symbol_shard
+
+SHARDS = 32
+
+
+def make_session_factory():
+    path = os.path.join(tempfile.mkdtemp(), "leases.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def make_worker(factory, name):
+    return ShardCoordinator(worker_id=name, shard_count=SHARDS, lease_ttl=90, session_factory=factory)
+
+
+def test_consistent_hash_moves_few_shards():
+    before = assign_shards(["a", "b"], 256)
+    after = assign_shards(["a", "b", "c"], 256)
+    moved = [shard for shard in before if before[shard] != after[shard]]
+    # 新增工作进程只接管约 1/3 的分片，且都是迁移给新进程
+    assert all(after[shard] == "c" for shard in moved)
+    assert 40 < len(moved) < 130
+    assert symbol_shard("600519", SHARDS) == symbol_shard("600519", SHARDS)
+
+
+def test_join_and_failover():
+    factory = make_session_factory()
+    now = datetime(2026, 10, 16, 2, 0)
+    w1, w2 = make_worker(factory, "w1"), make_worker(factory, "w2")
+
+    assert w1.heartbeat(now)["owned"] == SHARDS
+
+    # w2 加入：分配给它的分片仍由 w1 持有，等待 w1 释放，不会重复轮询
+    stats = w2.heartbeat(now + timedelta(seconds=1))
+    assert stats["owned"] == 0 and stats["pending"] == stats["assigned"] > 0
+    w1.heartbeat(now + timedelta(seconds=30))
+    w2.heartbeat(now + timedelta(seconds=31))
+    assert not (w1.owned_shards & w2.owned_shards)
+    assert len(w1.owned_shards | w2.owned_shards) == SHARDS
+
+    # 只有一个工作进程负责全局任务
+    assert w1.is_leader() != w2.is_leader()
+
+    symbols = [f"{i:06d}" for i in range(200)]
+    assert sum(w1.owns(s) for s in symbols) + sum(w2.owns(s) for s in symbols) == len(symbols)
+
+    # w2 失联：租约过期后 w1 接管全部分片
+    stats = w1.heartbeat(now + timedelta(seconds=200))
+    assert stats["workers"] == 1 and stats["owned"] == SHARDS and w1.is_leader()
+    # 过期的工作进程注册在心跳时删除
+    db = factory()
+    assert [row[0] for row in db.query(PollerWorker.worker_id).all()] == ["w1"]
+    db.close()
+
+
+def test_heartbeat_uses_database_clock():
+    factory = make_session_factory()
+    db = factory()
+    db_now = database_now(db)
+    db.close()
+    assert abs((db_now - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()) < 60
+
+    w1 = make_worker(factory, "w1")
+    assert w1.heartbeat()["owned"] == SHARDS
+    db = factory()
+    expires_at = db.query(PollerWorker.expires_at).scalar()
+    db.close()
+    assert timedelta(seconds=80) < expires_at - db_now < timedelta(seconds=100)
+
+
+def test_release_hands_over_immediately():
+    factory = make_session_factory()
+    now = datetime(2026, 10, 16, 2, 0)
+    w1, w2 = make_worker(factory, "w1"), make_worker(factory, "w2")
+    w1.heartbeat(now)
+    w2.heartbeat(now)
+    w1.heartbeat(now)
+
+    w2.release()
+    assert not w2.owns("600519")
+    assert w1.heartbeat(now + timedelta(seconds=1))["owned"] == SHARDS
+
+
+if __name__ == "__main__":
+    test_consistent_hash_moves_few_shards()
+    test_join_and_failover()
+    test_heartbeat_uses_database_clock()
+    test_release_hands_over_immediately()
+    print("shard coordinator tests passed")
@@ -0,0 +1,92 @@
+import sys
+import os
+import multiprocessing
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.shared_cache import SharedCache
+
+
+def _write_from_child(path):
+    cache = SharedCache(path=path, sync_seconds=0)
+    cache.set("stock", "AAPL", {"price": 200.0}, ttl=60)
+
+
+def _increment_from_child(path, times):
+    cache = SharedCache(path=path, sync_seconds=0)
+    for _ in range(times):
+        cache.update("counter", "n", lambda current: (current or 0) + 1, ttl=60, jitter=False)
+
+
+def test_visible_across_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shared.db")
+        reader = SharedCache(path=path, sync_seconds=0)
+        assert reader.get("stock", "AAPL") is None
+
+        child = multiprocessing.Process(target=_write_from_child, args=(path,))
+        child.start()
+        child.join(10)
+        assert child.exitcode == 0
+
+        assert reader.get("stock", "AAPL") == {"price": 200.0}
+        assert reader.get_stats()["shared"]["shared_hits"] == 1
+        # 回填一级缓存后不再读取共享文件
+        assert reader.get("stock", "AAPL") == {"price": 200.0}
+        assert reader.get_stats()["shared"]["shared_hits"] == 1
+
+
+def test_atomic_update_across_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shared.db")
+        SharedCache(path=path)
+        workers = [multiprocessing.Process(target=_increment_from_child, args=(path, 25)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        assert SharedCache(path=path).get("counter", "n") == 100
+
+
+def test_clear_invalidates_other_caches():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shared.db")
+        # 两个实例各自有独立的一级缓存，相当于两个进程
+        poller = SharedCache(path=path, sync_seconds=0)
+        web = SharedCache(path=path, sync_seconds=0)
+
+        history = pd.DataFrame({"单位净值": [1.0, 1.01]})
+        poller.set("fund", "161725", {"latest_nav": 1.01, "history": history}, ttl=60)
+        poller.set("stock", "AAPL", {"price": 200.0}, ttl=60)
+        assert web.get("fund", "161725")["history"].equals(history)
+        assert web.get("stock", "AAPL") == {"price": 200.0}
+
+        # 只清空一个命名空间
+        poller.clear("fund")
+        assert web.get("fund", "161725") is None
+        assert web.get("stock", "AAPL") == {"price": 200.0}
+
+        # 全部清空：其他实例的一级缓存同样失效
+        poller.clear()
+        assert web.get("stock", "AAPL") is None
+
+
+def test_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SharedCache(path=os.path.join(tmp, "shared.db"), sync_seconds=0)
+        cache.set("sina", "600519", {"price": 1500.0}, ttl=0.05, jitter=False)
+        time.sleep(0.1)
+        assert cache.get("sina", "600519") is None
+        assert cache.purge_expired() == 1
+
+
+if __name__ == "__main__":
+    test_visible_across_processes()
+    test_atomic_update_across_processes()
+    test_clear_invalidates_other_caches()
+    test_expiry()
+    print("shared cache tests passed")
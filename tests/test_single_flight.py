@@ -0,0 +1,69 @@
+import sys
+import os
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+    results = []
+
+    def fetch(ticker):
+        executions.append(ticker)
+        time.sleep(0.2)
+        return {"ticker": ticker}
+
+    def worker():
+        results.append(flight.do("fund:512170", fetch, "512170"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert executions == ["512170"]
+    assert len(results) == 8
+    assert all(r is results[0] for r in results)
+
+    stats = flight.get_stats()
+    assert stats["calls"] == 8
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 7
+    assert stats["in_flight"] == 0
+
+
+def test_errors_propagate_to_waiters_and_key_is_released():
+    flight = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise ConnectionError("rate limited")
+
+    def worker():
+        try:
+            flight.do("stock:600519", failing)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 3
+    assert flight.get_stats()["errors"] == 1
+    assert flight.do("stock:600519", lambda: "ok") == "ok"
+
+
+if __name__ == "__main__":
+    test_concurrent_calls_share_one_execution()
+    test_errors_propagate_to_waiters_and_key_is_released()
+    print("✅ SingleFlight tests passed.")
@@ -0,0 +1,116 @@
+import sys
+import os
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+import src.scheduler.stock_poller as stock_poller
+from src.database.database import Base
+from src.database.models import FundHolding, MarketType, StockQuote, Subscription
+from src.scheduler.poll_scheduler import PollScheduler
+from src.scheduler.stock_poller import StockPollerService
+
+
+def spot_row(code, name, price, prev_close):
+    return {"代码": code, "名称": name, "最新价": price, "昨收": prev_close,
+            "涨跌幅": round((price / prev_close - 1) * 100, 2), "成交量": 1000.0,
+            "最高": price + 1, "最低": price - 1}
+
+
+class FakeAkshare:
+    """只提供全市场行情接口的 akshare 替身，记录下载次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def stock_zh_a_spot_em(self):
+        self.calls += 1
+        return pd.DataFrame([
+            spot_row("600519", "贵州茅台", 1530.0, 1500.0),
+            spot_row("000001", "平安银行", 10.5, 10.0),
+            spot_row("300750", "宁德时代", 250.0, 245.0),
+            # 停牌：价格等字段为空
+            {"代码": "600000", "名称": "浦发银行", "最新价": None, "昨收": 8.0, "涨跌幅": None,
+             "成交量": None, "最高": None, "最低": None},
+            {"代码": "601318", "名称": "中国平安", "最新价": "-", "昨收": "-", "涨跌幅": "-",
+             "成交量": "-", "最高": "-", "最低": "-"},
+        ])
+
+
+class RecordingPoller(StockPollerService):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.routed = []
+
+    def fetch_stock_data_routed(self, symbol):
+        self.routed.append(symbol)
+        return None
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    sub = Subscription(symbol="F1", market_type=MarketType.FUND)
+    db.add(sub)
+    db.flush()
+    for symbol in ("600519", "000001", "300750", "600000", "601318", "00700"):
+        db.add(FundHolding(subscription_id=sub.id, stock_symbol=symbol, stock_name=symbol, weight=1.0))
+    db.commit()
+    return db
+
+
+def test_fetch_market_snapshot_skips_empty_rows():
+    fake = FakeAkshare()
+    saved = stock_poller.ak
+    stock_poller.ak = fake
+    stock_poller.east_money_breaker.reset()
+    try:
+        snapshot = RecordingPoller().fetch_market_snapshot()
+    finally:
+        stock_poller.ak = saved
+
+    assert fake.calls == 1
+    assert sorted(snapshot) == ["000001", "300750", "600519"]
+    moutai = snapshot["600519"]
+    assert moutai["name"] == "贵州茅台" and moutai["price"] == 1530.0 and moutai["prev_close"] == 1500.0
+    assert moutai["data_source"] == "east_money"
+
+
+def test_one_snapshot_serves_whole_cycle():
+    db = make_session()
+    fake = FakeAkshare()
+    # 每轮预算只有1只、批次大小为2：快照模式下仍应一次下载写入全部持仓股票
+    poller = RecordingPoller(batch_size=2, poll_scheduler=PollScheduler(budget=1))
+
+    def fake_get_db():
+        yield db
+
+    saved = (stock_poller.ak, stock_poller.get_db)
+    stock_poller.ak = fake
+    stock_poller.get_db = fake_get_db
+    stock_poller.east_money_breaker.reset()
+    try:
+        poller.poll_task(post_close=True)
+    finally:
+        stock_poller.ak, stock_poller.get_db = saved
+
+    assert fake.calls == 1
+    assert poller.routed == []
+    stats = poller.last_cycle_stats
+    assert stats["snapshot_rows"] == 3
+    assert stats["success"] == 3 and stats["fail"] == 0
+    assert stats["db_statements"] == 1
+
+    rows = {q.symbol: q for q in db.query(StockQuote).all()}
+    assert sorted(rows) == ["000001", "300750", "600519"]
+    assert rows["000001"].price == 10.5 and rows["000001"].data_source == "east_money"
+
+
+if __name__ == "__main__":
+    test_fetch_market_snapshot_skips_empty_rows()
+    test_one_snapshot_serves_whole_cycle()
+    print("stock poller snapshot tests passed")
@@ -0,0 +1,70 @@
+import sys
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.database.database import Base
+from src.database.models import MarketType, StockQuote
+from src.services.stock_quote_service import UPSERT_CHUNK_SIZE, StockQuoteService, build_upsert
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def quote(name, price):
+    return {"name": name, "price": price, "prev_close": price - 1, "change_pct": 1.0,
+            "volume": 1000.0, "high": price + 1, "low": price - 2, "data_source": "sina"}
+
+
+def test_bulk_upsert_inserts_then_updates():
+    db = make_session()
+
+    result = StockQuoteService.bulk_upsert(db, {"600519": quote("贵州茅台", 1500.0), "000858": quote("五粮液", 150.0)})
+    db.commit()
+    assert result["rows"] == 2 and result["statements"] == 1
+    assert result["seconds"] >= 0
+
+    first = db.query(StockQuote).filter(StockQuote.symbol == "600519").one()
+    created_at = first.created_at
+
+    StockQuoteService.bulk_upsert(db, {"600519": quote("贵州茅台", 1510.0)})
+    db.commit()
+    db.expire_all()
+
+    updated = db.query(StockQuote).filter(StockQuote.symbol == "600519").one()
+    assert updated.price == 1510.0
+    assert updated.market_type == MarketType.CN_STOCK
+    # 冲突更新不改变首次写入时间
+    assert updated.created_at == created_at
+    assert db.query(StockQuote).count() == 2
+
+
+def test_large_batches_are_chunked():
+    db = make_session()
+    quotes = {f"{i:06d}": quote(f"S{i}", 10.0) for i in range(UPSERT_CHUNK_SIZE + 10)}
+    result = StockQuoteService.bulk_upsert(db, quotes)
+    db.commit()
+    assert result["rows"] == UPSERT_CHUNK_SIZE + 10
+    assert result["statements"] == 2
+    assert db.query(StockQuote).count() == UPSERT_CHUNK_SIZE + 10
+
+
+def test_mysql_statement():
+    stmt = build_upsert("mysql", [{"symbol": "600519", "price": 1500.0}])
+    sql = str(stmt.compile(dialect=mysql.dialect()))
+    assert "ON DUPLICATE KEY UPDATE" in sql
+    assert "created_at = " not in sql.split("ON DUPLICATE KEY UPDATE")[1]
+
+
+if __name__ == "__main__":
+    test_bulk_upsert_inserts_then_updates()
+    test_large_batches_are_chunked()
+    test_mysql_statement()
+    print("stock quote upsert tests passed")
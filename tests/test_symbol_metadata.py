@@ -0,0 +1,109 @@
+import sys
+import os
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+from src.data.symbol_metadata import SymbolMetadataStore
+
+
+class FakeMetadataStore(SymbolMetadataStore):
+    """用内存中的 info 代替 yfinance"""
+
+    def __init__(self, path, infos, **kwargs):
+        self.infos = infos
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        super().__init__(path=path, **kwargs)
+
+    def _fetch_info(self, symbol):
+        self.release.wait(5)
+        self.calls.append(symbol)
+        info = self.infos.get(symbol, {"trailingPegRatio": None})  # yfinance 对不存在的代码只返回少量空字段
+        if isinstance(info, Exception):
+            raise info
+        return info
+
+
+AAPL = {"longName": "Apple Inc.", "quoteType": "EQUITY", "exchange": "NMS",
+        "currency": "USD", "regularMarketPrice": 200.0, "trailingPE": 30.0}
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_hot_path_never_blocks_and_fills_in_background():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FakeMetadataStore(os.path.join(tmp, "meta.db"), {"AAPL": AAPL})
+        store.release.clear()
+
+        # 缓存缺失：立即返回默认值，后台获取
+        assert store.get_name("AAPL", default="AAPL") == "AAPL"
+        store.release.set()
+        assert wait_for(lambda: store.get_stats()["pending"] == 0 and store.calls == ["AAPL"])
+        assert store.get_name("AAPL") == "Apple Inc."
+
+        # 持久化：新实例直接从本地文件读取
+        reloaded = FakeMetadataStore(os.path.join(tmp, "meta.db"), {})
+        meta = reloaded.get("AAPL")
+        assert meta["quote_type"] == "EQUITY" and meta["currency"] == "USD" and meta["found"]
+        assert reloaded.get_info("AAPL")["trailingPE"] == 30.0
+        assert reloaded.calls == []
+
+
+def test_missing_symbols_and_info_max_age():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FakeMetadataStore(os.path.join(tmp, "meta.db"), {"AAPL": AAPL})
+
+        metadata = store.get_many(["AAPL", "NOPE.SS"], wait=True)
+        assert metadata["AAPL"]["found"]
+        assert not metadata["NOPE.SS"]["found"]
+        assert sorted(store.calls) == ["AAPL", "NOPE.SS"]
+
+        # 不存在的代码也被缓存
+        store.get_many(["AAPL", "NOPE.SS"], wait=True)
+        assert len(store.calls) == 2
+
+        # 完整 info 超过可接受时间时同步刷新
+        store.get_info("AAPL", max_age=3600)
+        assert len(store.calls) == 2
+        store.get_info("AAPL", max_age=0)
+        assert store.calls[-1] == "AAPL" and len(store.calls) == 3
+
+
+def test_fetch_error_keeps_previous_metadata():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FakeMetadataStore(os.path.join(tmp, "meta.db"), {"AAPL": AAPL}, ttl=0)
+        assert store.get("AAPL", wait=True)["found"]
+
+        # 过期刷新时超时：保留原有数据，不记为不存在，重试间隔内不再请求
+        store.infos["AAPL"] = TimeoutError("timeout")
+        assert store.get_info("AAPL", max_age=0)["trailingPE"] == 30.0
+        calls = len(store.calls)
+        meta = store.get("AAPL")
+        assert meta["name"] == "Apple Inc." and meta["found"]
+        assert store.get_info("AAPL", max_age=0)["longName"] == "Apple Inc."
+        assert len(store.calls) == calls
+
+        # 从未获取成功的代码失败时不写入
+        store.infos["MSFT"] = TimeoutError("timeout")
+        assert store.get("MSFT", wait=True) is None
+        with store._connect() as conn:
+            rows = dict(conn.execute("SELECT symbol, info_json FROM symbol_metadata").fetchall())
+        assert "MSFT" not in rows and "Apple Inc." in rows["AAPL"]
+
+
+if __name__ == "__main__":
+    test_hot_path_never_blocks_and_fills_in_background()
+    test_missing_symbols_and_info_max_age()
+    test_fetch_error_keeps_previous_metadata()
+    print("symbol metadata tests passed")